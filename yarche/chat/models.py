@@ -175,6 +175,10 @@ class ChatActionLog(models.Model):
                             data[field_id_name] = None
             
             obj = model_class.objects.create(**data)
+
+            if self.model_name == 'ledger.Transaction':
+                from ledger.order_payments import apply_payment_entries, payment_entries
+                apply_payment_entries(payment_entries([obj]))
             
             self.restored = True
             self.restored_at = tz.now()
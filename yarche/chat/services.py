@@ -3,13 +3,16 @@ import json
 import os
 from django.db.models import ForeignKey, CharField, TextField, IntegerField, DecimalField, FloatField, DateTimeField, DateField, BooleanField
 from django.apps import apps
+from django.db import transaction as db_transaction
 from django.utils import timezone
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from users.models import User
+from users.permissions import has_perm
 from ledger.models import BankAccount, BankAccountType, Transaction, TransactionCategory
+from ledger.order_payments import apply_payment_entries, payment_entries
 from commerce.models import Client, Order
 from chat.models import ChatActionLog
 
@@ -302,8 +305,8 @@ def check_action_permission(user, action_name):
     if not permission:
         return True
     
-    if hasattr(user, 'user_type') and user.user_type:
-        return user.user_type.permissions.filter(codename=permission.split('.')[-1]).exists()
+    if getattr(user, 'user_type_id', None):
+        return has_perm(user, permission.split('.')[-1])
     
     return user.is_staff
 
@@ -517,15 +520,17 @@ def create_transaction_action(params, user, query_text):
         else:
             amount = abs(float(amount))
         
-        transaction = Transaction.objects.create(
-            bank_account_id=bank_account_id,
-            amount=amount,
-            type=trans_type,
-            order_id=order_id,
-            client_id=client_id,
-            comment=comment,
-            created_by=user
-        )
+        with db_transaction.atomic():
+            transaction = Transaction.objects.create(
+                bank_account_id=bank_account_id,
+                amount=amount,
+                type=trans_type,
+                order_id=order_id,
+                client_id=client_id,
+                comment=comment,
+                created_by=user
+            )
+            apply_payment_entries(payment_entries([transaction]))
         
         log_chat_action(
             user=user, action='create', model_name='ledger.Transaction',
@@ -678,7 +683,10 @@ def delete_transaction_action(params, user, query_text):
         data_before = get_model_data(transaction)
         object_repr = f"Транзакция #{transaction.id} ({transaction.amount})"
         
-        transaction.delete()
+        with db_transaction.atomic():
+            deleted_payment_entries = payment_entries([transaction])
+            transaction.delete()
+            apply_payment_entries(deleted_payment_entries, sign=-1)
         
         log_chat_action(
             user=user, action='delete', model_name='ledger.Transaction',
@@ -7,6 +7,7 @@ from .services import get_ai_response
 import json
 from .models import ChatActionLog
 from .services import restore_from_log
+from users.permissions import is_admin
 from django.core.cache import cache
 
 @login_required
@@ -55,7 +56,7 @@ def send_chat_message(request):
 @login_required
 def chat_logs(request):
     """Страница просмотра всех логов действий чата"""
-    if not hasattr(request.user, 'user_type') or request.user.user_type.name != "Администратор":
+    if not is_admin(request.user):
         return redirect('/smart-chat/')
     logs = ChatActionLog.objects.filter(user=request.user).order_by('-created_at')[:100]
     return render(request, 'chat/chat_logs.html', {'logs': logs})
@@ -64,7 +65,7 @@ def chat_logs(request):
 @require_POST
 def restore_log(request, log_id):
     """Восстановление объекта из лога"""
-    if not hasattr(request.user, 'user_type') or request.user.user_type.name != "Администратор":
+    if not is_admin(request.user):
         return JsonResponse({'status': 'error', 'message': 'Нет доступа'})
     success, message = restore_from_log(log_id, request.user)
     return JsonResponse({'status': 'success' if success else 'error', 'message': message})
@@ -72,7 +73,7 @@ def restore_log(request, log_id):
 @login_required
 def log_detail(request, log_id):
     """Детали конкретного лога"""
-    if not hasattr(request.user, 'user_type') or request.user.user_type.name != "Администратор":
+    if not is_admin(request.user):
         return redirect('/smart-chat/')
     log = get_object_or_404(ChatActionLog, id=log_id, user=request.user)
     return render(request, 'chat/log_detail.html', {'log': log})
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from commerce.models import refresh_order_sales_status
+
+
+class Command(BaseCommand):
+    help = "Копирует статусы работ отдела продаж в заказы"
+
+    def handle(self, *args, **kwargs):
+        count = refresh_order_sales_status()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено заказов: {count}"
+            )
+        )
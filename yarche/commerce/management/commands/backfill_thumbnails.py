@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from commerce.thumbnails import backfill_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Создает миниатюры и превью для загруженных изображений"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать миниатюры, даже если они уже есть",
+        )
+
+    def handle(self, *args, **options):
+        generated, failed = backfill_thumbnails(force=options["force"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано миниатюр для документов: {generated}, ошибок: {failed}"
+            )
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from commerce.views import get_base_order_queryset, get_order_fields
+from yarche.tables import RowRenderer
+
+
+class Command(BaseCommand):
+    help = "Сравнивает скорость отрисовки строк заказов шаблоном table_row.html и RowRenderer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200, help="Сколько заказов отрисовать")
+        parser.add_argument("--repeat", type=int, default=5, help="Сколько раз повторить замер")
+
+    def measure(self, render, items, repeat: int) -> float:
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for item in items:
+                render(item)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return len(items) / best if best else 0
+
+    def handle(self, *args, **options):
+        fields = get_order_fields()
+        items = list(get_base_order_queryset().order_by("-created", "-id")[: options["rows"]])
+        if not items:
+            self.stdout.write(self.style.WARNING("Нет заказов для замера"))
+            return
+
+        renderer = RowRenderer(fields)
+
+        def render_template(item):
+            return render_to_string("components/table_row.html", {"item": item, "fields": fields})
+
+        mismatches = sum(1 for item in items if renderer.render(item) != render_template(item))
+        template_rate = self.measure(render_template, items, options["repeat"])
+        renderer_rate = self.measure(renderer.render, items, options["repeat"])
+
+        self.stdout.write(f"Строк: {len(items)}, расхождений с шаблоном: {mismatches}")
+        self.stdout.write(f"Шаблон: {template_rate:.0f} строк/с")
+        self.stdout.write(f"RowRenderer: {renderer_rate:.0f} строк/с")
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(
+            style(f"Ускорение: {renderer_rate / template_rate:.1f}x" if template_rate else "Ускорение: -")
+        )
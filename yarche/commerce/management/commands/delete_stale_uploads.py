@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from commerce.uploads import STALE_UPLOAD_SECONDS, delete_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Удаляет незавершенные загрузки файлов по частям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=STALE_UPLOAD_SECONDS // 3600,
+            help="Удалять загрузки без новых данных дольше указанного числа часов",
+        )
+
+    def handle(self, *args, **options):
+        count = delete_stale_uploads(options["hours"] * 3600)
+        self.stdout.write(self.style.SUCCESS(f"Удалено незавершенных загрузок: {count}"))
@@ -0,0 +1,61 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from commerce.models import Document
+from commerce.storage import content_key, hash_file, is_content_key, move_content
+
+
+class Command(BaseCommand):
+    help = "Переносит файлы документов в хранилище по хэшу содержимого"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать файлы, ничего не перемещая",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        moved = deduplicated = missing = 0
+        migrated = set()
+        stored = set()
+
+        documents = Document.objects.exclude(file="").exclude(file__isnull=True).order_by("id")
+        for doc in documents.iterator(chunk_size=500):
+            old_key = doc.file.name
+            if is_content_key(old_key) or old_key in migrated:
+                continue
+            if not default_storage.exists(old_key):
+                missing += 1
+                continue
+
+            with default_storage.open(old_key, "rb") as f:
+                sha256 = hash_file(f)
+            key = content_key(sha256, doc.name or old_key)
+
+            migrated.add(old_key)
+            if key in stored or default_storage.exists(key):
+                deduplicated += 1
+            else:
+                moved += 1
+            stored.add(key)
+            if dry_run:
+                continue
+
+            if default_storage.exists(key):
+                default_storage.delete(old_key)
+            else:
+                move_content(old_key, key)
+
+            # Документы со старым путем переезжают вместе, имя для отображения не меняется
+            Document.objects.filter(file=old_key).update(
+                file=key, url=default_storage.url(key), content_hash=sha256
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Перенесено файлов: {moved}, совпало с уже сохраненными: {deduplicated}, "
+                f"не найдено: {missing}"
+            )
+        )
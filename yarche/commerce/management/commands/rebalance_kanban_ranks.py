@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Length
+
+from commerce.models import KanbanClientPlacement, KanbanColumn
+from commerce.ranking import RANK_REBALANCE_LENGTH, rebalance_ranks
+
+
+class Command(BaseCommand):
+    help = "Перестраивает длинные ключи позиций на канбан-доске"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Перестроить все столбцы, а не только с длинными ключами",
+        )
+
+    def handle(self, *args, **options):
+        long_ranks = {"rank_length__gt": 0 if options["all"] else RANK_REBALANCE_LENGTH}
+
+        changed = 0
+        if KanbanColumn.objects.annotate(rank_length=Length("rank")).filter(**long_ranks).exists():
+            changed += rebalance_ranks(KanbanColumn.objects.all())
+
+        column_ids = (
+            KanbanClientPlacement.objects.annotate(rank_length=Length("rank"))
+            .filter(**long_ranks)
+            .order_by()
+            .values_list("column_id", flat=True)
+            .distinct()
+        )
+        columns = 0
+        for column_id in list(column_ids):
+            changed += rebalance_ranks(KanbanClientPlacement.objects.filter(column_id=column_id))
+            columns += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Перестроено столбцов: {columns}, обновлено позиций: {changed}")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from commerce.search import refresh_client_search_keys
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает ключи поиска клиентов"
+
+    def handle(self, *args, **kwargs):
+        count = refresh_client_search_keys()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено клиентов: {count}"
+            )
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from commerce.search import refresh_order_search_documents
+
+
+class Command(BaseCommand):
+    help = "Пересобирает поисковые документы заказов"
+
+    def handle(self, *args, **kwargs):
+        count = refresh_order_search_documents()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересобрано поисковых документов: {count}"
+            )
+        )
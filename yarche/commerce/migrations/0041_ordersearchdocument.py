@@ -0,0 +1,116 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEARCH_BATCH_SIZE = 1000
+QUOTES = re.compile("[\"'«»„“”`]")
+SPACES = re.compile(r"\s+")
+
+# ngram-парсер ищет подстроки, поэтому LIKE '%...%' по заказам не нужен
+FULLTEXT_INDEXES = {
+    "commerce_ordersearch_client_ft": "client_name",
+    "commerce_ordersearch_legal_ft": "legal_name",
+    "commerce_ordersearch_product_ft": "product_name",
+    "commerce_ordersearch_manager_ft": "manager_name",
+    "commerce_ordersearch_info_ft": "additional_info",
+    "commerce_ordersearch_content_ft": "content",
+}
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    table = apps.get_model("commerce", "OrderSearchDocument")._meta.db_table
+    for name, column in FULLTEXT_INDEXES.items():
+        schema_editor.execute(f"CREATE FULLTEXT INDEX {name} ON {table} ({column}) WITH PARSER ngram")
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "mysql":
+        return
+    table = apps.get_model("commerce", "OrderSearchDocument")._meta.db_table
+    for name in FULLTEXT_INDEXES:
+        schema_editor.execute(f"DROP INDEX {name} ON {table}")
+
+
+# Копия commerce.normalization и commerce.search на момент миграции:
+# изменения этих модулей не должны менять уже примененную миграцию
+def normalize_search_text(*values) -> str:
+    text = " ".join(str(value) for value in values if value)
+    text = QUOTES.sub(" ", text.lower().replace("ё", "е"))
+    return SPACES.sub(" ", text).strip()
+
+
+def search_document_values(order) -> dict:
+    client = order.client
+    manager = order.manager
+    product = order.product
+
+    client_name = normalize_search_text(client.name if client else "")
+    legal_name = normalize_search_text(client.legal_name if client else "")
+    product_name = normalize_search_text(product.name if product else "")
+    manager_name = normalize_search_text(
+        *((manager.last_name, manager.first_name, manager.username) if manager else ())
+    )
+    additional_info = normalize_search_text(order.additional_info)
+
+    return {
+        "order_id": order.id,
+        "client_name": client_name[:255],
+        "legal_name": legal_name[:255],
+        "product_name": product_name[:255],
+        "manager_name": manager_name[:255],
+        "additional_info": additional_info,
+        "content": normalize_search_text(
+            order.id, client_name, legal_name, product_name, manager_name, order.comment, additional_info
+        ),
+    }
+
+
+def fill_search_documents(apps, schema_editor):
+    """
+    Build search documents for existing orders.
+    """
+    Order = apps.get_model("commerce", "Order")
+    OrderSearchDocument = apps.get_model("commerce", "OrderSearchDocument")
+
+    orders = Order.objects.select_related("client", "product", "manager").order_by("id")
+    batch = []
+    for order in orders.iterator(chunk_size=SEARCH_BATCH_SIZE):
+        batch.append(OrderSearchDocument(**search_document_values(order)))
+        if len(batch) >= SEARCH_BATCH_SIZE:
+            OrderSearchDocument.objects.bulk_create(batch)
+            batch = []
+    OrderSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0040_remove_order_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchDocument',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='commerce.order', verbose_name='Заказ')),
+                ('client_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Клиент')),
+                ('legal_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Юр. название')),
+                ('product_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Продукция')),
+                ('manager_name', models.CharField(blank=True, default='', max_length=255, verbose_name='Менеджер')),
+                ('additional_info', models.TextField(blank=True, default='', verbose_name='Дополнительная информация')),
+                ('content', models.TextField(blank=True, default='', verbose_name='Текст заказа')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлен')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ заказа',
+                'verbose_name_plural': 'Поисковые документы заказов',
+            },
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
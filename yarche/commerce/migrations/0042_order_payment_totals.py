@@ -0,0 +1,75 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Abs
+
+
+def fill_payment_totals(apps, schema_editor):
+    """
+    Compute order payment counters from existing payment transactions.
+    """
+    Order = apps.get_model("commerce", "Order")
+    Transaction = apps.get_model("ledger", "Transaction")
+
+    totals = {
+        row["order_id"]: row
+        for row in Transaction.objects.filter(
+            type__in=["order_payment", "client_account_payment"], order__isnull=False
+        )
+        .values("order_id")
+        .annotate(
+            pending=Sum(Abs("amount"), filter=Q(completed_date__isnull=True)),
+            settled=Sum(Abs("amount"), filter=Q(completed_date__isnull=False)),
+            last=Max("created"),
+        )
+        .order_by()
+    }
+
+    fields = ["pending_payment_total", "settled_payment_total", "remaining_debt", "last_payment_at"]
+    batch = []
+    for order in Order.objects.only("id", "amount", "paid_amount").order_by("id").iterator(chunk_size=1000):
+        row = totals.get(order.id, {})
+        order.pending_payment_total = row.get("pending") or Decimal(0)
+        order.settled_payment_total = row.get("settled") or Decimal(0)
+        order.last_payment_at = row.get("last")
+        order.remaining_debt = (order.amount or 0) - (order.paid_amount or 0) - order.pending_payment_total
+        batch.append(order)
+        if len(batch) >= 1000:
+            Order.objects.bulk_update(batch, fields)
+            batch = []
+    Order.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0041_ordersearchdocument'),
+        ('ledger', '0008_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='last_payment_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний платеж'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='pending_payment_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Сумма платежей по заказу, которые еще не проведены закрытием смены', max_digits=12, verbose_name='Платежи в открытых сменах'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='remaining_debt',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, help_text='Сумма заказа за вычетом оплаченной суммы и платежей в открытых сменах', max_digits=12, verbose_name='Остаток долга'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='settled_payment_total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Сумма платежей по заказу, проведенных закрытием смены', max_digits=12, verbose_name='Проведенные платежи'),
+        ),
+        migrations.RunPython(fill_payment_totals, migrations.RunPython.noop),
+    ]
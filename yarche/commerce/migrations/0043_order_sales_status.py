@@ -0,0 +1,44 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_sales_status(apps, schema_editor):
+    """
+    Copy sales department work statuses onto existing orders.
+    """
+    Order = apps.get_model("commerce", "Order")
+    OrderDepartmentWork = apps.get_model("commerce", "OrderDepartmentWork")
+
+    works = OrderDepartmentWork.objects.filter(
+        order_id=OuterRef("pk"),
+        department__name="Отдел продаж",
+    ).order_by("id")
+    Order.objects.update(
+        sales_status_id=Subquery(works.values("status_id")[:1]),
+        sales_status_name=Coalesce(Subquery(works.values("status__name")[:1]), Value("")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0042_order_payment_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='sales_status',
+            field=models.ForeignKey(blank=True, help_text='Копия статуса работы отдела продаж для списков заказов', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_orders', to='commerce.orderworkstatus', verbose_name='Статус отдела продаж'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='sales_status_name',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255, verbose_name='Название статуса отдела продаж'),
+        ),
+        migrations.RunPython(fill_sales_status, migrations.RunPython.noop),
+    ]
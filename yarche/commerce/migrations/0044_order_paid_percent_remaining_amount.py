@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0043_order_sales_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='paid_percent',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Case(models.When(amount__gt=0, then=django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('paid_amount'), '*', models.Value(100)), '/', models.F('amount')))), default=models.Value(0), output_field=models.IntegerField()), output_field=models.IntegerField(), verbose_name='% Оплаты'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='remaining_amount',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('amount'), '-', models.F('paid_amount')), output_field=models.DecimalField(decimal_places=0, max_digits=12), verbose_name='Остаток к оплате'),
+        ),
+    ]
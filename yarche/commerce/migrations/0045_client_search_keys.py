@@ -0,0 +1,72 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import re
+
+from django.db import migrations, models
+
+# Копия commerce.normalization на момент миграции
+QUOTES = re.compile("[\"'«»„“”`]")
+SPACES = re.compile(r"\s+")
+PUNCTUATION = re.compile(r"[^\w\s]")
+LEGAL_FORMS = re.compile(
+    r"\b(?:"
+    r"общество с ограниченной ответственностью|"
+    r"индивидуальный предприниматель|"
+    r"публичное акционерное общество|"
+    r"закрытое акционерное общество|"
+    r"открытое акционерное общество|"
+    r"акционерное общество|"
+    r"ооо|оао|зао|пао|ао|ип|нко|ано|гуп|муп|фгуп|тоо"
+    r")\b"
+)
+
+
+def normalize_client_key(value) -> str:
+    text = " ".join(str(v) for v in (value,) if v)
+    text = SPACES.sub(" ", QUOTES.sub(" ", text.lower().replace("ё", "е"))).strip()
+    text = SPACES.sub(" ", PUNCTUATION.sub(" ", text)).strip()
+    key = SPACES.sub(" ", LEGAL_FORMS.sub(" ", text)).strip()
+    return key or text
+
+
+def fill_client_search_keys(apps, schema_editor):
+    """
+    Compute search keys of existing clients.
+    """
+    Client = apps.get_model("commerce", "Client")
+
+    batch = []
+    for client in Client.objects.only("id", "name", "legal_name").order_by("id").iterator(chunk_size=1000):
+        client.name_key = normalize_client_key(client.name)[:255]
+        client.legal_name_key = normalize_client_key(client.legal_name)[:255]
+        batch.append(client)
+        if len(batch) >= 1000:
+            Client.objects.bulk_update(batch, ["name_key", "legal_name_key"])
+            batch = []
+    Client.objects.bulk_update(batch, ["name_key", "legal_name_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0044_order_paid_percent_remaining_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='legal_name_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255, verbose_name='Ключ поиска по юр. названию'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255, verbose_name='Ключ поиска по имени'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='inn',
+            field=models.CharField(blank=True, db_index=True, max_length=12, null=True, verbose_name='ИНН'),
+        ),
+        migrations.RunPython(fill_client_search_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0045_client_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='thumbnails_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Миниатюры созданы'),
+        ),
+    ]
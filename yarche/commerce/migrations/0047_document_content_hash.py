@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0046_document_thumbnails_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='Хэш содержимого'),
+        ),
+    ]
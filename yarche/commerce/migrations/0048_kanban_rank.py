@@ -0,0 +1,86 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from django.db import migrations, models
+
+# Копия commerce.ranking.spread_ranks на момент миграции
+RANK_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+RANK_BASE = len(RANK_DIGITS)
+
+
+def spread_ranks(count: int) -> list:
+    width = 1
+    while RANK_BASE**width <= count:
+        width += 1
+    step = RANK_BASE**width // (count + 1)
+
+    ranks = []
+    for position in range(1, count + 1):
+        value = step * position
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, RANK_BASE)
+            digits.append(RANK_DIGITS[digit])
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def convert_orders_to_ranks(apps, schema_editor):
+    """
+    Turn integer column and card orders into rank keys, keeping the current order.
+    """
+    KanbanColumn = apps.get_model("commerce", "KanbanColumn")
+    KanbanClientPlacement = apps.get_model("commerce", "KanbanClientPlacement")
+
+    columns = list(KanbanColumn.objects.order_by("order", "id"))
+    for column, rank in zip(columns, spread_ranks(len(columns))):
+        column.rank = rank
+    KanbanColumn.objects.bulk_update(columns, ["rank"])
+
+    for column in columns:
+        placements = list(
+            KanbanClientPlacement.objects.filter(column=column).order_by("order", "id").only("id")
+        )
+        for placement, rank in zip(placements, spread_ranks(len(placements))):
+            placement.rank = rank
+        KanbanClientPlacement.objects.bulk_update(placements, ["rank"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0047_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kanbanclientplacement',
+            name='rank',
+            field=models.CharField(default='', max_length=64, verbose_name='Позиция в столбце'),
+        ),
+        migrations.AddField(
+            model_name='kanbancolumn',
+            name='rank',
+            field=models.CharField(db_index=True, default='', max_length=64, verbose_name='Позиция'),
+        ),
+        migrations.RunPython(convert_orders_to_ranks, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='kanbanclientplacement',
+            options={'ordering': ['rank', 'id'], 'verbose_name': 'Клиент на доске', 'verbose_name_plural': 'Клиенты на доске'},
+        ),
+        migrations.AlterModelOptions(
+            name='kanbancolumn',
+            options={'ordering': ['rank', 'id'], 'verbose_name': 'Столбец Kanban', 'verbose_name_plural': 'Столбцы Kanban'},
+        ),
+        migrations.RemoveField(
+            model_name='kanbanclientplacement',
+            name='order',
+        ),
+        migrations.RemoveField(
+            model_name='kanbancolumn',
+            name='order',
+        ),
+        migrations.AddIndex(
+            model_name='kanbanclientplacement',
+            index=models.Index(fields=['column', 'rank'], name='commerce_ka_column__a44ff2_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from .client import Client, ClientObject, Contact, KanbanClientPlacement, KanbanColumn
 from .document import Document, FileType
 from .note import ManagerNote
-from .order import Order, OrderStatus, Department, OrderDepartmentWork, OrderWorkStatus, OrderDepartmentWorkMessage, EmergencyIncident, FixedAsset, InventoryItem, Credit, AccountsPayable, ShortTermLiability, Bonus, SALES_DEPARTMENT_NAME, ensure_sales_department_work
+from .order import Order, OrderStatus, Department, OrderDepartmentWork, OrderWorkStatus, OrderDepartmentWorkMessage, EmergencyIncident, FixedAsset, InventoryItem, Credit, AccountsPayable, ShortTermLiability, Bonus, SALES_DEPARTMENT_NAME, ensure_sales_department_work, get_order_work_routing, build_order_department_works, sync_order_sales_status, refresh_order_sales_status
 from .product import Product, ProductDepartment
+from .search import OrderSearchDocument
@@ -1,10 +1,12 @@
 from django.db import models
 
+from ..normalization import normalize_client_key
+
 
 class Client(models.Model):
     name = models.CharField(max_length=255, verbose_name="Клиент")
     comment = models.TextField(verbose_name="Комментарий", blank=True, null=True)
-    inn = models.CharField(max_length=12, verbose_name="ИНН", blank=True, null=True)
+    inn = models.CharField(max_length=12, verbose_name="ИНН", blank=True, null=True, db_index=True)
     legal_name = models.CharField(
         max_length=255, verbose_name="Юр. название", blank=True, null=True
     )
@@ -24,10 +26,28 @@ class Client(models.Model):
     balance = models.DecimalField(
         decimal_places=2, verbose_name="Баланс", default=0, max_digits=12
     )
+    name_key = models.CharField(
+        max_length=255, verbose_name="Ключ поиска по имени", blank=True, default="", db_index=True
+    )
+    legal_name_key = models.CharField(
+        max_length=255, verbose_name="Ключ поиска по юр. названию", blank=True, default="", db_index=True
+    )
 
     def __str__(self):
         return self.name
 
+    def fill_search_keys(self):
+        # Ключи поиска выводятся из названий, см. commerce.search.search_clients
+        self.name_key = normalize_client_key(self.name)[:255]
+        self.legal_name_key = normalize_client_key(self.legal_name)[:255]
+
+    def save(self, *args, **kwargs):
+        self.fill_search_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"name", "legal_name"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "name_key", "legal_name_key"}
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Клиент"
         verbose_name_plural = "Клиенты"
@@ -73,7 +93,7 @@ class Contact(models.Model):
 
 class KanbanColumn(models.Model):
     name = models.CharField(max_length=255, verbose_name="Название столбца")
-    order = models.PositiveIntegerField(default=0, verbose_name="Порядок")
+    rank = models.CharField(max_length=64, default="", db_index=True, verbose_name="Позиция")
 
     def __str__(self):
         return self.name
@@ -81,12 +101,12 @@ class KanbanColumn(models.Model):
     class Meta:
         verbose_name = "Столбец Kanban"
         verbose_name_plural = "Столбцы Kanban"
-        ordering = ['order']
+        ordering = ['rank', 'id']
 
 class KanbanClientPlacement(models.Model):
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="kanban_placements", verbose_name="Клиент")
     column = models.ForeignKey(KanbanColumn, on_delete=models.CASCADE, related_name="clients", verbose_name="Столбец")
-    order = models.PositiveIntegerField(default=0, verbose_name="Порядок в столбце")
+    rank = models.CharField(max_length=64, default="", verbose_name="Позиция в столбце")
     added_at = models.DateTimeField(auto_now_add=True, verbose_name="Добавлен")
 
     def __str__(self):
@@ -96,5 +116,6 @@ class KanbanClientPlacement(models.Model):
         verbose_name = "Клиент на доске"
         verbose_name_plural = "Клиенты на доске"
         unique_together = ('client',)
-        ordering = ['order']
+        ordering = ['rank', 'id']
+        indexes = [models.Index(fields=["column", "rank"])]
 
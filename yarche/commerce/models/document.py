@@ -1,8 +1,10 @@
-from django.db import models
+from django.db import models, transaction
+from django.core.files.storage import default_storage
 from users.models import User
 from urllib.parse import urlparse, unquote
 import os
 from users.models import UserType
+from ..storage import store_content
 
 
 class FileType(models.Model):
@@ -26,6 +28,12 @@ class Document(models.Model):
     url = models.CharField(verbose_name="URL файла", max_length=1024, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата загрузки")
     comment = models.TextField(verbose_name="Комментарий", blank=True, null=True)
+    content_hash = models.CharField(
+        verbose_name="Хэш содержимого", max_length=64, blank=True, db_index=True
+    )
+    thumbnails_at = models.DateTimeField(
+        verbose_name="Миниатюры созданы", null=True, blank=True
+    )
 
     order = models.ForeignKey(
         'Order',
@@ -39,57 +47,96 @@ class Document(models.Model):
     def __str__(self):
         return f"{self.name} ({self.user}) ({self.id})"
 
-    def save(self, *args, **kwargs):
+    def store_file(self, content, sha256=None):
+        """
+        Store file content under its hash key, keeping the display name in name.
+        """
+        self.name = self.name or os.path.basename(content.name or "")
+        # Размер берем до сохранения: хранилище может переместить временный файл
+        self.size = content.size
+        self.file.name, self.content_hash = store_content(content, self.name, sha256)
+        key = self.file.name
+
+        def restore_if_released():
+            # Такое же содержимое могли удалить вместе с другим документом, пока шла загрузка
+            if not default_storage.exists(key):
+                content.seek(0)
+                default_storage.save(key, content)
+
+        transaction.on_commit(restore_if_released, robust=True)
+        return self
+
+    def release_file(self):
+        """
+        Delete the stored file after commit unless another document shares its content.
+        """
+        key = getattr(self.file, "name", None)
+        if not key:
+            return
+        content_hash = self.content_hash
+        # Откат транзакции не должен оставить запись без файла, поэтому удаляем после коммита
+        transaction.on_commit(lambda: delete_unshared_file(key, content_hash))
+
+    def fill_file_fields(self) -> list:
+        """
+        Fill name, size and url from the file, returning the changed fields.
+        """
+        changed_fields = []
         if self.file and not (self.name and str(self.name).strip()):
             try:
                 self.name = os.path.basename(self.file.name)
+                changed_fields.append("name")
             except Exception:
                 pass
 
-
-        changed = False
-        changed_fields = []
-
         if self.file:
-            try:
-                file_size = getattr(self.file, "size", None)
-            except Exception:
-                file_size = None
-            if file_size is not None and (self.size is None or self.size != file_size):
-                self.size = file_size
-                changed = True
-                changed_fields.append("size")
+            if self.size is None:
+                try:
+                    self.size = self.file.size
+                    changed_fields.append("size")
+                except Exception:
+                    pass
 
             try:
-                file_url = getattr(self.file, "url", None)
+                file_url = self.file.url
             except Exception:
                 file_url = None
-            if file_url and (not self.url or self.url != file_url):
+            if file_url and self.url != file_url:
                 self.url = file_url
-                changed = True
                 changed_fields.append("url")
-        else:
-            if self.url and not (self.name and str(self.name).strip()):
-                try:
-                    parsed = urlparse(self.url)
-                    base = os.path.basename(parsed.path)
-                    if base:
-                        self.name = unquote(base)
-                        changed = True
-                        changed_fields.append("name")
-                except Exception:
-                    pass
+        elif self.url and not (self.name and str(self.name).strip()):
+            try:
+                base = os.path.basename(urlparse(self.url).path)
+                if base:
+                    self.name = unquote(base)
+                    changed_fields.append("name")
+            except Exception:
+                pass
+        return changed_fields
 
-        if self.pk is None:
-            super().save(*args, **kwargs)
-            if changed and changed_fields:
-                super().save(update_fields=changed_fields)
-        else:
-            if changed and changed_fields:
-                super().save(update_fields=changed_fields)
-            else:
-                super().save(*args, **kwargs)
+    def save(self, *args, **kwargs):
+        # Имя, размер и ссылка заполняются до записи, поэтому вставка идет одним запросом
+        changed_fields = self.fill_file_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and changed_fields:
+            kwargs["update_fields"] = {*update_fields, *changed_fields}
+        super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = "Документ"
         verbose_name_plural = "Документы"
+
+
+def delete_unshared_file(key: str, content_hash: str = ""):
+    """
+    Delete a stored file if no document refers to its content any more.
+    """
+    if content_hash:
+        # Поиск идет по индексу content_hash, file уточняет расширение ключа
+        shared = Document.objects.filter(content_hash=content_hash, file=key)
+    else:
+        shared = Document.objects.filter(file=key)
+    if shared.exists():
+        return
+    if default_storage.exists(key):
+        default_storage.delete(key)
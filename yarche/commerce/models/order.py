@@ -1,6 +1,10 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django.db import models
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Floor
 from .client import Client
-from .product import Product
+from .product import Product, ProductDepartment
 from .document import Document
 from users.models import User, UserType
 from django.utils import timezone
@@ -168,6 +172,66 @@ class Order(models.Model):
     archived_at = models.DateTimeField(
         verbose_name="Отправлено в архив", null=True, blank=True
     )
+    pending_payment_total = models.DecimalField(
+        decimal_places=2,
+        verbose_name="Платежи в открытых сменах",
+        max_digits=12,
+        default=0,
+        help_text="Сумма платежей по заказу, которые еще не проведены закрытием смены",
+    )
+    settled_payment_total = models.DecimalField(
+        decimal_places=2,
+        verbose_name="Проведенные платежи",
+        max_digits=12,
+        default=0,
+        help_text="Сумма платежей по заказу, проведенных закрытием смены",
+    )
+    remaining_debt = models.DecimalField(
+        decimal_places=2,
+        verbose_name="Остаток долга",
+        max_digits=12,
+        default=0,
+        db_index=True,
+        help_text="Сумма заказа за вычетом оплаченной суммы и платежей в открытых сменах",
+    )
+    last_payment_at = models.DateTimeField(
+        verbose_name="Последний платеж", null=True, blank=True
+    )
+    sales_status = models.ForeignKey(
+        OrderWorkStatus,
+        on_delete=models.SET_NULL,
+        verbose_name="Статус отдела продаж",
+        related_name="sales_orders",
+        blank=True,
+        null=True,
+        help_text="Копия статуса работы отдела продаж для списков заказов",
+    )
+    sales_status_name = models.CharField(
+        verbose_name="Название статуса отдела продаж",
+        max_length=255,
+        blank=True,
+        default="",
+        db_index=True,
+    )
+    paid_percent = models.GeneratedField(
+        # Тот же процент, что выводится в таблице: int(paid_amount / amount * 100)
+        expression=Case(
+            When(amount__gt=0, then=Floor(F("paid_amount") * 100 / F("amount"))),
+            default=Value(0),
+            output_field=models.IntegerField(),
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+        db_index=True,
+        verbose_name="% Оплаты",
+    )
+    remaining_amount = models.GeneratedField(
+        expression=F("amount") - F("paid_amount"),
+        output_field=models.DecimalField(max_digits=12, decimal_places=0),
+        db_persist=True,
+        db_index=True,
+        verbose_name="Остаток к оплате",
+    )
 
     viewers = models.ManyToManyField(
         User,
@@ -180,6 +244,36 @@ class Order(models.Model):
     def __str__(self):
         return f"{self.id}"
 
+    def round_to_field(self, name: str):
+        """
+        Round a decimal field value to the field precision, as the database will store it.
+        """
+        value = getattr(self, name)
+        if value is None:
+            return None
+        places = Decimal(1).scaleb(-self._meta.get_field(name).decimal_places)
+        value = Decimal(str(value)).quantize(places, rounding=ROUND_HALF_UP)
+        setattr(self, name, value)
+        return value
+
+    def fill_remaining_debt(self):
+        """
+        Recompute remaining_debt from the amounts rounded to their stored precision.
+        """
+        # Вьюхи передают float; долг считается от тех же округленных сумм, что попадут в базу
+        amount = self.round_to_field("amount") or Decimal(0)
+        paid_amount = self.round_to_field("paid_amount") or Decimal(0)
+        self.remaining_debt = amount - paid_amount - Decimal(str(self.pending_payment_total or 0))
+        return self.remaining_debt
+
+    def save(self, *args, **kwargs):
+        # Счетчики платежей меняет ledger.order_payments через F(), здесь только пересчет долга
+        self.fill_remaining_debt()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"amount", "paid_amount"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "remaining_debt"}
+        super().save(*args, **kwargs)
+
     def get_sales_department_work(self):
         if hasattr(self, "sales_department_works_list"):
             works = self.sales_department_works_list
@@ -190,10 +284,8 @@ class Order(models.Model):
 
     @property
     def status(self):
-        work = self.get_sales_department_work()
-        if work and work.status:
-            return work.status.name
-        return None
+        # Статус отдела продаж хранится на заказе, см. sync_order_sales_status
+        return self.sales_status_name or None
 
     class Meta:
         verbose_name = "Заказ"
@@ -495,10 +587,108 @@ def ensure_sales_department_work(order, user=None):
     if not initial_status:
         initial_status = OrderWorkStatus.objects.filter(department=department).first()
 
-    return OrderDepartmentWork.objects.create(
+    work = OrderDepartmentWork.objects.create(
         order=order,
         department=department,
         status=initial_status,
         executor=user,
         started_at=timezone.now() if user else None,
     )
+    sync_order_sales_status(work, order)
+    return work
+
+
+def get_order_work_routing(product_ids):
+    """
+    Get the departments and initial work statuses for new orders of the products.
+    """
+    sales_department = Department.objects.filter(name=SALES_DEPARTMENT_NAME).first()
+    links = (
+        ProductDepartment.objects.filter(product_id__in=product_ids)
+        .exclude(department__name=SALES_DEPARTMENT_NAME)
+        .select_related("department")
+        .order_by("id")
+    )
+    product_departments = {}
+    for link in links:
+        product_departments.setdefault(link.product_id, []).append(link.department)
+
+    department_ids = {d.id for deps in product_departments.values() for d in deps}
+    if sales_department:
+        department_ids.add(sales_department.id)
+    statuses = OrderWorkStatus.objects.filter(
+        models.Q(department_id__in=department_ids) | models.Q(department__isnull=True)
+    ).order_by("id")
+
+    # Те же правила, что были в order_create: первый по id статус "Ожидает" отдела, иначе общий
+    wait_statuses = {}
+    sales_statuses = []
+    for status in statuses:
+        if status.name.lower() == "ожидает":
+            wait_statuses.setdefault(status.department_id, status)
+        if sales_department and status.department_id == sales_department.id:
+            sales_statuses.append(status)
+    sales_status = next((s for s in sales_statuses if s.is_initial), None)
+    if sales_status is None and sales_statuses:
+        sales_status = sales_statuses[0]
+
+    wait_status = wait_statuses.get(None)
+    return {
+        "sales_department": sales_department,
+        "sales_status": sales_status,
+        "departments": {
+            product_id: [(d, wait_statuses.get(d.id, wait_status)) for d in departments]
+            for product_id, departments in product_departments.items()
+        },
+    }
+
+
+def build_order_department_works(order, routing, user=None) -> list:
+    """
+    Get unsaved department works for a new order, the sales department work first.
+    """
+    works = [
+        OrderDepartmentWork(
+            order=order,
+            department=routing["sales_department"],
+            status=routing["sales_status"],
+            executor=user,
+            started_at=timezone.now() if user else None,
+        )
+    ]
+    for department, status in routing["departments"].get(order.product_id, []):
+        works.append(OrderDepartmentWork(order=order, department=department, status=status))
+    return works
+
+
+def sync_order_sales_status(work, order=None):
+    """
+    Copy the status of a sales department work onto its order.
+    """
+    if work is None or work.department.name != SALES_DEPARTMENT_NAME:
+        return
+    status = work.status
+    values = {
+        "sales_status": status,
+        "sales_status_name": status.name if status else "",
+    }
+    Order.objects.filter(pk=work.order_id).update(**values)
+    if order is not None:
+        for field, value in values.items():
+            setattr(order, field, value)
+
+
+def refresh_order_sales_status(orders=None) -> int:
+    """
+    Recopy sales department work statuses onto orders, all orders when none are given.
+    """
+    if orders is None:
+        orders = Order.objects.all()
+    works = OrderDepartmentWork.objects.filter(
+        order_id=OuterRef("pk"),
+        department__name=SALES_DEPARTMENT_NAME,
+    ).order_by("id")
+    return orders.update(
+        sales_status_id=Subquery(works.values("status_id")[:1]),
+        sales_status_name=Coalesce(Subquery(works.values("status__name")[:1]), Value("")),
+    )
@@ -0,0 +1,30 @@
+from django.db import models
+
+from .order import Order
+
+
+class OrderSearchDocument(models.Model):
+    """
+    Normalized text of an order kept for full-text column filters.
+    """
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+        verbose_name="Заказ",
+    )
+    client_name = models.CharField(verbose_name="Клиент", max_length=255, blank=True, default="")
+    legal_name = models.CharField(verbose_name="Юр. название", max_length=255, blank=True, default="")
+    product_name = models.CharField(verbose_name="Продукция", max_length=255, blank=True, default="")
+    manager_name = models.CharField(verbose_name="Менеджер", max_length=255, blank=True, default="")
+    additional_info = models.TextField(verbose_name="Дополнительная информация", blank=True, default="")
+    content = models.TextField(verbose_name="Текст заказа", blank=True, default="")
+    updated_at = models.DateTimeField(verbose_name="Обновлен", auto_now=True)
+
+    def __str__(self):
+        return f"{self.order_id}"
+
+    class Meta:
+        verbose_name = "Поисковый документ заказа"
+        verbose_name_plural = "Поисковые документы заказов"
@@ -0,0 +1,37 @@
+import re
+
+QUOTES = re.compile("[\"'«»„“”`]")
+SPACES = re.compile(r"\s+")
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Организационно-правовые формы, которые не участвуют в поиске клиента
+LEGAL_FORMS = re.compile(
+    r"\b(?:"
+    r"общество с ограниченной ответственностью|"
+    r"индивидуальный предприниматель|"
+    r"публичное акционерное общество|"
+    r"закрытое акционерное общество|"
+    r"открытое акционерное общество|"
+    r"акционерное общество|"
+    r"ооо|оао|зао|пао|ао|ип|нко|ано|гуп|муп|фгуп|тоо"
+    r")\b"
+)
+
+
+def normalize_search_text(*values) -> str:
+    """
+    Join values into lowercase text with ё folded to е and quotes removed.
+    """
+    text = " ".join(str(value) for value in values if value)
+    text = QUOTES.sub(" ", text.lower().replace("ё", "е"))
+    return SPACES.sub(" ", text).strip()
+
+
+def normalize_client_key(value) -> str:
+    """
+    Get the search key of a client name: normalized text without punctuation and legal forms.
+    """
+    text = SPACES.sub(" ", PUNCTUATION.sub(" ", normalize_search_text(value))).strip()
+    key = SPACES.sub(" ", LEGAL_FORMS.sub(" ", text)).strip()
+    # Название из одной правовой формы оставляем как есть
+    return key or text
@@ -0,0 +1,77 @@
+from django.db import transaction
+
+# Только цифры и строчные буквы: порядок строк совпадает в любой сортировке MySQL
+RANK_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+RANK_BASE = len(RANK_DIGITS)
+RANK_MAX_LENGTH = 64
+# Ключи длиннее этого перестраиваются командой rebalance_kanban_ranks
+RANK_REBALANCE_LENGTH = 24
+RANK_BATCH_SIZE = 500
+
+
+def rank_between(before=None, after=None) -> str:
+    """
+    Get a rank key sorting strictly between two keys; None means an open end.
+    """
+    before = before or ""
+    if after is not None and after <= before:
+        raise ValueError(f"Ключ {after!r} должен быть больше {before!r}")
+
+    # Ключи читаются как дробная часть числа в системе счисления RANK_BASE
+    prefix = []
+    index = 0
+    while True:
+        low = RANK_DIGITS.index(before[index]) if index < len(before) else 0
+        high = (
+            RANK_DIGITS.index(after[index])
+            if after is not None and index < len(after)
+            else RANK_BASE
+        )
+        if high - low > 1:
+            prefix.append(RANK_DIGITS[(low + high) // 2])
+            return "".join(prefix)
+        prefix.append(RANK_DIGITS[low])
+        if high > low:
+            # Между соседними цифрами места нет, дальше ограничены только снизу
+            after = None
+        index += 1
+
+
+def spread_ranks(count: int) -> list:
+    """
+    Get count evenly spaced rank keys of the shortest length that fits them.
+    """
+    width = 1
+    while RANK_BASE**width <= count:
+        width += 1
+    step = RANK_BASE**width // (count + 1)
+
+    ranks = []
+    for position in range(1, count + 1):
+        value = step * position
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, RANK_BASE)
+            digits.append(RANK_DIGITS[digit])
+        # Хвостовые нули не меняют позицию, но мешали бы вставке перед ключом
+        ranks.append("".join(reversed(digits)).rstrip("0"))
+    return ranks
+
+
+def needs_rebalance(rank: str) -> bool:
+    return len(rank) > RANK_REBALANCE_LENGTH
+
+
+def rebalance_ranks(queryset) -> int:
+    """
+    Rewrite the rank keys of a queryset as evenly spaced short keys, keeping their order.
+    """
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().order_by("rank", "id").only("id", "rank"))
+        changed = []
+        for row, rank in zip(rows, spread_ranks(len(rows))):
+            if row.rank != rank:
+                row.rank = rank
+                changed.append(row)
+        queryset.model.objects.bulk_update(changed, ["rank"], batch_size=RANK_BATCH_SIZE)
+    return len(changed)
@@ -0,0 +1,211 @@
+import re
+
+from django.db import connection, models
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import Client, Order, OrderSearchDocument
+from .normalization import normalize_client_key, normalize_search_text
+
+SEARCH_BATCH_SIZE = 1000
+
+# Минимальная длина токена ngram-парсера MySQL (ngram_token_size по умолчанию)
+NGRAM_TOKEN_SIZE = 2
+
+# Колонки OrderSearchDocument, по которым фильтруют столбцы таблицы заказов
+SEARCH_FILTER_FIELDS = {
+    "client": "client_name",
+    "legal_name": "legal_name",
+    "product": "product_name",
+    "manager": "manager_name",
+    "additional_info": "additional_info",
+}
+
+SEARCH_DOCUMENT_FIELDS = [
+    "client_name",
+    "legal_name",
+    "product_name",
+    "manager_name",
+    "additional_info",
+    "content",
+]
+
+BOOLEAN_OPERATORS = re.compile(r"[+\-<>()~*@]")
+
+CLIENT_LOOKUP_LIMIT = 20
+CLIENT_LOOKUP_MAX_LIMIT = 100
+CLIENT_KEY_FIELDS = ["name_key", "legal_name_key"]
+
+
+class FullTextContains(models.Lookup):
+    """
+    Substring match through the ngram FULLTEXT index on MySQL, LIKE elsewhere.
+    """
+    lookup_name = "ft_contains"
+
+    def phrase(self):
+        return normalize_search_text(BOOLEAN_OPERATORS.sub(" ", str(self.rhs)))
+
+    def as_mysql(self, compiler, connection):
+        phrase = self.phrase()
+        if len(phrase) < NGRAM_TOKEN_SIZE:
+            return self.as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        return f"MATCH ({lhs}) AGAINST (%s IN BOOLEAN MODE)", [*lhs_params, f'"{phrase}"']
+
+    def as_sql(self, compiler, connection):
+        # Текст документа уже в нижнем регистре, поэтому хватает icontains бэкенда
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        pattern = "%" + connection.ops.prep_for_like_query(self.phrase()) + "%"
+        return f"{lhs} {connection.operators['icontains'] % '%s'}", [*lhs_params, pattern]
+
+
+for field_name in SEARCH_DOCUMENT_FIELDS:
+    OrderSearchDocument._meta.get_field(field_name).register_lookup(FullTextContains)
+
+
+def search_document_values(order) -> dict:
+    """
+    Get normalized search document values of an order with related rows loaded.
+    """
+    client = order.client
+    manager = order.manager
+    product = order.product
+
+    client_name = normalize_search_text(client.name if client else "")
+    legal_name = normalize_search_text(client.legal_name if client else "")
+    product_name = normalize_search_text(product.name if product else "")
+    manager_name = normalize_search_text(
+        *((manager.last_name, manager.first_name, manager.username) if manager else ())
+    )
+    additional_info = normalize_search_text(order.additional_info)
+
+    return {
+        "order_id": order.id,
+        "client_name": client_name[:255],
+        "legal_name": legal_name[:255],
+        "product_name": product_name[:255],
+        "manager_name": manager_name[:255],
+        "additional_info": additional_info,
+        "content": normalize_search_text(
+            order.id, client_name, legal_name, product_name, manager_name, order.comment, additional_info
+        ),
+    }
+
+
+def refresh_order_search_documents(orders=None) -> int:
+    """
+    Rebuild search documents of the orders, all orders when none are given.
+    """
+    if orders is None:
+        orders = Order.objects.all()
+    orders = orders.select_related("client", "product", "manager").order_by("id")
+
+    count = 0
+    batch = []
+    for order in orders.iterator(chunk_size=SEARCH_BATCH_SIZE):
+        batch.append(OrderSearchDocument(**search_document_values(order)))
+        if len(batch) >= SEARCH_BATCH_SIZE:
+            count += save_search_documents(batch)
+            batch = []
+    if batch:
+        count += save_search_documents(batch)
+    return count
+
+
+def save_search_documents(documents) -> int:
+    # MySQL обновляет конфликт по любому уникальному ключу и не принимает unique_fields
+    unique_fields = ["order"] if connection.features.supports_update_conflicts_with_target else None
+    OrderSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=SEARCH_DOCUMENT_FIELDS + ["updated_at"],
+    )
+    return len(documents)
+
+
+def search_filter_q(key, value):
+    """
+    Get a search document predicate for a text column filter of the orders table.
+    """
+    field = SEARCH_FILTER_FIELDS.get(key)
+    if not field:
+        return None
+    return Q(**{f"search_document__{field}__ft_contains": value})
+
+
+def client_search_q(query):
+    """
+    Get a substring predicate over client search keys and INN.
+    """
+    key = normalize_client_key(query)
+    q = Q(name_key__icontains=key) | Q(legal_name_key__icontains=key)
+    digits = query.strip()
+    if digits.isdigit():
+        q |= Q(inn__startswith=digits)
+    return q
+
+
+def search_clients(query, limit=CLIENT_LOOKUP_LIMIT) -> list:
+    """
+    Get top clients for a typeahead query, prefix matches first, then substring matches.
+    """
+    key = normalize_client_key(query)
+    clients = Client.objects.all()
+    if not key:
+        return list(clients.order_by("name_key", "id").values("id", "name")[:limit])
+
+    # Префиксный поиск идет по индексам ключей и ИНН, подстрока нужна, только если их мало
+    digits = query.strip()
+    prefix = Q(name_key__istartswith=key) | Q(legal_name_key__istartswith=key)
+    if digits.isdigit():
+        prefix |= Q(inn__startswith=digits)
+    rank = Case(
+        When(Q(name_key=key) | Q(legal_name_key=key), then=Value(0)),
+        When(name_key__istartswith=key, then=Value(1)),
+        When(legal_name_key__istartswith=key, then=Value(2)),
+        default=Value(3),
+        output_field=IntegerField(),
+    )
+    found = list(
+        clients.filter(prefix)
+        .annotate(rank=rank)
+        .order_by("rank", "name_key", "id")
+        .values("id", "name")[:limit]
+    )
+    if len(found) >= limit:
+        return found
+
+    rank = Case(
+        When(name_key__icontains=key, then=Value(4)),
+        default=Value(5),
+        output_field=IntegerField(),
+    )
+    found += (
+        clients.filter(client_search_q(query))
+        .exclude(id__in=[client["id"] for client in found])
+        .annotate(rank=rank)
+        .order_by("rank", "name_key", "id")
+        .values("id", "name")[: limit - len(found)]
+    )
+    return found
+
+
+def refresh_client_search_keys(clients=None) -> int:
+    """
+    Recompute search keys of the clients, all clients when none are given.
+    """
+    if clients is None:
+        clients = Client.objects.all()
+
+    count = 0
+    batch = []
+    for client in clients.only("id", "name", "legal_name").order_by("id").iterator(chunk_size=SEARCH_BATCH_SIZE):
+        client.fill_search_keys()
+        batch.append(client)
+        if len(batch) >= SEARCH_BATCH_SIZE:
+            count += Client.objects.bulk_update(batch, CLIENT_KEY_FIELDS)
+            batch = []
+    if batch:
+        count += Client.objects.bulk_update(batch, CLIENT_KEY_FIELDS)
+    return count
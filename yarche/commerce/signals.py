@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+
+from .models import SALES_DEPARTMENT_NAME, Client, Order, OrderDepartmentWork, OrderWorkStatus, Product, refresh_order_sales_status
+from .search import refresh_order_search_documents
+
+# Поля, из которых собирается OrderSearchDocument
+ORDER_SEARCH_SOURCE_FIELDS = {"client", "product", "manager", "comment", "additional_info"}
+CLIENT_SEARCH_SOURCE_FIELDS = {"name", "legal_name"}
+PRODUCT_SEARCH_SOURCE_FIELDS = {"name"}
+USER_SEARCH_SOURCE_FIELDS = {"first_name", "last_name", "username"}
+
+
+def touches(update_fields, source_fields) -> bool:
+    return update_fields is None or bool(set(update_fields) & source_fields)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, update_fields=None, **kwargs):
+    if touches(update_fields, ORDER_SEARCH_SOURCE_FIELDS):
+        refresh_order_search_documents(Order.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Client)
+def client_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and touches(update_fields, CLIENT_SEARCH_SOURCE_FIELDS):
+        refresh_order_search_documents(Order.objects.filter(client=instance))
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and touches(update_fields, PRODUCT_SEARCH_SOURCE_FIELDS):
+        refresh_order_search_documents(Order.objects.filter(product=instance))
+
+
+@receiver(post_save, sender=User)
+def manager_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login и документы не трогает
+    if not created and touches(update_fields, USER_SEARCH_SOURCE_FIELDS):
+        refresh_order_search_documents(Order.objects.filter(manager=instance))
+
+
+@receiver(post_save, sender=OrderWorkStatus)
+def work_status_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Переименование статуса переносится в копии статуса на заказах
+    if not created and touches(update_fields, {"name"}):
+        Order.objects.filter(sales_status=instance).exclude(sales_status_name=instance.name).update(
+            sales_status_name=instance.name
+        )
+
+
+@receiver(post_delete, sender=OrderDepartmentWork)
+def work_deleted(sender, instance, **kwargs):
+    # Без работы отдела продаж у заказа не остается статуса, копия на заказе сбрасывается
+    if instance.department.name == SALES_DEPARTMENT_NAME:
+        refresh_order_sales_status(Order.objects.filter(pk=instance.order_id))
@@ -481,6 +481,110 @@ const initDatePicker = (inputSelector, iconSelector, defaultDateStr) => {
 	return instance
 }
 
+const DOCUMENT_UPLOAD_URL = `${BASE_URL}documents/upload/`
+const CHUNKED_UPLOAD_URL = `${BASE_URL}documents/uploads/`
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024
+const CHUNKED_UPLOAD_RETRIES = 3
+
+/**
+ * Загружает документ заказа: небольшие файлы одним запросом, крупные по частям с докачкой
+ * @param {FormData} fd - поля формы загрузки вместе с файлом в поле file
+ * @returns {Promise<Response>} ответ сервера с созданным документом или ошибкой
+ */
+async function uploadDocument(fd) {
+	const headers = {
+		'X-CSRFToken': getCSRFToken(),
+		'X-Requested-With': 'XMLHttpRequest',
+	}
+	const file = fd.get('file')
+	if (!file || file.size < CHUNKED_UPLOAD_THRESHOLD) {
+		return fetch(DOCUMENT_UPLOAD_URL, {
+			method: 'POST',
+			headers,
+			credentials: 'same-origin',
+			body: fd,
+		})
+	}
+
+	// Незавершенная загрузка того же файла в тот же заказ продолжается с принятого смещения
+	const resumeKey = `document-upload:${fd.get('order')}:${file.name}:${file.size}`
+	let state = null
+	const savedId = localStorage.getItem(resumeKey)
+	if (savedId) {
+		const resp = await fetch(`${CHUNKED_UPLOAD_URL}${savedId}/`, {
+			headers,
+			credentials: 'same-origin',
+		})
+		if (resp.ok) state = await resp.json()
+		if (!state || state.name !== fd.get('filename')) {
+			state = null
+			localStorage.removeItem(resumeKey)
+		}
+	}
+
+	if (!state) {
+		const initData = new FormData()
+		for (const [key, value] of fd.entries()) {
+			if (key !== 'file') initData.append(key, value)
+		}
+		initData.append('size', file.size)
+		const resp = await fetch(CHUNKED_UPLOAD_URL, {
+			method: 'POST',
+			headers,
+			credentials: 'same-origin',
+			body: initData,
+		})
+		if (!resp.ok) return resp
+		state = await resp.json()
+		localStorage.setItem(resumeKey, state.upload_id)
+	}
+
+	const chunkUrl = `${CHUNKED_UPLOAD_URL}${state.upload_id}/`
+	let offset = state.offset
+	let failures = 0
+	while (offset < file.size) {
+		const end = Math.min(offset + state.chunk_size, file.size)
+		let resp
+		try {
+			resp = await fetch(chunkUrl, {
+				method: 'PUT',
+				headers: {
+					...headers,
+					'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+				},
+				credentials: 'same-origin',
+				body: file.slice(offset, end),
+			})
+		} catch (err) {
+			// Обрыв соединения: узнаем у сервера, сколько успело дойти, и повторяем
+			if (++failures > CHUNKED_UPLOAD_RETRIES) throw err
+			const statusResp = await fetch(chunkUrl, {
+				headers,
+				credentials: 'same-origin',
+			}).catch(() => null)
+			if (statusResp && statusResp.ok) offset = (await statusResp.json()).offset
+			continue
+		}
+
+		const data = await resp.clone().json()
+		if (resp.status === 409 && typeof data.offset === 'number') {
+			offset = data.offset
+			continue
+		}
+		if (!resp.ok) return resp
+		offset = data.offset
+		failures = 0
+	}
+
+	const resp = await fetch(`${chunkUrl}complete/`, {
+		method: 'POST',
+		headers,
+		credentials: 'same-origin',
+	})
+	if (resp.ok) localStorage.removeItem(resumeKey)
+	return resp
+}
+
 /**
  * Перезагружает содержимое файлов заказа в зависимости от viewType
  * @param {string} orderId - ID заказа
@@ -751,15 +855,7 @@ async function reloadOrderFiles(orderId, viewType, documentsContainer) {
 								fd.append('file_type', fileTypeVal)
 								fd.append('filename', finalName)
 
-								const uploadResp = await fetch(`${BASE_URL}documents/upload/`, {
-									method: 'POST',
-									headers: {
-										'X-CSRFToken': getCSRFToken(),
-										'X-Requested-With': 'XMLHttpRequest',
-									},
-									credentials: 'same-origin',
-									body: fd,
-								})
+								const uploadResp = await uploadDocument(fd)
 
 								const payload = await uploadResp.json()
 
@@ -949,15 +1045,7 @@ async function reloadOrderFiles(orderId, viewType, documentsContainer) {
 							fd.append('filename', finalName)
 							fd.append('comment', comment)
 
-							const uploadResp = await fetch(`${BASE_URL}documents/upload/`, {
-								method: 'POST',
-								headers: {
-									'X-CSRFToken': getCSRFToken(),
-									'X-Requested-With': 'XMLHttpRequest',
-								},
-								credentials: 'same-origin',
-								body: fd,
-							})
+							const uploadResp = await uploadDocument(fd)
 
 							const payload = await uploadResp.json()
 
@@ -1372,8 +1460,29 @@ function displayFiles(images, others, container) {
 			card.style.height = '100px'
 
 			const imgElement = document.createElement('img')
-			imgElement.src = img.url
 			imgElement.alt = img.name
+			imgElement.loading = 'lazy'
+			imgElement.decoding = 'async'
+			if (img.thumbnails) {
+				// Миниатюры вместо оригинала: WebP, JPEG для браузеров без WebP
+				const picture = document.createElement('picture')
+				const webpSource = document.createElement('source')
+				webpSource.type = 'image/webp'
+				webpSource.srcset = img.thumbnails.webp.srcset
+				webpSource.sizes = card.style.width
+				picture.appendChild(webpSource)
+				imgElement.src = img.thumbnails.jpg.thumb
+				imgElement.srcset = img.thumbnails.jpg.srcset
+				imgElement.sizes = card.style.width
+				picture.appendChild(imgElement)
+				picture.style.display = 'block'
+				picture.style.width = '100%'
+				picture.style.height = '100%'
+				card.appendChild(picture)
+			} else {
+				imgElement.src = img.url
+				card.appendChild(imgElement)
+			}
 			imgElement.style.width = '100%'
 			imgElement.style.height = '100%'
 			imgElement.style.objectFit = 'contain'
@@ -1392,7 +1501,6 @@ function displayFiles(images, others, container) {
 			nameElement.style.whiteSpace = 'nowrap'
 			nameElement.title = img.name
 
-			card.appendChild(imgElement)
 			card.appendChild(nameElement)
 			imagesRow.appendChild(card)
 		})
@@ -2768,7 +2876,7 @@ function updateDepartmentWorkCardActions(card, dw) {
 }
 
 const WORKS_CLIENTS_LIST_URL = `${BASE_URL}works/clients/list/`
-const WORKS_CLIENT_TREE_URL = `${BASE_URL}works/client-tree/`
+const WORKS_TREE_URL = `${BASE_URL}works/tree/`
 const WORKS_OBJECT_PRODUCTS_URL = `${BASE_URL}works/object-products/`
 
 const WORKS_ORDER_TABLE_COLUMNS = [
@@ -2909,7 +3017,17 @@ async function loadWorksClientTree(clientId, details) {
 	const loader = createLoader()
 	document.body.appendChild(loader)
 	try {
-		const resp = await fetch(`${WORKS_CLIENT_TREE_URL}?client_id=${clientId}`)
+		// Повторное открытие клиента проверяет ETag и не перерисовывает неизменившееся поддерево
+		const headers = details.dataset.etag
+			? { 'If-None-Match': details.dataset.etag }
+			: {}
+		const resp = await fetch(`${WORKS_TREE_URL}?client_id=${clientId}`, {
+			headers,
+		})
+		if (resp.status === 304) {
+			loader.remove()
+			return
+		}
 		const data = await resp.json()
 		loader.remove()
 
@@ -2920,6 +3038,7 @@ async function loadWorksClientTree(clientId, details) {
 
 		details.innerHTML = data.html
 		details.dataset.loaded = '1'
+		details.dataset.etag = resp.headers.get('ETag') || ''
 
 		const objectsList = details.querySelector('ul')
 		if (objectsList && !details.querySelector('.debtors-search-input')) {
@@ -2942,9 +3061,11 @@ async function handleWorksRowClick(row, orderIdFromQuery) {
 	if (btn) btn.classList.toggle('open')
 	details.classList.toggle('open')
 
-	if (targetId.startsWith('branch-') && !details.dataset.loaded) {
-		const branchClientId = targetId.replace('branch-', '')
-		await loadWorksClientTree(branchClientId, details)
+	if (targetId.startsWith('branch-')) {
+		if (!details.dataset.loaded || details.classList.contains('open')) {
+			const branchClientId = targetId.replace('branch-', '')
+			await loadWorksClientTree(branchClientId, details)
+		}
 		return
 	}
 
@@ -5683,18 +5804,7 @@ function initArchivePage() {
 									fd.append('file_type', fileTypeVal)
 									fd.append('filename', finalName)
 
-									const uploadResp = await fetch(
-										`${BASE_URL}documents/upload/`,
-										{
-											method: 'POST',
-											headers: {
-												'X-CSRFToken': getCSRFToken(),
-												'X-Requested-With': 'XMLHttpRequest',
-											},
-											credentials: 'same-origin',
-											body: fd,
-										},
-									)
+									const uploadResp = await uploadDocument(fd)
 
 									const payload = await uploadResp.json()
 
@@ -6040,11 +6150,16 @@ const initDepartmentPage = departmentSlug => {
 		})
 	}
 
-	const orderIds = JSON.parse(
-		document.getElementById('order-ids').textContent || '[]',
-	)
+	const rowsElement = document.getElementById('department-orders-rows')
+	if (rowsElement) {
+		TableManager.mountVirtualRows(JSON.parse(rowsElement.textContent), tableId)
+	} else {
+		const orderIds = JSON.parse(
+			document.getElementById('order-ids').textContent || '[]',
+		)
 
-	setIds(orderIds, tableId)
+		setIds(orderIds, tableId)
+	}
 
 	const assignExecutorBtn = document.getElementById('assign_executor-button')
 	if (assignExecutorBtn) {
@@ -0,0 +1,68 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+CONTENT_ROOT = "documents"
+HASH_BLOCK_SIZE = 64 * 1024
+
+
+def hash_file(content) -> str:
+    """
+    Get the SHA-256 of a file, reading it in chunks.
+    """
+    hasher = hashlib.sha256()
+    if hasattr(content, "chunks"):
+        for chunk in content.chunks(HASH_BLOCK_SIZE):
+            hasher.update(chunk)
+    else:
+        for block in iter(lambda: content.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+    content.seek(0)
+    return hasher.hexdigest()
+
+
+def content_key(sha256: str, name: str) -> str:
+    """
+    Get the storage key of file content: documents/ab/cd/<sha256><ext>.
+    """
+    # Расширение остается в ключе, чтобы веб-сервер отдавал правильный тип
+    ext = os.path.splitext(name or "")[1].lower()
+    return f"{CONTENT_ROOT}/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def is_content_key(key: str) -> bool:
+    return bool(key) and key.startswith(f"{CONTENT_ROOT}/")
+
+
+def store_content(content, name: str, sha256: str = None) -> tuple:
+    """
+    Store file content under its hash key, once for any number of documents.
+    """
+    sha256 = sha256 or hash_file(content)
+    key = content_key(sha256, name)
+    if not default_storage.exists(key):
+        saved = default_storage.save(key, content)
+        if saved != key:
+            # Такое же содержимое успели сохранить параллельно, копия не нужна
+            default_storage.delete(saved)
+    return key, sha256
+
+
+def move_content(old_key: str, new_key: str):
+    """
+    Move a stored file to a new key, renaming it in place when the storage is on disk.
+    """
+    try:
+        old_path = default_storage.path(old_key)
+        new_path = default_storage.path(new_key)
+    except NotImplementedError:
+        with default_storage.open(old_key, "rb") as f:
+            default_storage.save(new_key, File(f))
+        default_storage.delete(old_key)
+        return
+
+    os.makedirs(os.path.dirname(new_path), exist_ok=True)
+    os.replace(old_path, new_path)
+
@@ -0,0 +1,129 @@
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Document
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+# Размер по длинной стороне: миниатюра для карточек и превью для просмотра
+THUMBNAIL_SIZES = {"thumb": 320, "preview": 1280}
+THUMBNAIL_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+THUMBNAIL_QUALITY = 80
+THUMBNAILS_ROOT = "derivatives"
+THUMBNAILS_BATCH_SIZE = 200
+
+
+def is_image_document(document) -> bool:
+    name = (document.name or getattr(document.file, "name", "") or "").lower()
+    return name.endswith(IMAGE_EXTENSIONS)
+
+
+def thumbnail_name(document_id: int, size: str, fmt: str) -> str:
+    """
+    Get the storage path of a derivative, keyed by document id and size.
+    """
+    return f"{THUMBNAILS_ROOT}/{document_id % 100:02d}/{document_id}/{size}.{fmt}"
+
+
+def thumbnail_url(document, size: str, fmt: str) -> str:
+    """
+    Get the derivative URL: the stored file once generated, the lazy endpoint before that.
+    """
+    if document.thumbnails_at:
+        version = int(document.thumbnails_at.timestamp())
+        return f"{default_storage.url(thumbnail_name(document.id, size, fmt))}?v={version}"
+    return reverse("commerce:document_thumbnail", args=[document.id, size, fmt])
+
+
+def thumbnail_data(document) -> dict:
+    """
+    Get thumbnail, preview and srcset URLs of an image document in every format.
+    """
+    data = {}
+    for fmt in THUMBNAIL_FORMATS:
+        urls = {size: thumbnail_url(document, size, fmt) for size in THUMBNAIL_SIZES}
+        data[fmt] = {
+            **urls,
+            "srcset": ", ".join(
+                f"{urls[size]} {width}w" for size, width in THUMBNAIL_SIZES.items()
+            ),
+        }
+    return data
+
+
+def _encode_thumbnail(image, fmt: str) -> bytes:
+    if fmt == "jpg" and image.mode != "RGB":
+        # У JPEG нет прозрачности, подкладываем белый фон
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+
+    buffer = io.BytesIO()
+    image.save(buffer, THUMBNAIL_FORMATS[fmt], quality=THUMBNAIL_QUALITY, optimize=fmt == "jpg")
+    return buffer.getvalue()
+
+
+def generate_thumbnails(document) -> bool:
+    """
+    Render and store every derivative of an image document, marking it as ready.
+    """
+    if not document.file or not is_image_document(document):
+        return False
+
+    try:
+        with document.file.open("rb") as source:
+            image = Image.open(source)
+            # Для JPEG декодируем сразу в уменьшенном масштабе, не разворачивая полный снимок
+            image.draft("RGB", (max(THUMBNAIL_SIZES.values()),) * 2)
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+            # Каждый размер уменьшаем из предыдущего, начиная с самого крупного
+            for size, width in sorted(THUMBNAIL_SIZES.items(), key=lambda item: -item[1]):
+                image = image.copy()
+                image.thumbnail((width, width), Image.Resampling.LANCZOS)
+                for fmt in THUMBNAIL_FORMATS:
+                    name = thumbnail_name(document.id, size, fmt)
+                    content = _encode_thumbnail(image, fmt)
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    default_storage.save(name, ContentFile(content))
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        return False
+
+    document.thumbnails_at = timezone.now()
+    Document.objects.filter(pk=document.pk).update(thumbnails_at=document.thumbnails_at)
+    return True
+
+
+def delete_thumbnails(document):
+    for size in THUMBNAIL_SIZES:
+        for fmt in THUMBNAIL_FORMATS:
+            name = thumbnail_name(document.id, size, fmt)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+
+
+def backfill_thumbnails(force: bool = False) -> tuple:
+    """
+    Generate derivatives for image documents that have none yet.
+    """
+    documents = Document.objects.exclude(file="").exclude(file__isnull=True)
+    if not force:
+        documents = documents.filter(thumbnails_at__isnull=True)
+
+    generated = failed = 0
+    for document in documents.order_by("id").iterator(chunk_size=THUMBNAILS_BATCH_SIZE):
+        if not is_image_document(document):
+            continue
+        if generate_thumbnails(document):
+            generated += 1
+        else:
+            failed += 1
+    return generated, failed
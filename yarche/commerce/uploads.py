@@ -0,0 +1,248 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+
+CHUNK_SIZE = 5 * 1024 * 1024
+MAX_UPLOAD_SIZE = 4 * 1024 * 1024 * 1024
+READ_BLOCK_SIZE = 64 * 1024
+STALE_UPLOAD_SECONDS = 24 * 60 * 60
+
+STATE_FILE = "state.json"
+DATA_FILE = "data.part"
+
+# Сигнатуры начала файла для определения типа по содержимому
+FILE_SIGNATURES = (
+    (b"%PDF", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"Rar!\x1a\x07", "application/x-rar-compressed"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"AC10", "image/vnd.dwg"),
+)
+SIGNATURE_LENGTH = max(len(signature) for signature, _ in FILE_SIGNATURES)
+
+# Хэши загрузок этого процесса: следующая часть продолжает хэш без перечитывания файла.
+# Часть, попавшая в другой воркер, хэш не считает, его один раз досчитает complete_upload
+_hashers = {}
+MAX_CACHED_HASHERS = 32
+
+
+class ChunkedUploadError(Exception):
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class AssembledFile(File):
+    """
+    Assembled upload that storages move into place instead of copying.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def upload_root() -> str:
+    return settings.CHUNKED_UPLOAD_DIR
+
+
+def _upload_dir(upload_id: str) -> str:
+    try:
+        upload_id = uuid.UUID(str(upload_id)).hex
+    except ValueError:
+        raise ChunkedUploadError("Загрузка не найдена", status=404)
+    return os.path.join(upload_root(), upload_id)
+
+
+def detect_content_type(head: bytes) -> str:
+    """
+    Detect a file type from its first bytes.
+    """
+    for signature, content_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[4:12] in (b"ftypheic", b"ftypmif1"):
+        return "image/heic"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return ""
+
+
+def sniff_content_type(fileobj) -> str:
+    """
+    Detect the type of an uploaded file reading only its first bytes.
+    """
+    head = fileobj.read(SIGNATURE_LENGTH + 8)
+    fileobj.seek(0)
+    return detect_content_type(head)
+
+
+def create_upload(user_id: int, size: int, metadata: dict) -> dict:
+    """
+    Start a chunked upload and store its state on disk.
+    """
+    if size <= 0:
+        raise ChunkedUploadError("Не указан размер файла")
+    if size > MAX_UPLOAD_SIZE:
+        raise ChunkedUploadError("Файл слишком большой")
+
+    upload_id = uuid.uuid4().hex
+    path = _upload_dir(upload_id)
+    os.makedirs(path)
+    open(os.path.join(path, DATA_FILE), "wb").close()
+
+    state = {
+        "upload_id": upload_id,
+        "user_id": user_id,
+        "size": size,
+        "chunk_size": CHUNK_SIZE,
+        "content_type": "",
+        "metadata": metadata,
+    }
+    _write_state(path, state)
+    return dict(state, offset=0)
+
+
+def _write_state(path: str, state: dict):
+    tmp_path = os.path.join(path, STATE_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(path, STATE_FILE))
+
+
+def get_upload(upload_id: str, user_id: int) -> dict:
+    """
+    Read an upload state with the offset of data received so far.
+    """
+    path = _upload_dir(upload_id)
+    try:
+        with open(os.path.join(path, STATE_FILE), encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        raise ChunkedUploadError("Загрузка не найдена", status=404)
+    if state["user_id"] != user_id:
+        raise ChunkedUploadError("Загрузка не найдена", status=404)
+
+    # Принятый объем определяется по файлу на диске, поэтому докачка переживает перезапуск
+    state["offset"] = os.path.getsize(os.path.join(path, DATA_FILE))
+    return state
+
+
+def _cached_hasher(upload_id: str, offset: int):
+    cached = _hashers.pop(upload_id, None)
+    if cached and cached[0] == offset:
+        return cached[1]
+    return None
+
+
+def _cache_hasher(upload_id: str, offset: int, hasher):
+    while len(_hashers) >= MAX_CACHED_HASHERS:
+        # Брошенные загрузки не копятся в долгоживущем воркере
+        _hashers.pop(next(iter(_hashers)))
+    _hashers[upload_id] = (offset, hasher)
+
+
+def hash_upload_file(data_path: str):
+    hasher = hashlib.sha256()
+    with open(data_path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher
+
+
+def append_chunk(upload_id: str, user_id: int, offset: int, stream, length: int) -> dict:
+    """
+    Append a chunk read from a stream at the given offset, hashing it on the way.
+    """
+    state = get_upload(upload_id, user_id)
+    path = _upload_dir(upload_id)
+    data_path = os.path.join(path, DATA_FILE)
+
+    with open(data_path, "ab") as f:
+        # Параллельные запросы одной загрузки пишут по очереди
+        fcntl.flock(f, fcntl.LOCK_EX)
+        received = os.path.getsize(data_path)
+        if offset != received:
+            raise ChunkedUploadError("Неверное смещение части файла", status=409, offset=received)
+        if length <= 0 or received + length > state["size"]:
+            raise ChunkedUploadError("Неверный размер части файла", offset=received)
+
+        hasher = _cached_hasher(state["upload_id"], received)
+        if hasher is None and received == 0:
+            hasher = hashlib.sha256()
+        remaining = length
+        while remaining > 0:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            if received == 0 and not state["content_type"]:
+                state["content_type"] = detect_content_type(block[: SIGNATURE_LENGTH + 8])
+                _write_state(path, state)
+            f.write(block)
+            if hasher is not None:
+                hasher.update(block)
+            received += len(block)
+            remaining -= len(block)
+        f.flush()
+        if hasher is not None:
+            _cache_hasher(state["upload_id"], received, hasher)
+
+    state["offset"] = received
+    return state
+
+
+def complete_upload(upload_id: str, user_id: int) -> tuple:
+    """
+    Check that every byte arrived and open the assembled file with its SHA-256.
+    """
+    state = get_upload(upload_id, user_id)
+    if state["offset"] != state["size"]:
+        raise ChunkedUploadError("Файл загружен не полностью", status=409, offset=state["offset"])
+
+    data_path = os.path.join(_upload_dir(upload_id), DATA_FILE)
+    hasher = _cached_hasher(state["upload_id"], state["offset"]) or hash_upload_file(data_path)
+    state["sha256"] = hasher.hexdigest()
+    return state, AssembledFile(open(data_path, "rb"), name=state["metadata"].get("name"))
+
+
+def discard_upload(upload_id: str):
+    path = _upload_dir(upload_id)
+    _hashers.pop(os.path.basename(path), None)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def delete_stale_uploads(max_age: int = STALE_UPLOAD_SECONDS) -> int:
+    """
+    Remove uploads that have not received data for longer than max_age seconds.
+    """
+    root = upload_root()
+    if not os.path.isdir(root):
+        return 0
+
+    deleted = 0
+    deadline = time.time() - max_age
+    for entry in os.scandir(root):
+        if not entry.is_dir():
+            continue
+        data_path = os.path.join(entry.path, DATA_FILE)
+        try:
+            modified = os.path.getmtime(data_path)
+        except FileNotFoundError:
+            modified = entry.stat().st_mtime
+        if modified < deadline:
+            discard_upload(entry.name)
+            deleted += 1
+    return deleted
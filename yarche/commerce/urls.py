@@ -7,18 +7,20 @@ urlpatterns = [
     path("products/list/", views.product_list, name="product_list"),
 	path("orders/", views.orders, name="orders"),
 	path("orders/list/paginate/", views.orders_paginate, name="orders_paginate"),
+	path("orders/export/", views.orders_export, name="orders_export"),
     path("orders/<int:pk>/debt/", views.order_debt, name="order_debt"),
     path("orders/ids/", views.order_ids, name="order_ids"),
 	path("orders/statuses/", views.order_statuses, name="order_statuses"),
 	path("orders/<int:pk>/", views.order_detail, name="order_detail"),
 	path("orders/add/", views.order_create, name="order_add"),
+	path("orders/bulk_add/", views.order_bulk_create, name="order_bulk_add"),
 	path("orders/edit/<int:pk>/", views.order_update, name="order_edit"),
 	path("orders/status/edit/<int:pk>/", views.order_update_status, name="order_update_status"),
 	path("orders/archive/<int:pk>/", views.order_archive, name="order_archive"),
 	path("orders/delete/<int:pk>/", views.order_delete, name="order_delete"),
 	path("works/", views.works, name="works"),
 	path("works/clients/list/", views.works_clients_list, name="works_clients_list"),
-	path("works/client-tree/", views.works_client_tree, name="works_client_tree"),
+	path("works/tree/", views.works_tree, name="works_tree"),
 	path("works/object-products/", views.works_object_products, name="works_object_products"),
 	path("product_orders/", views.product_orders, name="product_orders"),
 	path("product_orders_without_object/", views.product_orders_without_object, name="product_orders_without_object"),
@@ -47,8 +49,12 @@ urlpatterns = [
 	path("documents/table/<int:pk>/", views.order_documents_table, name="order_documents_table"),
 	path("documents/by-name/", views.document_detail_by_name, name="document_detail_by_name"),
 	path("documents/upload/", views.document_upload, name="document_upload"),
+	path("documents/uploads/", views.document_upload_init, name="document_upload_init"),
+	path("documents/uploads/<str:upload_id>/", views.document_upload_chunk, name="document_upload_chunk"),
+	path("documents/uploads/<str:upload_id>/complete/", views.document_upload_complete, name="document_upload_complete"),
 	path("documents/rename/<int:pk>/", views.document_rename, name="document_rename"),
 	path("documents/delete/<int:pk>/", views.document_delete, name="document_delete"),
+	path("documents/<int:pk>/thumbnails/<slug:size>.<slug:fmt>", views.document_thumbnail, name="document_thumbnail"),
 	path("clients/objects/<int:pk>/", views.client_object_detail, name="client_object_detail"),
 	path("clients/objects/add/", views.client_object_create, name="client_object_add"),
 	path("clients/objects/edit/<int:pk>/", views.client_object_update, name="client_object_edit"),
@@ -63,6 +69,7 @@ urlpatterns = [
 	path('kanban/quick_add_client/', views.kanban_quick_add_client, name='kanban_quick_add_client'),
 	path('kanban/delete_column/<int:pk>/', views.kanban_delete_column, name='kanban_delete_column'),
 	path("kanban/create_column/", views.kanban_create_column, name="kanban_create_column"),
+	path("kanban/columns/<int:pk>/clients/", views.kanban_column_clients, name="kanban_column_clients"),
 
 	path("order/<int:order_id>/files/cards/", views.order_files_cards, name="order_file_cards"),
 
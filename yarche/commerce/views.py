@@ -1,5 +1,5 @@
 from django.db import models
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseRedirect, JsonResponse
 from django.forms.models import model_to_dict
 from django.core.exceptions import FieldError
 from django.db.models import (
@@ -12,27 +12,36 @@ from django.db.models import (
     Subquery,
     ExpressionWrapper,
     Value,
-    Func,
-    Prefetch,
+    Count,
+    Exists,
+    Window,
 )
 import locale
 import datetime
 import re
+from decimal import Decimal, InvalidOperation
 import io
 import zipfile
 from django.apps import apps
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.paginator import Paginator
-from django.db.models.functions import Coalesce, Cast, NullIf
+from django.db.models.functions import Coalesce, Cast, Concat, Length, RowNumber
 from django.template.loader import render_to_string
+from yarche.pagination import KeysetPaginator
+from yarche.exports import export_response, get_export_format, iter_keyset_rows
+from yarche.tables import render_table_row, render_table_rows, rows_response, wants_rows
 from yarche.utils import get_model_fields
 from django.contrib.auth.decorators import login_required
-from .models import Product, Client, Order, Contact, FileType, Document, ClientObject, OrderDepartmentWork, OrderDepartmentWorkMessage, KanbanClientPlacement, KanbanColumn, OrderWorkStatus, EmergencyIncident, Department, ManagerNote, SALES_DEPARTMENT_NAME, ensure_sales_department_work
+from .models import Product, Client, Order, Contact, FileType, Document, ClientObject, OrderDepartmentWork, OrderDepartmentWorkMessage, KanbanClientPlacement, KanbanColumn, OrderWorkStatus, EmergencyIncident, Department, ManagerNote, SALES_DEPARTMENT_NAME, ensure_sales_department_work, get_order_work_routing, build_order_department_works, sync_order_sales_status
 from ledger.models import Transaction, BankAccount
 from django.shortcuts import render, get_object_or_404
 from django.views.decorators.http import require_http_methods, require_POST
+import hashlib
 import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
 from users.models import User, Notification, UserType
+from users.permissions import MANAGER_USER_TYPE_NAME, is_admin, is_manager
 import os
 from django.utils.timezone import localtime
 from django.utils.text import get_valid_filename
@@ -42,6 +51,10 @@ from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 from xml.sax.saxutils import escape
 from commerce.note_notifications import create_due_notification_for_note
+from commerce.ranking import RANK_MAX_LENGTH, rank_between, rebalance_ranks, spread_ranks
+from commerce.uploads import ChunkedUploadError, append_chunk, complete_upload, create_upload, discard_upload, get_upload, sniff_content_type
+from commerce.thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_SIZES, delete_thumbnails, generate_thumbnails, is_image_document, thumbnail_data, thumbnail_name
+from commerce.search import CLIENT_LOOKUP_LIMIT, CLIENT_LOOKUP_MAX_LIMIT, client_search_q, refresh_order_search_documents, search_clients, search_filter_q
 
 locale.setlocale(locale.LC_ALL, "ru_RU.UTF-8")
 CURRENCY_SUFFIX = " р."
@@ -49,78 +62,59 @@ DEFAULT_VALUE = f"0{CURRENCY_SUFFIX}"
 
 # region Helpers
 def get_base_order_queryset():
-    transactions_sum = (
-        Transaction.objects.filter(
-            order_id=OuterRef("pk"),
-            type__in=["order_payment", "client_account_payment"],
-        )
-        .annotate(
-            adjusted_amount=Case(
-                When(type="client_account_payment", then=-F("amount")),
-                default=F("amount"),
-                output_field=models.DecimalField(max_digits=12, decimal_places=2),
-            )
-        )
-        .values("order_id")
-        .annotate(total_transactions=Sum("adjusted_amount"))
-        .values("total_transactions")
-    )
-
-    paid_plus_transactions = ExpressionWrapper(
-        F("paid_amount") + Coalesce(F("transactions_total"), 0),
-        output_field=models.DecimalField(max_digits=12, decimal_places=2),
-    )
-
+    # Платежи открытых смен хранятся в счетчиках заказа, подзапрос по транзакциям не нужен
     return Order.objects.annotate(
-        transactions_total=Subquery(
-            transactions_sum,
-            output_field=models.DecimalField(max_digits=12, decimal_places=2),
-        ),
-        total_paid=paid_plus_transactions,
-        remaining=ExpressionWrapper(
-            F("amount") - paid_plus_transactions,
+        total_paid=ExpressionWrapper(
+            F("paid_amount") + F("pending_payment_total"),
             output_field=models.DecimalField(max_digits=12, decimal_places=2),
         ),
+        remaining=F("remaining_debt"),
     )
 
 
-def get_client_balance_data(request):
-    first_deposit_subquery = (
-        Transaction.objects.filter(
-            type="client_account_deposit", client=OuterRef("client")
+def get_client_balances_queryset(request):
+    """
+    Annotate clients with pending balance movements, first deposit account and total balance.
+    """
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def pending_total(transaction_type):
+        totals = (
+            Transaction.objects.filter(
+                client=OuterRef("pk"),
+                type=transaction_type,
+                completed_date__isnull=True,
+                created_by=request.user,
+            )
+            .values("client")
+            .annotate(total=Sum("amount"))
+            .values("total")
         )
-        .order_by("created")
-        .values("created")[:1]
-    )
+        return Coalesce(Subquery(totals, output_field=money), Value(0), output_field=money)
 
-    first_deposits = dict(
-        Transaction.objects.filter(
-            type="client_account_deposit", created=Subquery(first_deposit_subquery)
-        ).values_list("client", "bank_account")
+    first_deposit_account = (
+        Transaction.objects.filter(type="client_account_deposit", client=OuterRef("pk"))
+        .order_by("created", "id")
+        .values("bank_account__name")[:1]
     )
-
-    transactions = (
-        Transaction.objects.filter(
-            type__in=["client_account_deposit", "client_account_payment"],
-            completed_date__isnull=True,
-            created_by=request.user,
-        )
-        .values("client", "type")
-        .annotate(total=Sum("amount"))
+    # Без пополнений счетом клиента считается первый счет по порядку
+    default_account = BankAccount.objects.order_by("id").values("name")[:1]
+
+    return Client.objects.annotate(
+        pending_deposits=pending_total("client_account_deposit"),
+        pending_payments=pending_total("client_account_payment"),
+        bank_account_name=Coalesce(
+            Subquery(first_deposit_account),
+            Subquery(default_account),
+            Value(""),
+            output_field=models.CharField(),
+        ),
+        total_balance=ExpressionWrapper(
+            F("balance") + F("pending_deposits") + F("pending_payments"),
+            output_field=money,
+        ),
     )
 
-    deposits = {}
-    payments = {}
-    for t in transactions:
-        if t["type"] == "client_account_deposit":
-            deposits[t["client"]] = t["total"]
-        else:
-            payments[t["client"]] = t["total"]
-
-    bank_accounts = dict(BankAccount.objects.values_list("id", "name"))
-
-    return deposits, payments, first_deposits, bank_accounts
-
 
 def parse_filters_from_request(request):
     raw_filters = request.GET.get("filters")
@@ -235,34 +229,89 @@ def apply_clients_filters(queryset, filters):
     return annotated_qs.filter(q)
 
 
+NUMBER_FILTER_OPERATORS = {
+    ">=": "gte",
+    "<=": "lte",
+    ">": "gt",
+    "<": "lt",
+    "=": "exact",
+}
+
+
+def parse_number_filter_value(value):
+    """
+    Split a numeric column filter into a lookup and a Decimal, e.g. ">=1 000 р.".
+    """
+    normalized = (
+        str(value or "")
+        .replace("р.", "")
+        .replace("%", "")
+        .replace(" ", "")
+        .replace("\xa0", "")
+        .replace(",", ".")
+    )
+    lookup = "exact"
+    for operator, operator_lookup in NUMBER_FILTER_OPERATORS.items():
+        if normalized.startswith(operator):
+            lookup = operator_lookup
+            normalized = normalized[len(operator):]
+            break
+
+    try:
+        return lookup, Decimal(normalized)
+    except (InvalidOperation, ValueError):
+        return lookup, None
+
+
+def build_number_filter_q(field_name, value):
+    lookup, number = parse_number_filter_value(value)
+    if number is None:
+        return Q(pk__in=[])
+    return Q(**{f"{field_name}__{lookup}": number})
+
+
+def build_date_range_q(field_name, value):
+    """
+    Map a date column filter to a half-open datetime range on the raw column.
+    """
+    value = (str(value or "")).strip()
+    if not value:
+        return None
+
+    start = end = None
+    parsed_date = parse_date_filter_value(value)
+    if parsed_date:
+        start = parsed_date
+        end = parsed_date + datetime.timedelta(days=1)
+    elif re.fullmatch(r"\d{1,2}[./-]\d{4}", value):
+        month, year = map(int, re.split(r"[./-]", value))
+        if 1 <= month <= 12:
+            start = datetime.date(year, month, 1)
+            end = datetime.date(year + month // 12, month % 12 + 1, 1)
+    elif re.fullmatch(r"\d{4}", value):
+        start = datetime.date(int(value), 1, 1)
+        end = datetime.date(int(value) + 1, 1, 1)
+
+    if start is None:
+        # Неполная дата без года не сводится к диапазону
+        return build_date_filter_q(field_name, value)
+
+    tz = timezone.get_current_timezone()
+    return Q(
+        **{
+            f"{field_name}__gte": datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+            f"{field_name}__lt": datetime.datetime.combine(end, datetime.time.min, tzinfo=tz),
+        }
+    )
+
+
 def apply_orders_filters(queryset, filters):
+    """
+    Filter orders by table column filters using typed predicates and the search index.
+    """
     if not filters:
         return queryset
 
-    annotated_qs = queryset.annotate(
-        id_text=Cast("id", models.CharField()),
-        amount_text=Cast("amount", models.CharField()),
-        paid_amount_text=Cast("paid_amount", models.CharField()),
-        created_filter_date=Cast("created", models.DateField()),
-        deadline_filter_date=Cast("deadline", models.DateField()),
-        archived_at_filter_date=Cast("archived_at", models.DateField()),
-        created_date_str=Func("created_filter_date", Value("%d.%m.%Y"), function="DATE_FORMAT", output_field=models.CharField()),
-        deadline_date_str=Func("deadline_filter_date", Value("%d.%m.%Y"), function="DATE_FORMAT", output_field=models.CharField()),
-        archived_at_date_str=Func("archived_at_filter_date", Value("%d.%m.%Y"), function="DATE_FORMAT", output_field=models.CharField()),
-        paid_percent_value=Case(
-            When(
-                amount__gt=0,
-                then=ExpressionWrapper(
-                    F("paid_amount") * Value(100.0) / F("amount"),
-                    output_field=models.FloatField(),
-                ),
-            ),
-            default=Value(0.0),
-            output_field=models.FloatField(),
-        ),
-        paid_percent_text=Cast("paid_percent_value", models.CharField()),
-    )
-
     q = Q()
     for key, raw_value in filters.items():
         value = (str(raw_value or "")).strip()
@@ -270,80 +319,33 @@ def apply_orders_filters(queryset, filters):
             continue
 
         if key == "id":
-            q &= Q(id_text__icontains=value)
+            q &= Q(id=int(value)) if value.isdigit() else Q(pk__in=[])
             continue
 
         if key == "status":
-            q &= Q(
-                department_works__department__name=SALES_DEPARTMENT_NAME,
-                department_works__status__name__icontains=value,
-            )
-            continue
-
-        if key == "manager":
-            q &= (
-                Q(manager__first_name__icontains=value)
-                | Q(manager__last_name__icontains=value)
-                | Q(manager__username__icontains=value)
-            )
-            continue
-
-        if key == "client":
-            q &= Q(client__name__icontains=value)
-            continue
-
-        if key == "legal_name":
-            q &= Q(client__legal_name__icontains=value)
+            q &= Q(sales_status_name__icontains=value)
             continue
 
-        if key == "product":
-            q &= Q(product__name__icontains=value)
+        search_q = search_filter_q(key, value)
+        if search_q is not None:
+            q &= search_q
             continue
 
         if key in {"amount", "paid_amount", "paid_percent"}:
-            normalized = (
-                value.replace("р.", "")
-                .replace("%", "")
-                .replace(" ", "")
-                .replace(",", ".")
-            )
-            if key == "amount":
-                q &= Q(amount_text__icontains=normalized)
-            elif key == "paid_amount":
-                q &= Q(paid_amount_text__icontains=normalized)
-            else:
-                q &= Q(paid_percent_text__icontains=normalized)
+            q &= build_number_filter_q(key, value)
             continue
 
         if key in {"created", "deadline", "archived_at"}:
-            date_str_field_map = {
-                "created": "created_date_str",
-                "deadline": "deadline_date_str",
-                "archived_at": "archived_at_date_str",
-            }
-            q &= Q(**{f"{date_str_field_map[key]}__icontains": value})
+            date_q = build_date_range_q(key, value)
+            q &= date_q if date_q is not None else Q(pk__in=[])
             continue
 
-        if key == "additional_info":
-            q &= Q(additional_info__icontains=value)
-
     try:
-        return annotated_qs.filter(q).distinct()
+        return queryset.filter(q)
     except FieldError:
         return queryset
 
 
-def prefetch_sales_department_works(queryset):
-    return queryset.prefetch_related(
-        Prefetch(
-            "department_works",
-            queryset=OrderDepartmentWork.objects.filter(
-                department__name=SALES_DEPARTMENT_NAME
-            ).select_related("status"),
-            to_attr="sales_department_works_list",
-        )
-    )
-
 def render_client_table(clients):
     excluded_fields = [
         "id",
@@ -357,6 +359,8 @@ def render_client_table(clients):
         "actual_address",
         "bank_account",
         "balance",
+        "name_key",
+        "legal_name_key",
     ]
 
     fields = get_model_fields(
@@ -509,7 +513,22 @@ def document_types(request):
     return entity_list(request, FileType, queryset=queryset)
 
 def client_list(request):
-    return entity_list(request, Client)
+    # Без параметров поиска отдается полный список, как у остальных справочников
+    if not {"q", "id", "limit"} & set(request.GET):
+        return entity_list(request, Client)
+
+    client_id = request.GET.get("id")
+    if client_id is not None:
+        queryset = Client.objects.filter(id=client_id) if client_id.isdigit() else Client.objects.none()
+        return entity_list(request, Client, queryset=queryset)
+
+    try:
+        limit = int(request.GET.get("limit") or CLIENT_LOOKUP_LIMIT)
+    except ValueError:
+        limit = CLIENT_LOOKUP_LIMIT
+    limit = min(max(limit, 1), CLIENT_LOOKUP_MAX_LIMIT)
+
+    return JsonResponse(search_clients(request.GET.get("q") or "", limit), safe=False)
 
 def client_objects_list(request):
 	client_id = request.GET.get("client_id")
@@ -524,27 +543,8 @@ def client_objects_list(request):
 
 def order_debt(request, pk):
     try:
-        order = Order.objects.get(pk=pk)
-        transactions_sum = (
-            Transaction.objects.filter(
-                order_id=pk,
-                type__in=["order_payment", "client_account_payment"],
-                completed_date__isnull=True,
-                created_by=request.user,  
-            )
-            .annotate(
-                adjusted_amount=Case(
-                    When(type="client_account_payment", then=-F("amount")),
-                    default=F("amount"),
-                    output_field=models.DecimalField(max_digits=12, decimal_places=2),
-                )
-            )
-            .aggregate(total=Sum("adjusted_amount"))["total"]
-            or 0
-        )
-
-        debt = order.amount - order.paid_amount - transactions_sum
-        return JsonResponse({"debt": debt})
+        order = Order.objects.only("remaining_debt").get(pk=pk)
+        return JsonResponse({"debt": order.remaining_debt})
 
     except Order.DoesNotExist:
         return JsonResponse(
@@ -597,38 +597,35 @@ def order_ids(request):
     return JsonResponse([{"id": oid, "name": oid} for oid in order_ids], safe=False)
 
 def client_balances(request):
-    deposits, payments, first_deposits, bank_accounts = get_client_balance_data(request)
-    client_id_param = request.GET.get("client")
-
-    clients = []
-    for client in Client.objects.prefetch_related("transaction_set").all():
-        deposit_sum = deposits.get(client.id, 0)
-        payment_sum = payments.get(client.id, 0)
-        total_balance = client.balance + deposit_sum + payment_sum
-
-        if (
-            total_balance == 0
-            and str(client.id) != client_id_param
-            and str(client.name) != client_id_param
-        ):
-            continue
-
-        bank_account_id = first_deposits.get(client.id)
-        if not bank_account_id:
-            bank_account_id = (
-                BankAccount.objects.order_by("id").values_list("id", flat=True).first()
-            )
-
-        client.bank_account_name = bank_accounts.get(bank_account_id, "")
-        client.total_balance = total_balance
-        clients.append(client)
-
-    return JsonResponse(
-        {
-            "html": render_client_table(clients),
-            "ids": [{"id": c.id, "name": c.name} for c in clients],
+    client_id_param = (request.GET.get("client") or "").strip()
+
+    # Нулевые балансы скрываются, кроме явно запрошенного клиента
+    keep = ~Q(total_balance=0)
+    if client_id_param:
+        keep |= Q(name=client_id_param)
+        if client_id_param.isdigit():
+            keep |= Q(id=int(client_id_param))
+
+    clients = get_client_balances_queryset(request).filter(keep).order_by("id")
+
+    context = None
+    if "page" in request.GET:
+        paginator = Paginator(clients, 25)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        clients = page_obj.object_list
+        context = {
+            "total_pages": paginator.num_pages,
+            "current_page": page_obj.number,
         }
-    )
+    clients = list(clients)
+
+    response = {
+        "html": render_client_table(clients),
+        "ids": [{"id": c.id, "name": c.name} for c in clients],
+    }
+    if context is not None:
+        response["context"] = context
+    return JsonResponse(response)
 
 
 # endregion
@@ -640,21 +637,82 @@ def _works_client_display_name(client):
     return client.legal_name or client.name
 
 
-def _get_no_object_products_for_client(client_id):
+def _works_visible_orders(user):
+    """
+    Get non-archived orders shown on the works page to the user.
+    """
+    # Заказы объектов видны как в product_orders: менеджеру и доп. пользователям
+    viewer = Order.viewers.through.objects.filter(order_id=OuterRef("pk"), user_id=user.id)
+    return Order.objects.filter(archived_at__isnull=True).filter(
+        Q(client_object__isnull=True) | Q(manager=user) | Exists(viewer)
+    )
+
+
+def _works_node(node_id, name):
+    return {"id": node_id, "name": name, "orders_count": 0, "outstanding": Decimal(0)}
+
+
+def _add_works_totals(node, orders_count, outstanding):
+    node["orders_count"] += orders_count
+    node["outstanding"] += outstanding or 0
+
+
+def _iter_works_nodes(tree):
+    yield tree
+    yield from tree["no_object_products"]
+    for obj in tree["objects"]:
+        yield obj
+        yield from obj["products"]
+
+
+def get_works_tree(client, user):
+    """
+    Build the object and product subtree of a client with order counts and outstanding totals.
+    """
     rows = (
-        Order.objects.filter(
-            client_id=client_id,
-            client_object__isnull=True,
-            archived_at__isnull=True,
-        )
-        .values("product_id", "product__name")
-        .distinct()
-        .order_by("product__name")
+        _works_visible_orders(user)
+        .filter(client=client)
+        .values("client_object_id", "product_id", "product__name")
+        .annotate(orders_count=Count("id"), outstanding=Sum("remaining_debt"))
+        .order_by("product__name", "product_id")
     )
-    return [
-        {"product_id": row["product_id"], "product_name": row["product__name"]}
-        for row in rows
-    ]
+
+    tree = _works_node(client.id, _works_client_display_name(client))
+    tree["no_object_products"] = []
+    objects = {}
+    for obj in client.client_objects.all().order_by("name"):
+        objects[obj.id] = _works_node(obj.id, obj.name)
+        objects[obj.id]["products"] = []
+
+    for row in rows:
+        product = _works_node(row["product_id"], row["product__name"])
+        _add_works_totals(product, row["orders_count"], row["outstanding"])
+        _add_works_totals(tree, row["orders_count"], row["outstanding"])
+
+        obj = objects.get(row["client_object_id"])
+        if obj is None:
+            tree["no_object_products"].append(product)
+        else:
+            obj["products"].append(product)
+            _add_works_totals(obj, row["orders_count"], row["outstanding"])
+
+    tree["objects"] = list(objects.values())
+    return tree
+
+
+def works_tree_response(request, payload):
+    """
+    Return a works tree payload with an ETag, or 304 when the client has it already.
+    """
+    content = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    etag = '"%s"' % hashlib.md5(content.encode()).hexdigest()
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(payload)
+    response["ETag"] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 
 @login_required
@@ -676,16 +734,28 @@ def works_clients_list(request):
         except (ValueError, TypeError):
             clients_qs = clients_qs.none()
     elif q:
-        clients_qs = clients_qs.annotate(
-            search_name=Coalesce(NullIf("legal_name", Value("")), "name"),
-        ).filter(search_name__icontains=q)
+        clients_qs = clients_qs.filter(client_search_q(q))
 
     paginator = Paginator(clients_qs, WORKS_CLIENTS_PAGE_SIZE)
     page_obj = paginator.get_page(page)
 
+    clients = list(page_obj.object_list)
+    totals = {
+        row["client_id"]: row
+        for row in _works_visible_orders(request.user)
+        .filter(client_id__in=[client.id for client in clients])
+        .values("client_id")
+        .annotate(orders_count=Count("id"), outstanding=Sum("remaining_debt"))
+        .order_by()
+    }
+    for client in clients:
+        row = totals.get(client.id, {})
+        client.orders_count = row.get("orders_count", 0)
+        client.outstanding_display = format_currency(row.get("outstanding") or 0)
+
     html = render_to_string(
         "commerce/partials/works_client_rows.html",
-        {"clients": page_obj.object_list},
+        {"clients": clients},
     )
 
     return JsonResponse(
@@ -700,7 +770,7 @@ def works_clients_list(request):
 
 
 @login_required
-def works_client_tree(request):
+def works_tree(request):
     client_id = request.GET.get("client_id")
     if not client_id:
         return JsonResponse({"error": "Не указан client_id"}, status=400)
@@ -710,19 +780,15 @@ def works_client_tree(request):
     except (Client.DoesNotExist, ValueError, TypeError):
         return JsonResponse({"error": "Клиент не найден"}, status=404)
 
-    objects = list(client.client_objects.all().order_by("name"))
-    no_object_products = _get_no_object_products_for_client(client.id)
+    tree = get_works_tree(client, request.user)
+    for node in _iter_works_nodes(tree):
+        node["outstanding_display"] = format_currency(node["outstanding"])
 
     html = render_to_string(
-        "commerce/partials/works_client_tree.html",
-        {
-            "client_id": client.id,
-            "objects": objects,
-            "no_object_products": no_object_products,
-        },
+        "commerce/partials/works_tree.html",
+        {"client_id": client.id, "tree": tree},
     )
-
-    return JsonResponse({"html": html})
+    return works_tree_response(request, {"tree": tree, "html": html})
 
 
 @login_required
@@ -733,25 +799,29 @@ def works_object_products(request):
         return JsonResponse({"error": "Не указаны client_id или object_id"}, status=400)
 
     try:
-        client_object = ClientObject.objects.get(
+        client_object = ClientObject.objects.select_related("client").get(
             id=int(object_id),
             client_id=int(client_id),
         )
     except (ClientObject.DoesNotExist, ValueError, TypeError):
         return JsonResponse({"error": "Объект не найден"}, status=404)
 
-    products = Product.objects.all().order_by("name")
+    tree = get_works_tree(client_object.client, request.user)
+    node = next(obj for obj in tree["objects"] if obj["id"] == client_object.id)
+    for product in node["products"]:
+        product["outstanding_display"] = format_currency(product["outstanding"])
 
     html = render_to_string(
         "commerce/partials/works_object_products.html",
         {
             "client_id": client_object.client_id,
             "object_id": client_object.id,
-            "products": products,
+            "products": node["products"],
         },
     )
 
-    return JsonResponse({"html": html})
+    return works_tree_response(request, {"html": html})
+
 
 @login_required
 def product_orders(request):
@@ -759,16 +829,14 @@ def product_orders(request):
     client_id = request.GET.get("client_id")
     object_id = request.GET.get("object_id")
     
-    orders = prefetch_sales_department_works(
-        Order.objects.filter(
-            product_id=product_id,
-            client_id=client_id,
-            client_object_id=object_id,
-            archived_at__isnull=True,
-        ).filter(
-            Q(manager=request.user) | Q(viewers=request.user)
-        ).order_by("-created")
-    )
+    orders = Order.objects.filter(
+        product_id=product_id,
+        client_id=client_id,
+        client_object_id=object_id,
+        archived_at__isnull=True,
+    ).filter(
+        Q(manager=request.user) | Q(viewers=request.user)
+    ).order_by("-created")
     
     fields = [
         {"name": "id", "verbose_name": "Заказ"},
@@ -805,13 +873,11 @@ def all_orders_without_object(request):
     """Загружает ВСЕ заказы без объектов для конкретного клиента"""
     client_id = request.GET.get("client_id")
     
-    orders = prefetch_sales_department_works(
-        Order.objects.filter(
-            client_id=client_id,
-            client_object_id__isnull=True,
-            archived_at__isnull=True,
-        ).select_related('product').order_by("-created")
-    )
+    orders = Order.objects.filter(
+        client_id=client_id,
+        client_object_id__isnull=True,
+        archived_at__isnull=True,
+    ).select_related('product').order_by("-created")
     
     fields = [
         {"name": "id", "verbose_name": "Заказ"},
@@ -848,14 +914,12 @@ def product_orders_without_object(request):
     product_id = request.GET.get("product_id")
     client_id = request.GET.get("client_id")
     
-    orders = prefetch_sales_department_works(
-        Order.objects.filter(
-            product_id=product_id,
-            client_id=client_id,
-            client_object_id__isnull=True,
-            archived_at__isnull=True,
-        ).order_by("-created")
-    )
+    orders = Order.objects.filter(
+        product_id=product_id,
+        client_id=client_id,
+        client_object_id__isnull=True,
+        archived_at__isnull=True,
+    ).order_by("-created")
     
     fields = [
         {"name": "id", "verbose_name": "Заказ"},
@@ -889,7 +953,7 @@ def product_orders_without_object(request):
 
 @login_required
 def orders(request):
-    orders_qs = prefetch_sales_department_works(Order.objects.all().order_by("-created"))
+    orders_qs = Order.objects.all().order_by("-created")
     paginator = Paginator(orders_qs, 25)
     page_obj = paginator.get_page(1)
 
@@ -909,7 +973,7 @@ def orders(request):
 
 @login_required
 def orders_paginate(request):
-    orders_qs = prefetch_sales_department_works(Order.objects.all().order_by("-created"))
+    orders_qs = Order.objects.all().order_by("-created")
     filters = parse_filters_from_request(request)
     orders_qs = apply_orders_filters(orders_qs, filters)
 
@@ -919,23 +983,16 @@ def orders_paginate(request):
 
     fields = get_order_fields()
     page_items = prepare_orders_data(page_obj.object_list)
-    order_ids = [o.id for o in page_items]
-
-    html = "".join(
-        render_to_string("components/table_row.html", {"item": order, "fields": fields})
-        for order in page_items
-    )
+    context = {
+        "total_pages": paginator.num_pages,
+        "current_page": page_obj.number,
+        "order_ids": [o.id for o in page_items],
+    }
+    if wants_rows(request):
+        return rows_response(request, page_items, fields, context)
 
-    return JsonResponse(
-        {
-            "html": html,
-            "context": {
-                "total_pages": paginator.num_pages,
-                "current_page": page_obj.number,
-                "order_ids": order_ids,
-            },
-        }
-    )
+    html = render_table_rows(page_items, fields)
+    return JsonResponse({"html": html, "context": context})
 
 def get_order_fields():
     excluded = [
@@ -951,6 +1008,14 @@ def get_order_fields():
         "archived_at",
         "viewers",
         "required_documents",
+        "pending_payment_total",
+        "settled_payment_total",
+        "remaining_debt",
+        "last_payment_at",
+        "sales_status",
+        "sales_status_name",
+        "paid_percent",
+        "remaining_amount",
     ]
     field_order = [
         "id",
@@ -1000,10 +1065,68 @@ def prepare_orders_data(orders):
     data = []
     for tr in orders:
         tr.legal_name = tr.client.legal_name if tr.client else None
-        tr.paid_percent = int(tr.paid_amount / tr.amount * 100) if tr.amount else 0
         data.append(tr)
     return data
 
+ORDERS_EXPORT_COLUMNS = [
+    ("id", "Заказ"),
+    ("sales_status_name", "Статус"),
+    ("manager__username", "Менеджер"),
+    ("client__name", "Клиент"),
+    ("client__legal_name", "Юрлицо"),
+    ("product__name", "Продукция"),
+    ("amount", "Сумма заказа"),
+    ("created", "Создан"),
+    ("deadline", "Срок сдачи"),
+    ("required_documents", "Документы"),
+    ("paid_amount", "Оплачено"),
+    ("paid_percent", "% Оплаты"),
+    ("remaining", "Остаток"),
+    ("archived_at", "Архив"),
+    ("additional_info", "Доп. инф-я"),
+]
+
+
+def get_orders_export_queryset(request):
+    """
+    Get orders filtered and ordered like the orders tables.
+    """
+    orders_qs = get_base_order_queryset()
+
+    if request.GET.get("archived") == "1":
+        orders_qs = orders_qs.filter(archived_at__isnull=False).order_by("-archived_at", "-id")
+    else:
+        orders_qs = orders_qs.order_by("-created", "-id")
+
+    return apply_orders_filters(orders_qs, parse_filters_from_request(request))
+
+
+@login_required
+@require_http_methods(["GET"])
+def orders_export(request):
+    """
+    Stream all filtered orders as CSV or XLSX.
+    """
+    export_format = get_export_format(request)
+    if not export_format:
+        return JsonResponse(
+            {"status": "error", "message": "Неизвестный формат выгрузки"}, status=400
+        )
+
+    rows = iter_keyset_rows(
+        get_orders_export_queryset(request),
+        [name for name, _ in ORDERS_EXPORT_COLUMNS],
+        "archived_at" if request.GET.get("archived") == "1" else "created",
+    )
+
+    return export_response(
+        export_format,
+        "orders",
+        [verbose_name for _, verbose_name in ORDERS_EXPORT_COLUMNS],
+        rows,
+        sheet_name="Заказы",
+    )
+
 @login_required
 def order_statuses(request):
     department = Department.objects.filter(name=SALES_DEPARTMENT_NAME).first()
@@ -1031,23 +1154,16 @@ def clients_paginate(request):
     paginator = Paginator(clients_qs, 25)
     page_obj = paginator.get_page(page_number)
 
-    client_ids = [c.id for c in page_obj.object_list]
-
-    html = "".join(
-        render_to_string("components/table_row.html", {"item": client, "fields": fields})
-        for client in page_obj.object_list
-    )
+    context = {
+        "total_pages": paginator.num_pages,
+        "current_page": page_obj.number,
+        "client_ids": [c.id for c in page_obj.object_list],
+    }
+    if wants_rows(request):
+        return rows_response(request, page_obj.object_list, fields, context)
 
-    return JsonResponse(
-        {
-            "html": html,
-            "context": {
-                "total_pages": paginator.num_pages,
-                "current_page": page_obj.number,
-                "client_ids": client_ids,
-            },
-        }
-    )
+    html = render_table_rows(page_obj.object_list, fields)
+    return JsonResponse({"html": html, "context": context})
 
 @login_required
 def clients(request):
@@ -1576,21 +1692,16 @@ def orders_archive_paginate(request):
         {"name": "additional_info", "verbose_name": "Доп. инф-я"},
     ]
 
-    html = "".join(
-        render_to_string("components/table_row.html", {"item": order, "fields": fields})
-        for order in data
-    )
+    context = {
+        "total_pages": paginator.num_pages,
+        "current_page": page_obj.number,
+        "order_ids": [o.id for o in data],
+    }
+    if wants_rows(request):
+        return rows_response(request, data, fields, context)
 
-    return JsonResponse(
-        {
-            "html": html,
-            "context": {
-                "total_pages": paginator.num_pages,
-                "current_page": page_obj.number,
-                "order_ids": [o.id for o in data],
-            },
-        }
-    )
+    html = render_table_rows(data, fields)
+    return JsonResponse({"html": html, "context": context})
 
 @login_required
 @require_http_methods(["GET"])
@@ -1730,154 +1841,273 @@ def document_detail_by_name(request):
     )
 
 
+def _normalize_xlsx_upload(uploaded_file, content_type: str):
+    """
+    Turn tab-separated text uploaded under an .xlsx name into a real workbook.
+    """
+    uploaded_name = str(getattr(uploaded_file, "name", "") or "")
+    # Настоящий xlsx является zip-архивом, проверяем только сигнатуру, не читая файл целиком
+    if not uploaded_name.lower().endswith(".xlsx") or content_type == "application/zip":
+        return uploaded_file
+
+    try:
+        table_text = uploaded_file.read().decode("utf-8-sig", errors="ignore")
+        uploaded_file.seek(0)
+        if table_text.strip():
+            xlsx_bytes = _build_xlsx_from_tabular_text(table_text)
+            return ContentFile(xlsx_bytes, name=uploaded_name)
+    except Exception:
+        pass
+    return uploaded_file
+
+
+def _document_upload_target(data, uploaded_name: str):
+    """
+    Resolve the order, file type and final file name of an upload, or an error response.
+    """
+    order_id = data.get("order") or data.get("order_id")
+    file_type_id = data.get("file_type")
+    desired_name = (data.get("filename") or data.get("name") or "").strip()
+
+    if not order_id:
+        return JsonResponse({"status": "error", "message": "Не указан order"}, status=400)
+
+    if not file_type_id:
+        return JsonResponse({"status": "error", "message": "Не указан file_type"}, status=400)
+
+    try:
+        order = get_object_or_404(Order, id=int(order_id))
+    except (ValueError, TypeError):
+        return JsonResponse({"status": "error", "message": "Неверный id заказа"}, status=400)
+
+    try:
+        file_type = get_object_or_404(FileType, id=int(file_type_id))
+    except (ValueError, TypeError):
+        return JsonResponse({"status": "error", "message": "Неверный id типа файла"}, status=400)
+
+    if desired_name:
+        desired_name = get_valid_filename(desired_name)
+        orig_ext = os.path.splitext(uploaded_name)[1]
+        if orig_ext and not os.path.splitext(desired_name)[1]:
+            desired_name = desired_name + orig_ext
+
+    final_name = os.path.basename(desired_name if desired_name else uploaded_name)
+    if not final_name:
+        return JsonResponse({"status": "error", "message": "Некорректное имя файла"}, status=400)
+
+    # Файлы хранятся по хэшу содержимого, но документы ищутся по имени, поэтому оно уникально.
+    if Document.objects.filter(name=final_name).exists():
+        return JsonResponse({"status": "error", "message": "Файл с таким именем уже существует"}, status=400)
+
+    return {
+        "order": order,
+        "file_type": file_type,
+        "name": final_name,
+        "comment": (data.get("comment") or "").strip(),
+    }
+
+
+def _store_uploaded_document(user, target: dict, uploaded_file, sha256=None):
+    doc = Document(
+        user=user,
+        order=target["order"],
+        file_type=target["file_type"],
+        name=target["name"],
+        comment=target["comment"],
+    )
+    doc.store_file(uploaded_file, sha256)
+    doc.save()
+    return doc
+
+
+def _document_upload_response(doc):
+    def human_size(n):
+        if not n:
+            return ""
+        n = float(n)
+        for unit in ["Б", "КБ", "МБ", "ГБ", "ТБ"]:
+            if n < 1024:
+                if unit == "Б":
+                    return f"{int(n)} {unit}"
+                return f"{n:.2f} {unit}"
+            n /= 1024.0
+        return f"{n:.2f} ТБ"
+
+    doc.file_type_name = doc.file_type.name if doc.file_type else ""
+    try:
+        doc.user_name = doc.user.last_name if doc.user and getattr(doc.user, "last_name", "") else doc.user.username
+    except Exception:
+        doc.user_name = str(doc.user) if doc.user else ""
+    doc.file_display = doc.name or ""
+    try:
+        doc.uploaded = (
+            localtime(doc.uploaded_at).strftime("%d.%m.%Y %H:%M")
+            if getattr(doc, "uploaded_at", None)
+            else ""
+        )
+    except Exception:
+        doc.uploaded = str(doc.uploaded_at) if getattr(doc, "uploaded_at", None) else ""
+    doc.size_display = human_size(doc.size)
+
+    fields = [
+        {"name": "file_type_name", "verbose_name": "Тип файла"},
+        {"name": "user_name", "verbose_name": "Пользователь"},
+        {"name": "file_display", "verbose_name": "Файл"},
+        {"name": "uploaded", "verbose_name": "Загружен", "is_date": True},
+        {"name": "size_display", "verbose_name": "Размер"},
+        {"name": "comment", "verbose_name": "Комментарий"},
+    ]
+
+    html = render_to_string("components/table_row.html", {"item": doc, "fields": fields})
+
+    return JsonResponse(
+        {
+            "status": "success",
+            "id": doc.id,
+            "html": html,
+            "url": getattr(doc, "url", None) or getattr(getattr(doc, "file", None), "url", None) or "",
+        }
+    )
+
+
 @login_required
 @require_http_methods(["POST"])
 def document_upload(request):
     try:
         with transaction.atomic():
             uploaded_file = request.FILES.get("file")
-            order_id = request.POST.get("order") or request.POST.get("order_id")
-            file_type_id = request.POST.get("file_type")
-            comment = (request.POST.get("comment") or "").strip() 
-
-            desired_name = (request.POST.get("filename") or request.POST.get("name") or "").strip()
-
             if not uploaded_file:
                 return JsonResponse({"status": "error", "message": "Файл не передан"}, status=400)
 
-            if not order_id:
-                return JsonResponse({"status": "error", "message": "Не указан order"}, status=400)
+            target = _document_upload_target(request.POST, str(uploaded_file.name or ""))
+            if isinstance(target, JsonResponse):
+                return target
 
-            if not file_type_id:
-                return JsonResponse({"status": "error", "message": "Не указан file_type"}, status=400)
-
-            try:
-                uploaded_name = str(getattr(uploaded_file, "name", "") or "")
-                if uploaded_name.lower().endswith(".xlsx"):
-                    raw_bytes = uploaded_file.read()
-                    try:
-                        uploaded_file.seek(0)
-                    except Exception:
-                        pass
+            uploaded_file = _normalize_xlsx_upload(uploaded_file, sniff_content_type(uploaded_file))
+            doc = _store_uploaded_document(request.user, target, uploaded_file)
+            return _document_upload_response(doc)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
-                    is_valid_xlsx = False
-                    if raw_bytes:
-                        try:
-                            is_valid_xlsx = zipfile.is_zipfile(io.BytesIO(raw_bytes))
-                        except Exception:
-                            is_valid_xlsx = False
 
-                    if raw_bytes and not is_valid_xlsx:
-                        table_text = raw_bytes.decode("utf-8-sig", errors="ignore")
-                        if table_text.strip():
-                            xlsx_bytes = _build_xlsx_from_tabular_text(table_text)
-                            uploaded_file = ContentFile(xlsx_bytes, name=uploaded_name)
-            except Exception:
-                pass
+def _chunked_upload_error(error):
+    payload = {"status": "error", "message": str(error)}
+    if error.offset is not None:
+        payload["offset"] = error.offset
+    return JsonResponse(payload, status=error.status)
 
-            try:
-                order = get_object_or_404(Order, id=int(order_id))
-            except (ValueError, TypeError):
-                return JsonResponse({"status": "error", "message": "Неверный id заказа"}, status=400)
 
-            try:
-                file_type = get_object_or_404(FileType, id=int(file_type_id))
-            except (ValueError, TypeError):
-                return JsonResponse({"status": "error", "message": "Неверный id типа файла"}, status=400)
+def _chunked_upload_payload(state):
+    return {
+        "status": "success",
+        "upload_id": state["upload_id"],
+        "name": state["metadata"]["name"],
+        "size": state["size"],
+        "chunk_size": state["chunk_size"],
+        "offset": state["offset"],
+    }
 
-            if desired_name:
-                desired_name = get_valid_filename(desired_name)
-                orig_ext = os.path.splitext(uploaded_file.name)[1]
-                if orig_ext and not os.path.splitext(desired_name)[1]:
-                    desired_name = desired_name + orig_ext
-                if desired_name:
-                    uploaded_file.name = desired_name
 
-            final_name = os.path.basename(desired_name if desired_name else uploaded_file.name)
-            if not final_name:
-                return JsonResponse({"status": "error", "message": "Некорректное имя файла"}, status=400)
+@login_required
+@require_http_methods(["POST"])
+def document_upload_init(request):
+    """
+    Start a chunked document upload after checking its order, file type and name.
+    """
+    try:
+        size = int(request.POST.get("size") or 0)
+    except (ValueError, TypeError):
+        return JsonResponse({"status": "error", "message": "Неверный размер файла"}, status=400)
 
-            # Все документы лежат в одной директории uploads, поэтому имя должно быть уникальным глобально.
-            if Document.objects.filter(name=final_name).exists():
-                return JsonResponse({"status": "error", "message": "Файл с таким именем уже существует"}, status=400)
+    try:
+        target = _document_upload_target(request.POST, request.POST.get("filename") or "")
+        if isinstance(target, JsonResponse):
+            return target
 
-            storage_path = f"uploads/{final_name}"
-            if default_storage.exists(storage_path):
-                return JsonResponse({"status": "error", "message": "Файл с таким именем уже существует"}, status=400)
+        state = create_upload(
+            request.user.id,
+            size,
+            {
+                "order_id": target["order"].id,
+                "file_type_id": target["file_type"].id,
+                "name": target["name"],
+                "comment": target["comment"],
+            },
+        )
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return JsonResponse(_chunked_upload_payload(state))
 
-            uploaded_file.name = final_name
 
-            doc = Document(user=request.user, order=order, file_type=file_type, comment=comment)
+@login_required
+@require_http_methods(["GET", "PUT"])
+def document_upload_chunk(request, upload_id):
+    """
+    Report how much of a chunked upload arrived, or append the next chunk.
+    """
+    try:
+        if request.method == "GET":
+            state = get_upload(upload_id, request.user.id)
+            return JsonResponse(_chunked_upload_payload(state))
 
-            if hasattr(doc, "store_file") and callable(getattr(doc, "store_file")):
-                doc = doc.store_file(uploaded_file, replace_existing=True)
-            else:
-                doc.file.save(uploaded_file.name, uploaded_file, save=False)
-                doc.name = os.path.basename(doc.file.name) or uploaded_file.name
-                try:
-                    doc.size = getattr(uploaded_file, "size", None) or getattr(doc.file, "size", None)
-                except Exception:
-                    doc.size = None
-                doc.save()
+        # Content-Range: bytes <начало>-<конец>/<всего>
+        match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+)", request.headers.get("Content-Range", ""))
+        if not match:
+            return JsonResponse({"status": "error", "message": "Не указан Content-Range"}, status=400)
+        start, end = int(match.group(1)), int(match.group(2))
 
-                try:
-                    file_url = getattr(doc.file, "url", None)
-                    if file_url and (not doc.url or doc.url != file_url):
-                        doc.url = file_url
-                        doc.save(update_fields=["url"])
-                except Exception:
-                    pass
+        # Тело читается из потока блоками, без request.body
+        state = append_chunk(upload_id, request.user.id, start, request, end - start + 1)
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
+    return JsonResponse(_chunked_upload_payload(state))
 
-            def human_size(n):
-                if not n:
-                    return ""
-                n = float(n)
-                for unit in ["Б", "КБ", "МБ", "ГБ", "ТБ"]:
-                    if n < 1024:
-                        if unit == "Б":
-                            return f"{int(n)} {unit}"
-                        return f"{n:.2f} {unit}"
-                    n /= 1024.0
-                return f"{n:.2f} ТБ"
-
-            doc.file_type_name = doc.file_type.name if doc.file_type else ""
-            try:
-                doc.user_name = doc.user.last_name if doc.user and getattr(doc.user, "last_name", "") else doc.user.username
-            except Exception:
-                doc.user_name = str(doc.user) if doc.user else ""
-            doc.file_display = doc.name or ""
-            try:
-                doc.uploaded = (
-                    localtime(doc.uploaded_at).strftime("%d.%m.%Y %H:%M")
-                    if getattr(doc, "uploaded_at", None)
-                    else ""
-                )
-            except Exception:
-                doc.uploaded = str(doc.uploaded_at) if getattr(doc, "uploaded_at", None) else ""
-            doc.size_display = human_size(doc.size)
 
-            fields = [
-                {"name": "file_type_name", "verbose_name": "Тип файла"},
-                {"name": "user_name", "verbose_name": "Пользователь"},
-                {"name": "file_display", "verbose_name": "Файл"},
-                {"name": "uploaded", "verbose_name": "Загружен", "is_date": True},
-                {"name": "size_display", "verbose_name": "Размер"},
-                {"name": "comment", "verbose_name": "Комментарий"},
-            ]
+@login_required
+@require_http_methods(["POST"])
+def document_upload_complete(request, upload_id):
+    """
+    Turn a fully received chunked upload into an order document.
+    """
+    try:
+        state, assembled = complete_upload(upload_id, request.user.id)
+    except ChunkedUploadError as e:
+        return _chunked_upload_error(e)
 
-            html = render_to_string("components/table_row.html", {"item": doc, "fields": fields})
+    expected_sha256 = (request.POST.get("sha256") or "").strip().lower()
+    if expected_sha256 and expected_sha256 != state["sha256"]:
+        assembled.close()
+        discard_upload(upload_id)
+        return JsonResponse({"status": "error", "message": "Контрольная сумма файла не совпадает"}, status=400)
 
-            return JsonResponse(
+    try:
+        with assembled, transaction.atomic():
+            metadata = state["metadata"]
+            target = _document_upload_target(
                 {
-                    "status": "success",
-                    "id": doc.id,
-                    "html": html,
-                    "url": getattr(doc, "url", None) or getattr(getattr(doc, "file", None), "url", None) or "",
-                }
+                    "order": metadata["order_id"],
+                    "file_type": metadata["file_type_id"],
+                    "filename": metadata["name"],
+                    "comment": metadata["comment"],
+                },
+                metadata["name"],
             )
+            if isinstance(target, JsonResponse):
+                return target
+
+            uploaded_file = _normalize_xlsx_upload(assembled, state["content_type"])
+            # Хэш уже посчитан по частям; после конвертации xlsx содержимое другое
+            sha256 = state["sha256"] if uploaded_file is assembled else None
+            doc = _store_uploaded_document(request.user, target, uploaded_file, sha256)
+            response = _document_upload_response(doc)
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
+    discard_upload(upload_id)
+    return response
+
 
 @login_required
 @require_http_methods(["POST"])
@@ -1997,6 +2227,145 @@ def client_object_detail(request, pk: int):
     client_object = get_object_or_404(ClientObject, id=pk)
     return JsonResponse({"data": model_to_dict(client_object)})
 
+ORDER_ROW_FIELDS = [
+    {"name": "id", "verbose_name": "Заказ"},
+    {"name": "status", "verbose_name": "Статус", "is_relation": True},
+    {"name": "created", "verbose_name": "Создан", "is_date": True},
+    {"name": "deadline", "verbose_name": "Срок сдачи", "is_date": True},
+    {"name": "required_documents", "verbose_name": "Док-ты", "is_boolean": True},
+    {"name": "unit_price", "verbose_name": "Стоимость", "is_amount": True},
+    {"name": "quantity", "verbose_name": "Количество"},
+    {"name": "amount", "verbose_name": "Сумма", "is_amount": True},
+    {"name": "paid_amount", "verbose_name": "Погашено", "is_amount": True},
+    {"name": "comment", "verbose_name": "Комментарий"},
+    {"name": "additional_info", "verbose_name": "Доп. инф-я"},
+]
+ORDER_BULK_MAX_LINES = 100
+
+
+def _order_value_text(data, key: str) -> str:
+    value = data.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def _parse_order_values(data) -> dict:
+    """
+    Parse the price, amount, deadline and text fields of an order, raising ValueError with a message.
+    """
+    deadline_str = _order_value_text(data, "deadline")
+    deadline = None
+    if deadline_str:
+        deadline = parse_datetime(deadline_str)
+        if deadline and timezone.is_naive(deadline):
+            deadline = timezone.make_aware(deadline)
+
+    required_documents = data.get("required_documents") in (True, "on", "true")
+
+    unit_price_str = _order_value_text(data, "unit_price")
+    unit_price = None
+    if unit_price_str:
+        try:
+            cleaned_price = unit_price_str.replace(" р.", "").replace("р.", "").replace(" ", "").replace(",", ".")
+            unit_price = float(cleaned_price)
+        except (ValueError, TypeError):
+            raise ValueError("Неверный формат цены за единицу")
+
+    quantity_str = _order_value_text(data, "quantity")
+    quantity = None
+    if quantity_str:
+        try:
+            quantity = float(quantity_str.replace(" ", "").replace(",", "."))
+            if quantity.is_integer():
+                quantity = int(quantity)
+        except (ValueError, TypeError):
+            raise ValueError("Неверный формат количества")
+
+    amount_str = _order_value_text(data, "amount")
+    if not amount_str:
+        if unit_price is not None and quantity is not None:
+            amount = unit_price * quantity
+        else:
+            raise ValueError("Требуется указать цену и количество")
+    else:
+        try:
+            cleaned_amount = amount_str.replace(" р.", "").replace("р.", "").replace(" ", "").replace(",", ".")
+            amount = float(cleaned_amount)
+        except (ValueError, TypeError):
+            raise ValueError("Неверный формат суммы")
+
+    return {
+        "unit_price": unit_price,
+        "quantity": quantity,
+        "amount": amount,
+        "deadline": deadline,
+        "comment": _order_value_text(data, "comment") or None,
+        "additional_info": _order_value_text(data, "additional_info") or None,
+        "required_documents": required_documents,
+    }
+
+
+def _order_table_id(product_id, client_id, client_object) -> str:
+    # Правильно определяем table_id в зависимости от наличия объекта клиента
+    if client_object:
+        return f"product-orders-{product_id}-{client_id}-{client_object.id}"
+    return f"orders-no-object-{product_id}-{client_id}"
+
+
+def _create_orders(user, client, client_object, lines) -> list:
+    """
+    Create orders of a client with their department works in a few batched queries.
+    """
+    routing = get_order_work_routing({product.id for product, _ in lines})
+    if not routing["sales_department"]:
+        raise ValueError(
+            f'Отдел "{SALES_DEPARTMENT_NAME}" не найден или для него не настроены статусы работ'
+        )
+    sales_status = routing["sales_status"]
+
+    returns_ids = connection.features.can_return_rows_from_bulk_insert
+    if not returns_ids:
+        # Без RETURNING id читаются обратно; блокировка клиента не дает параллельному
+        # запросу того же менеджера вставить свои заказы между вставкой и чтением
+        Client.objects.select_for_update().filter(pk=client.pk).exists()
+
+    started = timezone.now()
+    orders = []
+    for product, values in lines:
+        order = Order(
+            manager=user,
+            client=client,
+            product=product,
+            client_object=client_object,
+            sales_status=sales_status,
+            sales_status_name=sales_status.name if sales_status else "",
+            **values,
+        )
+        # bulk_create не вызывает Order.save(), долг считается тем же методом
+        order.fill_remaining_debt()
+        orders.append(order)
+    Order.objects.bulk_create(orders)
+
+    if not returns_ids:
+        # MySQL не возвращает id из bulk_create; одна вставка выдает id по возрастанию
+        ids = list(
+            Order.objects.filter(manager=user, client=client, created__gte=started)
+            .order_by("-id")
+            .values_list("id", flat=True)[: len(orders)]
+        )
+        for order, pk in zip(orders, reversed(ids)):
+            order.pk = pk
+
+    works = []
+    for order in orders:
+        works.extend(build_order_department_works(order, routing, user))
+    OrderDepartmentWork.objects.bulk_create(works)
+
+    refresh_order_search_documents(Order.objects.filter(pk__in=[order.pk for order in orders]))
+    for order in orders:
+        order.legal_name = client.legal_name
+    return orders
+
+
 @login_required
 @require_http_methods(["POST"])
 def order_create(request):
@@ -2033,62 +2402,11 @@ def order_create(request):
                     status=400,
                 )
             
-            deadline_str = (request.POST.get("deadline") or "").strip()
-            deadline = None
-            if deadline_str:                
-                deadline = parse_datetime(deadline_str)
-                if deadline and timezone.is_naive(deadline):
-                    deadline = timezone.make_aware(deadline)
-            
-            required_documents = request.POST.get("required_documents") == "on" or request.POST.get("required_documents") == "true"
-            
-            unit_price_str = (request.POST.get("unit_price") or "").strip()
-            unit_price = None
-            if unit_price_str:
-                try:
-                    cleaned_price = unit_price_str.replace(" р.", "").replace("р.", "").replace(" ", "").replace(",", ".")
-                    unit_price = float(cleaned_price)
-                except (ValueError, TypeError):
-                    return JsonResponse(
-                        {"status": "error", "message": "Неверный формат цены за единицу"},
-                        status=400,
-                    )
-            
-            quantity_str = (request.POST.get("quantity") or "").strip()
-            quantity = None
-            if quantity_str:
-                try:
-                    quantity = float(quantity_str.replace(" ", "").replace(",", "."))
-                    if quantity.is_integer():
-                        quantity = int(quantity)
-                except (ValueError, TypeError):
-                    return JsonResponse(
-                        {"status": "error", "message": "Неверный формат количества"},
-                        status=400,
-                    )
-            
-            amount_str = (request.POST.get("amount") or "").strip()
-            if not amount_str:
-                if unit_price is not None and quantity is not None:
-                    amount = unit_price * quantity
-                else:
-                    return JsonResponse(
-                        {"status": "error", "message": "Требуется указать цену и количество"},
-                        status=400,
-                    )
-            else:
-                try:
-                    cleaned_amount = amount_str.replace(" р.", "").replace("р.", "").replace(" ", "").replace(",", ".")
-                    amount = float(cleaned_amount)
-                except (ValueError, TypeError):
-                    return JsonResponse(
-                        {"status": "error", "message": "Неверный формат суммы"},
-                        status=400,
-                    )
-            
-            comment = (request.POST.get("comment") or "").strip() or None
-            additional_info = (request.POST.get("additional_info") or "").strip() or None
-            
+            try:
+                values = _parse_order_values(request.POST)
+            except ValueError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
             client_object_id = request.POST.get("client_object") or request.POST.get("client_object_id")
             client_object = None
             if client_object_id:
@@ -2100,74 +2418,20 @@ def order_create(request):
                         status=400,
                     )
             
-            order = Order.objects.create(
-                manager=request.user,
-                client=client,
-                product=product,
-                unit_price=unit_price,
-                quantity=quantity,
-                amount=amount,
-                deadline=deadline,
-                comment=comment,
-                additional_info=additional_info,
-                client_object=client_object,
-                required_documents=required_documents,
-            )
-
-            sales_work = ensure_sales_department_work(order, request.user)
-            if not sales_work:
-                return JsonResponse(
-                    {
-                        "status": "error",
-                        "message": f'Отдел "{SALES_DEPARTMENT_NAME}" не найден или для него не настроены статусы работ',
-                    },
-                    status=400,
-                )
+            try:
+                order = _create_orders(request.user, client, client_object, [(product, values)])[0]
+            except ValueError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
-            wait_status = OrderWorkStatus.objects.filter(name__iexact="Ожидает", department__isnull=True).first()
-
-            departments = product.departments.all()
-            for department in departments:
-                if department.name == SALES_DEPARTMENT_NAME:
-                    continue
-                dep_status = OrderWorkStatus.objects.filter(name__iexact="Ожидает", department=department).first() or wait_status
-                OrderDepartmentWork.objects.create(
-                    order=order,
-                    department=department,
-                    status=dep_status,
-                )
-            
-            order.sales_department_works_list = [sales_work]
             order.legal_name = order.client.legal_name if order.client else None
-            order.paid_percent = int(order.paid_amount / order.amount * 100) if order.amount else 0
-            
-            fields = [
-                {"name": "id", "verbose_name": "Заказ"},
-                {"name": "status", "verbose_name": "Статус", "is_relation": True},
-                {"name": "created", "verbose_name": "Создан", "is_date": True},
-                {"name": "deadline", "verbose_name": "Срок сдачи", "is_date": True},
-                {"name": "required_documents", "verbose_name": "Док-ты", "is_boolean": True},
-                {"name": "unit_price", "verbose_name": "Стоимость", "is_amount": True},
-                {"name": "quantity", "verbose_name": "Количество"},
-                {"name": "amount", "verbose_name": "Сумма", "is_amount": True},
-                {"name": "paid_amount", "verbose_name": "Погашено", "is_amount": True},
-                {"name": "comment", "verbose_name": "Комментарий"},
-                {"name": "additional_info", "verbose_name": "Доп. инф-я"},
-            ]
-            
-            object_id = client_object.id if client_object else "noobject"
             
-            # Правильно определяем table_id в зависимости от наличия объекта клиента
-            if client_object:
-                table_id = f"product-orders-{product_id}-{client_id}-{object_id}"
-            else:
-                table_id = f"orders-no-object-{product_id}-{client_id}"
+            table_id = _order_table_id(product_id, client_id, client_object)
             
             html = render_to_string(
                 "components/table_row.html",
                 {
                     "item": order,
-                    "fields": fields,
+                    "fields": ORDER_ROW_FIELDS,
                 },
             )
             
@@ -2183,12 +2447,113 @@ def order_create(request):
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
+@login_required
+@require_http_methods(["POST"])
+def order_bulk_create(request):
+    """
+    Create several orders of one client from a list of order lines.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except json.JSONDecodeError:
+        return JsonResponse({"status": "error", "message": "Неверный формат JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"status": "error", "message": "Неверный формат JSON"}, status=400)
+
+    try:
+        client = Client.objects.filter(id=int(data.get("client") or data.get("client_id") or 0)).first()
+    except (ValueError, TypeError):
+        client = None
+    if not client:
+        return JsonResponse({"status": "error", "message": "Не указан клиент"}, status=400)
+
+    client_object = None
+    client_object_id = data.get("client_object") or data.get("client_object_id")
+    if client_object_id:
+        try:
+            client_object = ClientObject.objects.filter(id=int(client_object_id), client=client).first()
+        except (ValueError, TypeError):
+            client_object = None
+        if not client_object:
+            return JsonResponse({"status": "error", "message": "Неверный ID объекта клиента"}, status=400)
+
+    raw_lines = data.get("lines")
+    if not isinstance(raw_lines, list) or not raw_lines:
+        return JsonResponse({"status": "error", "message": "Не указаны строки заказа"}, status=400)
+    if len(raw_lines) > ORDER_BULK_MAX_LINES:
+        return JsonResponse(
+            {"status": "error", "message": f"Не больше {ORDER_BULK_MAX_LINES} строк за раз"},
+            status=400,
+        )
+
+    # Все строки проверяются до записи, ошибки возвращаются вместе
+    product_ids = set()
+    for line in raw_lines:
+        try:
+            product_ids.add(int(line.get("product") or line.get("product_id")))
+        except (AttributeError, ValueError, TypeError):
+            pass
+    products = Product.objects.in_bulk(product_ids)
+
+    lines = []
+    errors = []
+    for number, line in enumerate(raw_lines, start=1):
+        if not isinstance(line, dict):
+            errors.append({"line": number, "message": "Неверный формат строки"})
+            continue
+        try:
+            product = products.get(int(line.get("product") or line.get("product_id") or 0))
+        except (ValueError, TypeError):
+            product = None
+        if not product:
+            errors.append({"line": number, "message": "Не указана продукция"})
+            continue
+        try:
+            lines.append((product, _parse_order_values(line)))
+        except ValueError as e:
+            errors.append({"line": number, "message": str(e)})
+
+    if errors:
+        return JsonResponse(
+            {
+                "status": "error",
+                "message": f'Строка {errors[0]["line"]}: {errors[0]["message"]}',
+                "errors": errors,
+            },
+            status=400,
+        )
+
+    try:
+        with transaction.atomic():
+            orders = _create_orders(request.user, client, client_object, lines)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    return JsonResponse(
+        {
+            "status": "success",
+            "ids": [order.id for order in orders],
+            "orders": [
+                {
+                    "id": order.id,
+                    "html": render_to_string(
+                        "components/table_row.html",
+                        {"item": order, "fields": ORDER_ROW_FIELDS},
+                    ),
+                    "table_id": _order_table_id(order.product_id, client.id, client_object),
+                }
+                for order in orders
+            ],
+        }
+    )
+
 @login_required
 @require_http_methods(["PUT", "PATCH", "POST"])
 def order_update(request, pk: int):
     try:
         with transaction.atomic():
-            order = get_object_or_404(Order, id=pk)
+            # Блокировка не дает сохранению заказа затереть счетчики платежей
+            order = get_object_or_404(Order.objects.select_for_update(), id=pk)
             data = (
                 json.loads(request.body)
                 if request.method in ["PUT", "PATCH"]
@@ -2353,14 +2718,8 @@ def order_update_status(request, pk: int):
         with transaction.atomic():
             order = get_object_or_404(Order, id=pk)
 
-            user_type_name = (
-                getattr(getattr(request.user, "user_type", None), "name", "") or ""
-            ).strip().lower()
-            is_admin = user_type_name == "администратор"
-            is_manager = user_type_name == "менеджер по работе с клиентами"
-
-            if not is_admin:
-                if not is_manager or order.manager_id != request.user.id:
+            if not is_admin(request.user):
+                if not is_manager(request.user) or order.manager_id != request.user.id:
                     return JsonResponse(
                         {
                             "status": "error",
@@ -2424,6 +2783,7 @@ def order_update_status(request, pk: int):
                     work_update_fields.append("completed_at")
 
             sales_work.save(update_fields=work_update_fields)
+            sync_order_sales_status(sales_work, order)
 
             order_update_fields = []
             if new_status.is_final:
@@ -2438,7 +2798,6 @@ def order_update_status(request, pk: int):
             if order_update_fields:
                 order.save(update_fields=order_update_fields)
 
-            order.sales_department_works_list = [sales_work]
 
             fields = [
                 {"name": "id", "verbose_name": "Заказ"},
@@ -2563,10 +2922,7 @@ def order_add_viewers(request, pk: int):
             {"name": "first_name", "verbose_name": "Имя"},
             {"name": "last_name", "verbose_name": "Фамилия"},
         ]
-        html_rows = [
-            render_to_string("components/table_row.html", {"item": user, "fields": fields})
-            for user in users
-        ]
+        html_rows = [render_table_row(user, fields) for user in users]
 
         return JsonResponse({
             "status": "success",
@@ -2576,34 +2932,147 @@ def order_add_viewers(request, pk: int):
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
+KANBAN_PAGE_SIZE = 50
+
+
 @login_required
 def kanban_board(request):
-    columns = KanbanColumn.objects.all().order_by('order')
+    """
+    Render the kanban board with the first page of cards in every column.
+    """
+    columns = list(KanbanColumn.objects.all().order_by('rank', 'id'))
+
+    # Первые карточки всех столбцов и их количество одним запросом через оконные функции
+    placements = (
+        KanbanClientPlacement.objects.select_related('client')
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F('column_id')],
+                order_by=[F('rank').asc(), F('id').asc()],
+            ),
+            column_total=Window(Count('id'), partition_by=[F('column_id')]),
+        )
+        .filter(position__lte=KANBAN_PAGE_SIZE)
+        .order_by('column_id', 'position')
+    )
+    cards = {}
+    totals = {}
+    for placement in placements:
+        cards.setdefault(placement.column_id, []).append(placement)
+        totals[placement.column_id] = placement.column_total
+
+    paginator = KeysetPaginator(KanbanClientPlacement.objects.all(), 'rank', KANBAN_PAGE_SIZE, descending=False)
     columns_data = []
     for col in columns:
-        placements = KanbanClientPlacement.objects.filter(column=col).select_related('client').order_by('order')
+        col_cards = cards.get(col.id, [])
+        total = totals.get(col.id, 0)
         columns_data.append({
             'id': col.id,
             'name': col.name,
-            'clients': placements,
+            'clients': col_cards,
+            'total': total,
+            'next_cursor': paginator.encode_cursor(col_cards[-1], "next") if total > len(col_cards) else None,
         })
     return render(request, "commerce/kanban.html", {"columns": columns_data})
 
+
+@login_required
+@require_http_methods(["GET"])
+def kanban_column_clients(request, pk: int):
+    """
+    Get the next page of cards of a kanban column after the cursor.
+    """
+    column = get_object_or_404(KanbanColumn, pk=pk)
+    queryset = KanbanClientPlacement.objects.filter(column=column).select_related('client')
+    paginator = KeysetPaginator(queryset, 'rank', KANBAN_PAGE_SIZE, descending=False)
+    page = paginator.get_page(request.GET.get("cursor") or None)
+
+    html = render_to_string(
+        "commerce/partials/kanban_cards.html",
+        {"placements": page.object_list},
+        request=request,
+    )
+    return JsonResponse({
+        "status": "success",
+        "html": html,
+        "next_cursor": page.next_cursor,
+    })
+
+
+def _kanban_neighbours(client_id, order_list):
+    """
+    Get the ids of the cards above and below a card from the posted column order.
+    """
+    order_list = [str(cid) for cid in order_list]
+    if str(client_id) not in order_list:
+        return None, None
+    idx = order_list.index(str(client_id))
+    before_id = order_list[idx - 1] if idx > 0 else None
+    after_id = order_list[idx + 1] if idx + 1 < len(order_list) else None
+    return before_id, after_id
+
+
+def _kanban_rank_bounds(queryset, before_id, after_id):
+    neighbour_ids = [pk for pk in (before_id, after_id) if pk]
+    ranks = dict(queryset.filter(pk__in=neighbour_ids).values_list("pk", "rank"))
+    before = ranks.get(int(before_id)) if before_id else None
+    after = ranks.get(int(after_id)) if after_id else None
+    if before is None and after is None and (before_id or after_id):
+        before = queryset.aggregate(last=models.Max("rank"))["last"]
+    elif before is not None and not after_id:
+        # Столбец мог быть загружен не полностью: следующая карточка ищется в базе
+        after = (
+            queryset.filter(rank__gt=before)
+            .order_by("rank", "id")
+            .values_list("rank", flat=True)
+            .first()
+        )
+    return before, after
+
+
+def _kanban_rank_between(queryset, before_id, after_id):
+    """
+    Get a rank key between two neighbour rows of a queryset, rebalancing it if they are out of order.
+    """
+    try:
+        rank = rank_between(*_kanban_rank_bounds(queryset, before_id, after_id))
+    except ValueError:
+        # Соседи с одинаковой или перевернутой позицией: выравниваем список и считаем заново
+        rebalance_ranks(queryset)
+        rank = rank_between(*_kanban_rank_bounds(queryset, before_id, after_id))
+    if len(rank) > RANK_MAX_LENGTH:
+        rebalance_ranks(queryset)
+        return _kanban_rank_between(queryset, before_id, after_id)
+    return rank
+
+
 @require_POST
 @login_required
 def kanban_move_client(request):
     client_id = request.POST.get("client_id")
     column_id = request.POST.get("column_id")
-    order_list = request.POST.getlist("order[]") 
+    before_id = request.POST.get("before_id")
+    after_id = request.POST.get("after_id")
+    if not before_id and not after_id and "order[]" in request.POST:
+        before_id, after_id = _kanban_neighbours(client_id, request.POST.getlist("order[]"))
 
     try:
-        placement = KanbanClientPlacement.objects.get(client_id=client_id)
-        placement.column_id = column_id
-        placement.save()
-
-        for idx, cid in enumerate(order_list):
-            KanbanClientPlacement.objects.filter(client_id=cid, column_id=column_id).update(order=idx)
-        return JsonResponse({"status": "success"})
+        with transaction.atomic():
+            placement = KanbanClientPlacement.objects.select_for_update().get(client_id=client_id)
+            # Соседи задаются клиентами, а позиция хранится у размещений
+            column_placements = KanbanClientPlacement.objects.filter(column_id=column_id).exclude(pk=placement.pk)
+            placement_ids = dict(
+                column_placements.filter(client_id__in=[cid for cid in (before_id, after_id) if cid])
+                .values_list("client_id", "id")
+            )
+            rank = _kanban_rank_between(
+                column_placements,
+                placement_ids.get(int(before_id)) if before_id else None,
+                placement_ids.get(int(after_id)) if after_id else None,
+            )
+            KanbanClientPlacement.objects.filter(pk=placement.pk).update(column_id=column_id, rank=rank)
+        return JsonResponse({"status": "success", "rank": rank})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
     
@@ -2613,10 +3082,12 @@ def kanban_update_columns(request):
     import json
     try:
         columns = json.loads(request.POST.get("columns", "[]"))
-        for col in columns:
-            KanbanColumn.objects.filter(id=col["id"]).update(
-                name=col["name"], order=col["order"]
-            )
+        columns.sort(key=lambda col: col.get("order", 0))
+        with transaction.atomic():
+            for col, rank in zip(columns, spread_ranks(len(columns))):
+                KanbanColumn.objects.filter(id=col["id"]).update(
+                    name=col["name"], rank=rank
+                )
         return JsonResponse({"status": "success"})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
@@ -2651,11 +3122,12 @@ def kanban_quick_add_client(request):
                 )
 
             if column_id:
-                max_order = KanbanClientPlacement.objects.filter(column_id=column_id).aggregate(max_order=models.Max('order'))['max_order'] or 0
+                column_placements = KanbanClientPlacement.objects.filter(column_id=column_id)
+                last_id = column_placements.order_by('-rank', '-id').values_list('id', flat=True).first()
                 KanbanClientPlacement.objects.create(
                     client=client,
                     column_id=column_id,
-                    order=max_order + 1
+                    rank=_kanban_rank_between(column_placements, last_id, None)
                 )
 
             return JsonResponse({
@@ -2673,20 +3145,21 @@ def kanban_delete_column(request, pk: int):
         with transaction.atomic():
             column = get_object_or_404(KanbanColumn, id=pk)
 
-            first_column = KanbanColumn.objects.exclude(id=column.id).order_by('order').first()
+            first_column = KanbanColumn.objects.exclude(id=column.id).order_by('rank', 'id').first()
             if not first_column:
                 return JsonResponse({"status": "error", "message": "Нет другого столбца для переноса клиентов"}, status=400)
 
-            placements = KanbanClientPlacement.objects.filter(column=column).order_by('order')
+            moved = KanbanClientPlacement.objects.filter(column=column)
+            target = KanbanClientPlacement.objects.filter(column=first_column)
+            longest = moved.aggregate(longest=models.Max(Length('rank')))['longest'] or 0
+            last_rank = target.aggregate(last=models.Max('rank'))['last'] or ""
+            if len(last_rank) + longest > RANK_MAX_LENGTH:
+                rebalance_ranks(moved)
+                rebalance_ranks(target)
+                last_rank = target.aggregate(last=models.Max('rank'))['last'] or ""
 
-            max_order = KanbanClientPlacement.objects.filter(column=first_column).aggregate(
-                max_order=models.Max('order')
-            )['max_order'] or 0
-
-            for idx, placement in enumerate(placements, start=1):
-                placement.column = first_column
-                placement.order = max_order + idx
-                placement.save()
+            # Приписка к последней позиции ставит перенесенных клиентов в конец, сохраняя их порядок
+            moved.update(column=first_column, rank=Concat(Value(last_rank), F("rank")))
 
             column.delete()
 
@@ -2703,26 +3176,28 @@ def kanban_create_column(request):
         if not name:
             return JsonResponse({"status": "error", "message": "Укажите название столбца"}, status=400)
 
-        max_order = KanbanColumn.objects.aggregate(max_order=models.Max('order'))['max_order'] or 0
+        ranks = list(KanbanColumn.objects.order_by('rank', 'id').values_list('rank', flat=True))
 
         try:
-            order_val = int(order_val)
-            if order_val < 0:
-                order_val = 0
-            elif order_val > max_order + 1:
-                order_val = max_order + 1
+            order_val = min(max(int(order_val), 0), len(ranks))
         except (TypeError, ValueError):
-            order_val = max_order + 1
+            order_val = len(ranks)
 
-        KanbanColumn.objects.filter(order__gte=order_val).update(order=models.F('order') + 1)
+        before = ranks[order_val - 1] if order_val > 0 else None
+        after = ranks[order_val] if order_val < len(ranks) else None
+        try:
+            rank = rank_between(before, after)
+        except ValueError:
+            rebalance_ranks(KanbanColumn.objects.all())
+            return kanban_create_column(request)
 
-        column = KanbanColumn.objects.create(name=name, order=order_val)
+        column = KanbanColumn.objects.create(name=name, rank=rank)
 
         return JsonResponse({
             "status": "success",
             "id": column.id,
             "name": column.name,
-            "order": column.order,
+            "rank": column.rank,
         })
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
@@ -2778,8 +3253,10 @@ def order_files_cards(request, order_id: int):
                 "created": file.uploaded_at.isoformat() if file.uploaded_at else None,
             }
             
-            file_name = file.name.lower() if file.name else ""
-            if file_name.endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp')):
+            if is_image_document(file):
+                # Карточки показывают миниатюры, оригинал открывается по клику
+                if file.file:
+                    file_data["thumbnails"] = thumbnail_data(file)
                 images.append(file_data)
             else:
                 others.append(file_data)
@@ -2795,6 +3272,27 @@ def order_files_cards(request, order_id: int):
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
 
+@login_required
+@require_http_methods(["GET"])
+def document_thumbnail(request, pk: int, size: str, fmt: str):
+    """
+    Serve a document derivative, generating all of them on the first request.
+    """
+    if size not in THUMBNAIL_SIZES or fmt not in THUMBNAIL_FORMATS:
+        raise Http404
+    doc = get_object_or_404(Document, id=pk)
+    if not doc.file or not is_image_document(doc):
+        raise Http404
+
+    if not doc.thumbnails_at and not generate_thumbnails(doc):
+        # Если изображение не удалось уменьшить, отдаем оригинал
+        return HttpResponseRedirect(doc.file.url)
+
+    response = HttpResponseRedirect(default_storage.url(thumbnail_name(doc.id, size, fmt)))
+    patch_cache_control(response, private=True, max_age=86400)
+    return response
+
+
 @login_required
 @require_http_methods(["POST"])
 def document_rename(request, pk: int):
@@ -2834,86 +3332,11 @@ def document_rename(request, pk: int):
         if Document.objects.filter(name=new_filename).exclude(id=doc.id).exists():
             return JsonResponse({"status": "error", "message": "Файл с таким именем уже существует"}, status=400)
 
-        if doc.file and old_file_name:
-            dirpath = os.path.dirname(old_file_name)
-            new_path = os.path.join(dirpath, new_filename) if dirpath else new_filename
-
-            if new_path != old_file_name and default_storage.exists(new_path):
-                return JsonResponse({"status": "error", "message": "Файл с таким именем уже существует"}, status=400)
-
-            try:
-                storage_old_path = None
-                try:
-                    storage_old_path = default_storage.path(old_file_name)
-                except Exception:
-                    storage_old_path = None
-
-                if storage_old_path:
-                    try:
-                        storage_new_path = default_storage.path(new_path)
-                        os.makedirs(os.path.dirname(storage_new_path), exist_ok=True)
-                        os.rename(storage_old_path, storage_new_path)
-                    except Exception as e:
-                        raise
-
-                    doc.file.name = new_path
-                    doc.name = os.path.basename(new_path)
-                    doc.comment = new_comment  
-                    try:
-                        doc.size = default_storage.size(new_path)
-                    except Exception:
-                        pass
-                    try:
-                        doc.url = default_storage.url(new_path)
-                    except Exception:
-                        pass
-                    doc.save(update_fields=["file", "name", "size", "url", "comment"]) 
-                    return JsonResponse({"status": "success", "id": doc.id, "name": doc.name, "comment": doc.comment, "url": getattr(doc, "url", "")})
-
-                data = None
-                try:
-                    with default_storage.open(old_file_name, "rb") as f:
-                        data = f.read()
-                except Exception:
-                    try:
-                        doc.file.open("rb")
-                        data = doc.file.read()
-                        doc.file.close()
-                    except Exception:
-                        data = None
-
-                if data is None:
-                    return JsonResponse({"status": "error", "message": "Не удалось прочитать содержимое файла"}, status=500)
-
-                default_storage.save(new_path, ContentFile(data))
-
-                try:
-                    if old_file_name and default_storage.exists(old_file_name):
-                        default_storage.delete(old_file_name)
-                except Exception:
-                    pass
-
-                doc.file.name = new_path
-                doc.name = os.path.basename(new_path)
-                doc.comment = new_comment
-                try:
-                    doc.size = len(data)
-                except Exception:
-                    pass
-                try:
-                    doc.url = getattr(doc.file, "url", None)
-                except Exception:
-                    pass
-                doc.save(update_fields=["file", "name", "size", "url", "comment"]) 
-                return JsonResponse({"status": "success", "id": doc.id, "name": doc.name, "comment": doc.comment, "url": getattr(doc, "url", "")})
-
-            except Exception as e:
-                return JsonResponse({"status": "error", "message": str(e)}, status=500)
-        else:
-            doc.name = new_filename
-            doc.comment = new_comment 
-            doc.save(update_fields=["name", "comment"])  
-            return JsonResponse({"status": "success", "id": doc.id, "name": doc.name, "comment": doc.comment})
+        # Имя только отображается, ключ файла в хранилище от него не зависит
+        doc.name = new_filename
+        doc.comment = new_comment
+        doc.save(update_fields=["name", "comment"])
+        return JsonResponse({"status": "success", "id": doc.id, "name": doc.name, "comment": doc.comment, "url": doc.url or ""})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
@@ -2942,17 +3365,9 @@ def document_delete(request, pk: int):
             if not allowed:
                 return JsonResponse({"status": "error", "message": "Нет прав на удаление"}, status=403)
 
-            try:
-                file_name = getattr(getattr(doc, "file", None), "name", None)
-                if file_name and default_storage.exists(file_name):
-                    try:
-                        default_storage.delete(file_name)
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-
+            delete_thumbnails(doc)
             doc.delete()
+            doc.release_file()
             return JsonResponse({"status": "success", "id": pk})
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
@@ -3451,7 +3866,7 @@ def salary_calculation(request):
         last_day = now
 
     User = get_user_model()
-    manager_type = UserType.objects.filter(name="Менеджер по работе с клиентами").first()
+    manager_type = UserType.objects.filter(name=MANAGER_USER_TYPE_NAME).first()
     if manager_type:
         managers = User.objects.filter(user_type=manager_type)
     else:
@@ -3699,14 +4114,8 @@ def order_archive(request, pk: int):
         with transaction.atomic():
             order = get_object_or_404(Order, id=pk)
 
-            user_type_name = (
-                getattr(getattr(request.user, "user_type", None), "name", "") or ""
-            ).strip().lower()
-            is_admin = user_type_name == "администратор"
-            is_manager = user_type_name == "менеджер по работе с клиентами"
-
-            if not is_admin:
-                if not is_manager or order.manager_id != request.user.id:
+            if not is_admin(request.user):
+                if not is_manager(request.user) or order.manager_id != request.user.id:
                     return JsonResponse(
                         {
                             "status": "error",
@@ -1,8 +1,10 @@
 import json
 from django.db import transaction
 from django.contrib.auth.decorators import login_required
-from commerce.models import Department, OrderDepartmentWork, OrderWorkStatus, Order, OrderDepartmentWorkMessage
+from commerce.models import Department, OrderDepartmentWork, OrderWorkStatus, Order, OrderDepartmentWorkMessage, sync_order_sales_status
 from users.models import User
+from users.permissions import is_admin
+from yarche.tables import rows_payload, rows_response, wants_rows
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods, require_POST
@@ -113,18 +115,22 @@ def department_orders(request, department_slug):
     if user_type:
         if department.chief_user_type and user_type.id == department.chief_user_type.id:
             is_chief = True
-        if user_type.name.lower() == "администратор":
+        if is_admin(request.user):
             is_chief = True
 
     ids = [work.id for work in department_works]
+    if wants_rows(request):
+        return rows_response(request, data, fields, ids=ids)
 
+    # Строки отдаются данными и рисуются виртуальной прокруткой в table.js
     context = {
         "fields": fields,
-        "data": data,
+        "data": [],
         "is_chief": is_chief,
-        "ids": ids, 
+        "ids": ids,
+        "rows": rows_payload(data, fields, ids),
     }
-    
+
     return render(request, "departments/department_orders.html", context)
 
 @login_required
@@ -339,6 +345,7 @@ def department_work_update_status(request, order_id: int, department_slug: str):
                 message = f"Статус изменен с '{old_status}' на '{new_status}'" if old_status else f"Установлен статус '{new_status}'"
 
             department_work.refresh_from_db()
+            sync_order_sales_status(department_work, order)
 
             from types import SimpleNamespace
 
@@ -950,6 +957,7 @@ def department_work_create(request):
                     department=department,
                     status=status
                 )
+                sync_order_sales_status(work, order)
                 created_works.append({
                     "id": work.id,
                     "order": work.order.id,
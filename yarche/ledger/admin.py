@@ -2,14 +2,18 @@ from django.contrib import admin
 from .models import (
     BankAccountType,
     BankAccount,
+    BankAccountDailyBalance,
     TransactionCategory,
     Transaction,
-	MonthlyCapital
+	MonthlyCapital,
+	CategoryMonthTotal
 )
 
 
 admin.site.register(BankAccountType)
 admin.site.register(BankAccount)
+admin.site.register(BankAccountDailyBalance)
 admin.site.register(TransactionCategory)
 admin.site.register(Transaction)
 admin.site.register(MonthlyCapital)
+admin.site.register(CategoryMonthTotal)
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import BankAccount, BankAccountDailyBalance
+
+
+def balance_day():
+    """
+    Get the date balances are recorded under, matching completed_date.
+    """
+    return timezone.now().date()
+
+
+def record_daily_balances(account_ids, day=None):
+    """
+    Store current balances of the accounts as their end-of-day balance.
+    """
+    day = day or balance_day()
+    account_ids = {account_id for account_id in account_ids if account_id}
+    for account_id, balance in BankAccount.objects.filter(id__in=account_ids).values_list("id", "balance"):
+        BankAccountDailyBalance.objects.update_or_create(
+            bank_account_id=account_id, date=day, defaults={"balance": balance}
+        )
+
+
+def get_account_balance_at(account, day) -> Decimal:
+    """
+    Get account balance at the end of the day with one index lookup.
+    """
+    account_id = getattr(account, "id", account)
+    if day >= balance_day():
+        balance = BankAccount.objects.filter(id=account_id).values_list("balance", flat=True).first()
+        return Decimal(balance or 0)
+
+    balance = (
+        BankAccountDailyBalance.objects
+        .filter(bank_account_id=account_id, date__lte=day)
+        .order_by("-date")
+        .values_list("balance", flat=True)
+        .first()
+    )
+    return Decimal(balance or 0)
+
+
+def get_balances_at(day, accounts=None) -> dict:
+    """
+    Get balances of all accounts at the end of the day in one query.
+    """
+    if accounts is None:
+        accounts = BankAccount.objects.all()
+
+    if day >= balance_day():
+        return {account_id: Decimal(balance) for account_id, balance in accounts.values_list("id", "balance")}
+
+    history = (
+        BankAccountDailyBalance.objects
+        .filter(bank_account=OuterRef("pk"), date__lte=day)
+        .order_by("-date")
+        .values("balance")[:1]
+    )
+    rows = accounts.annotate(balance_at=Subquery(history)).values_list("id", "balance_at")
+    return {account_id: Decimal(balance or 0) for account_id, balance in rows}
+
+
+def get_total_balance_at(day) -> Decimal:
+    """
+    Get total balance of all accounts at the end of the day.
+    """
+    return sum(get_balances_at(day).values(), Decimal(0))
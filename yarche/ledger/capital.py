@@ -0,0 +1,181 @@
+from calendar import monthrange
+from datetime import datetime
+from decimal import Decimal
+
+from django.db.models import F, Min, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from commerce.models import (
+    AccountsPayable, Bonus, Credit, FixedAsset, InventoryItem, Order, ShortTermLiability
+)
+
+from .balances import get_total_balance_at
+from .models import MonthlyCapital, Transaction
+
+
+def month_end(year: int, month: int) -> datetime:
+    """
+    Get the aware last second of the month.
+    """
+    last_day = monthrange(year, month)[1]
+    return timezone.make_aware(datetime(year, month, last_day, 23, 59, 59))
+
+
+def previous_month(year: int, month: int) -> tuple:
+    """
+    Get year and month preceding the given month.
+    """
+    if month == 1:
+        return year - 1, 12
+    return year, month - 1
+
+
+def is_closed_month(year: int, month: int, now=None) -> bool:
+    """
+    Check that the month is already over.
+    """
+    now = timezone.localtime(now or timezone.now())
+    return (year, month) < (now.year, now.month)
+
+
+def calculate_capital_at(dt) -> Decimal:
+    """
+    Calculate capital (assets minus liabilities) at the given moment.
+    """
+    assets = (
+        (FixedAsset.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+        + (InventoryItem.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+        + (Order.objects.filter(created__lte=dt).aggregate(total=Sum(F("amount") - F("paid_amount")))["total"] or 0)
+        + get_total_balance_at(timezone.localtime(dt).date())
+    )
+    liabilities = (
+        (Credit.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+        + (AccountsPayable.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+        + (ShortTermLiability.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+        + (Bonus.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
+    )
+    return Decimal(assets) - Decimal(liabilities)
+
+
+def get_total_capital_at(dt) -> Decimal:
+    """
+    Get capital at the moment, using the snapshot for closed months.
+    """
+    if is_closed_month(dt.year, dt.month):
+        mc = MonthlyCapital.objects.filter(year=dt.year, month=dt.month).first()
+        if mc:
+            return Decimal(mc.capital)
+    return calculate_capital_at(dt)
+
+
+def snapshot_month_capital(year: int, month: int) -> MonthlyCapital:
+    """
+    Calculate and store capital at the end of the month.
+    """
+    capital = calculate_capital_at(month_end(year, month))
+    snapshot, _ = MonthlyCapital.objects.update_or_create(
+        year=year, month=month, defaults={"capital": capital}
+    )
+    return snapshot
+
+
+def get_history_start():
+    """
+    Get year and month of the earliest order or transaction.
+    """
+    dates = [
+        Order.objects.aggregate(first=Min("created"))["first"],
+        Transaction.objects.aggregate(first=Min("created"))["first"],
+    ]
+    dates = [timezone.localtime(d) for d in dates if d]
+    if not dates:
+        return None
+    first = min(dates)
+    return first.year, first.month
+
+
+def backfill_monthly_capital(force: bool = False) -> int:
+    """
+    Store capital snapshots for every closed month since the history start.
+    """
+    start = get_history_start()
+    if not start:
+        return 0
+
+    now = timezone.localtime()
+    existing = set(MonthlyCapital.objects.values_list("year", "month"))
+    year, month = previous_month(*start)
+    created_count = 0
+    while (year, month) < (now.year, now.month):
+        if force or (year, month) not in existing:
+            snapshot_month_capital(year, month)
+            created_count += 1
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return created_count
+
+
+def get_monthly_profit(year: int) -> dict:
+    """
+    Get income plus expense per month of the year in one grouped query.
+    """
+    rows = (
+        Transaction.objects.filter(
+            created__range=(timezone.make_aware(datetime(year, 1, 1)), month_end(year, 12)),
+            type__in=["income", "expense"],
+        )
+        .annotate(month=TruncMonth("created"))
+        .values("month")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+    profit = {}
+    for row in rows:
+        month = timezone.localtime(row["month"]) if timezone.is_aware(row["month"]) else row["month"]
+        profit[month.month] = profit.get(month.month, Decimal(0)) + Decimal(row["total"] or 0)
+    return profit
+
+
+def get_year_capital(year: int) -> dict:
+    """
+    Get month-end capital for December of the previous year and each month of the year.
+    """
+    snapshots = {
+        (mc.year, mc.month): Decimal(mc.capital)
+        for mc in MonthlyCapital.objects.filter(year__in=[year - 1, year])
+    }
+    now = timezone.localtime()
+    live_capital = None
+    capitals = {}
+    for key in [(year - 1, 12)] + [(year, m) for m in range(1, 13)]:
+        if is_closed_month(*key, now=now):
+            if key not in snapshots:
+                snapshots[key] = Decimal(snapshot_month_capital(*key).capital)
+            capitals[key] = snapshots[key]
+        else:
+            if live_capital is None:
+                live_capital = calculate_capital_at(now)
+            capitals[key] = live_capital
+    return capitals
+
+
+def get_year_capital_percents(year: int) -> list:
+    """
+    Get monthly profit as a percentage of the average month capital.
+    """
+    capitals = get_year_capital(year)
+    profit = get_monthly_profit(year)
+
+    percents = []
+    for month in range(1, 13):
+        prev_cap = capitals[previous_month(year, month)]
+        curr_cap = capitals[(year, month)]
+        avg_cap = (prev_cap + curr_cap) / Decimal(2) if (prev_cap or curr_cap) else Decimal(0)
+        profit_total = profit.get(month, Decimal(0))
+
+        if avg_cap > 0 and profit_total != 0:
+            capital_percent = float(profit_total) / float(avg_cap) * 100.0
+        else:
+            capital_percent = 0.0
+        percents.append(round(capital_percent, 1))
+    return percents
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ledger.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает итоги по категориям за месяц по завершенным транзакциям"
+
+    def handle(self, *args, **kwargs):
+        created_count = rebuild_rollups()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Пересчитано итогов по категориям: {created_count}"
+            )
+        )
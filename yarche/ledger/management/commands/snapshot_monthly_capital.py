@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ledger.capital import (
+    backfill_monthly_capital, is_closed_month, previous_month, snapshot_month_capital
+)
+
+
+class Command(BaseCommand):
+    help = "Сохраняет капитал на конец закрытого месяца (по умолчанию прошлого)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Год")
+        parser.add_argument("--month", type=int, help="Месяц (1-12)")
+        parser.add_argument(
+            "--backfill",
+            action="store_true",
+            help="Заполнить все закрытые месяцы с начала истории",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="При заполнении истории пересчитать уже сохраненные месяцы",
+        )
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            created_count = backfill_monthly_capital(force=options["force"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Сохранено месяцев капитала: {created_count}")
+            )
+            return
+
+        now = timezone.localtime()
+        year, month = previous_month(now.year, now.month)
+        year = options["year"] or year
+        month = options["month"] or month
+
+        if not 1 <= month <= 12:
+            raise CommandError("Месяц должен быть от 1 до 12")
+        if not is_closed_month(year, month):
+            raise CommandError("Месяц еще не закрыт")
+
+        snapshot = snapshot_month_capital(year, month)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Капитал на конец {month:02d}.{year}: {snapshot.capital}"
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ledger.order_payments import verify_order_payment_totals
+
+
+class Command(BaseCommand):
+    help = "Сверяет счетчики платежей заказов с транзакциями и исправляет расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только показать расхождения, не исправляя их",
+        )
+
+    def handle(self, *args, **options):
+        checked, mismatched = verify_order_payment_totals(fix=not options["check"])
+        if mismatched:
+            preview = ", ".join(str(order_id) for order_id in mismatched[:20])
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Расхождения в заказах ({len(mismatched)}): {preview}"
+                )
+            )
+        action = "Проверено" if options["check"] else "Проверено и исправлено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} заказов: {checked}, расхождений: {len(mismatched)}"
+            )
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def fill_rollups(apps, schema_editor):
+    Transaction = apps.get_model("ledger", "Transaction")
+    CategoryMonthTotal = apps.get_model("ledger", "CategoryMonthTotal")
+    rows = (
+        Transaction.objects
+        .filter(completed_date__isnull=False, report_date__isnull=False)
+        .annotate(year=ExtractYear("report_date"), month=ExtractMonth("report_date"))
+        .values("category_id", "bank_account_id", "type", "year", "month")
+        .annotate(row_total=Sum("amount"), row_count=Count("id"))
+        .order_by()
+    )
+    CategoryMonthTotal.objects.bulk_create(
+        [
+            CategoryMonthTotal(
+                category_id=row["category_id"],
+                bank_account_id=row["bank_account_id"],
+                type=row["type"],
+                year=row["year"],
+                month=row["month"],
+                total=row["row_total"] or 0,
+                count=row["row_count"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0005_monthlycapital'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMonthTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('income', 'Приход'), ('expense', 'Расход'), ('order_payment', 'Оплата заказа'), ('transfer', 'Перевод между счетами'), ('client_account_deposit', 'Внос на ЛС клиента'), ('client_account_payment', 'Оплата с ЛС клиента')], max_length=255, verbose_name='Тип операции')),
+                ('year', models.IntegerField(verbose_name='Год')),
+                ('month', models.IntegerField(verbose_name='Месяц')),
+                ('total', models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Сумма')),
+                ('count', models.IntegerField(default=0, verbose_name='Количество операций')),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='ledger.bankaccount', verbose_name='Счет')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='ledger.transactioncategory', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Итог по категории за месяц',
+                'verbose_name_plural': 'Итоги по категориям за месяц',
+                'indexes': [models.Index(fields=['year', 'month'], name='ledger_cate_year_fb0372_idx')],
+                'unique_together': {('category', 'bank_account', 'type', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
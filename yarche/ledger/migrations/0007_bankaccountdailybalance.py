@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def fill_balance_history(apps, schema_editor):
+    """
+    Restore end-of-day balances backwards from the current balance.
+    """
+    BankAccount = apps.get_model("ledger", "BankAccount")
+    BankAccountDailyBalance = apps.get_model("ledger", "BankAccountDailyBalance")
+    Transaction = apps.get_model("ledger", "Transaction")
+
+    history = []
+    for account in BankAccount.objects.all():
+        day_totals = (
+            Transaction.objects.filter(bank_account=account, completed_date__isnull=False)
+            .values("completed_date")
+            .annotate(total=Sum("amount"))
+            .order_by("-completed_date")
+        )
+        balance = account.balance
+        first_day = timezone.now().date()
+        for row in day_totals:
+            history.append(
+                BankAccountDailyBalance(bank_account=account, date=row["completed_date"], balance=balance)
+            )
+            balance -= row["total"] or 0
+            first_day = row["completed_date"] - datetime.timedelta(days=1)
+        history.append(BankAccountDailyBalance(bank_account=account, date=first_day, balance=balance))
+
+    BankAccountDailyBalance.objects.bulk_create(history, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0006_categorymonthtotal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankAccountDailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Баланс на конец дня')),
+                ('bank_account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='ledger.bankaccount', verbose_name='Счет')),
+            ],
+            options={
+                'verbose_name': 'Остаток счета на дату',
+                'verbose_name_plural': 'Остатки счетов на дату',
+                'ordering': ['bank_account', 'date'],
+                'unique_together': {('bank_account', 'date')},
+            },
+        ),
+        migrations.RunPython(fill_balance_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0040_remove_order_status'),
+        ('ledger', '0007_bankaccountdailybalance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['completed_date', 'id'], name='ledger_tran_complet_09a1e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['created', 'id'], name='ledger_tran_created_27fab3_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_category_keys(apps, schema_editor):
+    """
+    Key rollups by category id, merging uncategorised rows that MySQL let duplicate.
+    """
+    CategoryMonthTotal = apps.get_model("ledger", "CategoryMonthTotal")
+    CategoryMonthTotal.objects.filter(category__isnull=False).update(category_key=models.F("category_id"))
+
+    merged = {}
+    duplicates = []
+    for row in CategoryMonthTotal.objects.filter(category__isnull=True).order_by("id"):
+        key = (row.bank_account_id, row.type, row.year, row.month)
+        if key not in merged:
+            merged[key] = row
+            continue
+        first = merged[key]
+        first.total = (first.total or Decimal(0)) + row.total
+        first.count += row.count
+        duplicates.append(row.id)
+    CategoryMonthTotal.objects.filter(id__in=duplicates).delete()
+    CategoryMonthTotal.objects.bulk_update(list(merged.values()), ["total", "count"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ledger', '0008_transaction_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='categorymonthtotal',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='categorymonthtotal',
+            name='category_key',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Ключ категории'),
+        ),
+        migrations.RunPython(fill_category_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='categorymonthtotal',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='ledger.transactioncategory', verbose_name='Категория'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='categorymonthtotal',
+            unique_together={('category_key', 'bank_account', 'type', 'year', 'month')},
+        ),
+    ]
@@ -1,7 +1,9 @@
 from models import (
     BankAccountType,
     BankAccount,
+    BankAccountDailyBalance,
     TransactionCategory,
     Transaction,
-	MonthlyCapital
+	MonthlyCapital,
+	CategoryMonthTotal
 )
@@ -1,2 +1,2 @@
-from .bank_account import BankAccount, BankAccountType
-from .transaction import Transaction, TransactionCategory, MonthlyCapital
+from .bank_account import BankAccount, BankAccountType, BankAccountDailyBalance
+from .transaction import Transaction, TransactionCategory, MonthlyCapital, CategoryMonthTotal
@@ -42,3 +42,25 @@ class BankAccount(models.Model):
 
         if not self.type:
             raise ValidationError({"type": "Тип счета не может быть пустым"})
+
+
+class BankAccountDailyBalance(models.Model):
+    bank_account = models.ForeignKey(
+        BankAccount,
+        on_delete=models.CASCADE,
+        verbose_name="Счет",
+        related_name="daily_balances",
+    )
+    date = models.DateField(verbose_name="Дата")
+    balance = models.DecimalField(
+        max_digits=12, decimal_places=2, verbose_name="Баланс на конец дня"
+    )
+
+    def __str__(self):
+        return f"{self.bank_account} - {self.date}"
+
+    class Meta:
+        verbose_name = "Остаток счета на дату"
+        verbose_name_plural = "Остатки счетов на дату"
+        unique_together = ("bank_account", "date")
+        ordering = ["bank_account", "date"]
@@ -91,6 +91,10 @@ class Transaction(models.Model):
     class Meta:
         verbose_name = "Транзакция"
         verbose_name_plural = "Транзакции"
+        indexes = [
+            models.Index(fields=["completed_date", "id"]),
+            models.Index(fields=["created", "id"]),
+        ]
 
     def clean(self):
         if self.type in ["income", "expense"] and not self.category:
@@ -125,3 +129,40 @@ class MonthlyCapital(models.Model):
 
     class Meta:
         unique_together = ('year', 'month')
+
+
+class CategoryMonthTotal(models.Model):
+    category = models.ForeignKey(
+        TransactionCategory,
+        on_delete=models.SET_NULL,
+        verbose_name="Категория",
+        blank=True,
+        null=True,
+    )
+    # NULL в уникальном ключе MySQL не сравнивает, поэтому без категории ключ равен 0
+    category_key = models.PositiveBigIntegerField(
+        default=0, verbose_name="Ключ категории"
+    )
+    bank_account = models.ForeignKey(
+        BankAccount, on_delete=models.CASCADE, verbose_name="Счет"
+    )
+    type = models.CharField(
+        max_length=255,
+        choices=Transaction.TransactionType.choices,
+        verbose_name="Тип операции",
+    )
+    year = models.IntegerField(verbose_name="Год")
+    month = models.IntegerField(verbose_name="Месяц")
+    total = models.DecimalField(
+        decimal_places=0, max_digits=14, default=0, verbose_name="Сумма"
+    )
+    count = models.IntegerField(default=0, verbose_name="Количество операций")
+
+    def __str__(self):
+        return f"{self.category or self.get_type_display()} - {self.month:02d}.{self.year}"
+
+    class Meta:
+        verbose_name = "Итог по категории за месяц"
+        verbose_name_plural = "Итоги по категориям за месяц"
+        unique_together = ("category_key", "bank_account", "type", "year", "month")
+        indexes = [models.Index(fields=["year", "month"])]
@@ -0,0 +1,139 @@
+from decimal import Decimal
+
+from django.db.models import DateTimeField, DecimalField, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Abs, Coalesce, Greatest
+
+from commerce.models import Order
+
+from .models import Transaction
+
+PAYMENT_TYPES = ("order_payment", "client_account_payment")
+ORDER_TOTAL_FIELDS = ("pending_payment_total", "settled_payment_total", "remaining_debt", "last_payment_at")
+TOTALS_BATCH_SIZE = 1000
+
+ZERO = Value(Decimal(0), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def payment_entries(transactions) -> list:
+    """
+    Snapshot order payment amounts of transactions before they change.
+    """
+    entries = []
+    for tr in transactions:
+        if tr is None or tr.type not in PAYMENT_TYPES or not tr.order_id:
+            continue
+        amount = abs(Decimal(str(tr.amount)))
+        settled = tr.completed_date is not None
+        entries.append((tr.order_id, amount, settled, tr.created))
+    return entries
+
+
+def last_payment_subquery():
+    return Subquery(
+        Transaction.objects.filter(order_id=OuterRef("pk"), type__in=PAYMENT_TYPES)
+        .values("order_id")
+        .annotate(last=Max("created"))
+        .values("last")[:1]
+    )
+
+
+def apply_payment_entries(entries: list, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) payment snapshots from order counters.
+    """
+    deltas = {}
+    for order_id, amount, settled, created in entries:
+        pending_delta, settled_delta, last_at = deltas.get(order_id, (Decimal(0), Decimal(0), None))
+        if settled:
+            settled_delta += sign * amount
+        else:
+            pending_delta += sign * amount
+        if created and (last_at is None or created > last_at):
+            last_at = created
+        deltas[order_id] = (pending_delta, settled_delta, last_at)
+
+    for order_id, (pending_delta, settled_delta, last_at) in sorted(deltas.items()):
+        # Проведенный платеж уже входит в paid_amount, поэтому двигаем его вместе со счетчиком
+        values = {
+            "remaining_debt": F("remaining_debt") - pending_delta - settled_delta,
+            "pending_payment_total": F("pending_payment_total") + pending_delta,
+            "settled_payment_total": F("settled_payment_total") + settled_delta,
+            "paid_amount": F("paid_amount") + settled_delta,
+        }
+        if sign > 0:
+            created = Value(last_at, output_field=DateTimeField())
+            values["last_payment_at"] = Greatest(Coalesce("last_payment_at", created), created)
+        else:
+            values["last_payment_at"] = last_payment_subquery()
+        Order.objects.filter(pk=order_id).update(**values)
+
+
+def settle_order_payments(orders: dict, order_payments: dict):
+    """
+    Move shift payments of locked orders from pending to settled and paid totals.
+    """
+    changed = []
+    for order_id, amount in order_payments.items():
+        order = orders.get(order_id)
+        if order is None or not amount:
+            continue
+        order.paid_amount = F("paid_amount") + amount
+        order.pending_payment_total = F("pending_payment_total") - amount
+        order.settled_payment_total = F("settled_payment_total") + amount
+        changed.append(order)
+    if changed:
+        Order.objects.bulk_update(
+            changed, ["paid_amount", "pending_payment_total", "settled_payment_total"]
+        )
+
+
+def compute_order_payment_totals(orders=None):
+    """
+    Annotate orders with payment counters recomputed from transactions.
+    """
+    if orders is None:
+        orders = Order.objects.all()
+
+    totals = (
+        Transaction.objects.filter(order_id=OuterRef("pk"), type__in=PAYMENT_TYPES)
+        .values("order_id")
+        .annotate(
+            pending=Sum(Abs("amount"), filter=Q(completed_date__isnull=True)),
+            settled=Sum(Abs("amount"), filter=Q(completed_date__isnull=False)),
+        )
+    )
+    pending = Coalesce(Subquery(totals.values("pending")[:1]), ZERO)
+
+    return orders.annotate(
+        expected_pending=pending,
+        expected_settled=Coalesce(Subquery(totals.values("settled")[:1]), ZERO),
+        expected_remaining=F("amount") - F("paid_amount") - pending,
+        expected_last_payment=last_payment_subquery(),
+    )
+
+
+def verify_order_payment_totals(fix: bool = True) -> tuple:
+    """
+    Compare stored payment counters with recomputed ones, fixing mismatches.
+    """
+    checked = 0
+    mismatched = []
+    orders = compute_order_payment_totals().order_by("id")
+    for order in orders.iterator(chunk_size=TOTALS_BATCH_SIZE):
+        checked += 1
+        expected = (
+            order.expected_pending,
+            order.expected_settled,
+            order.expected_remaining,
+            order.expected_last_payment,
+        )
+        stored = tuple(getattr(order, field) for field in ORDER_TOTAL_FIELDS)
+        if expected == stored:
+            continue
+        for field, value in zip(ORDER_TOTAL_FIELDS, expected):
+            setattr(order, field, value)
+        mismatched.append(order)
+
+    if fix and mismatched:
+        Order.objects.bulk_update(mismatched, ORDER_TOTAL_FIELDS, batch_size=TOTALS_BATCH_SIZE)
+    return checked, [order.id for order in mismatched]
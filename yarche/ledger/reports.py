@@ -0,0 +1,179 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Sum
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek
+
+from .models import CategoryMonthTotal, Transaction
+
+MONTHS_RU = [
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
+]
+QUARTERS_RU = ["I", "II", "III", "IV"]
+
+GRANULARITY_TRUNC = {
+    "month": TruncMonth,
+    "quarter": TruncQuarter,
+    "week": TruncWeek,
+}
+
+
+def period_start(value: date, granularity: str = "month") -> date:
+    """
+    Get the first day of the period containing the date.
+    """
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "quarter":
+        return date(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+    return date(value.year, value.month, 1)
+
+
+def next_period(value: date, granularity: str = "month") -> date:
+    """
+    Get the first day of the period following the given period start.
+    """
+    if granularity == "week":
+        return value + timedelta(days=7)
+    step = 3 if granularity == "quarter" else 1
+    month = value.month - 1 + step
+    return date(value.year + month // 12, month % 12 + 1, 1)
+
+
+def iter_periods(start: date, end: date, granularity: str = "month") -> list:
+    """
+    Get period starts covering the date range.
+    """
+    periods = []
+    current = period_start(start, granularity)
+    while current <= end:
+        periods.append(current)
+        current = next_period(current, granularity)
+    return periods
+
+
+def is_month_aligned(start: date, end: date) -> bool:
+    """
+    Check that the range starts on a month start and ends on a month end.
+    """
+    return start.day == 1 and (end + timedelta(days=1)).day == 1
+
+
+def period_label(value: date, granularity: str = "month", with_year: bool = False) -> str:
+    """
+    Get a column label for the period.
+    """
+    if granularity == "week":
+        return value.strftime("%d.%m.%Y")
+    if granularity == "quarter":
+        return f"{QUARTERS_RU[(value.month - 1) // 3]} кв. {value.year}"
+    label = MONTHS_RU[value.month - 1]
+    return f"{label} {value.year}" if with_year else label
+
+
+class CategoryPivot:
+    """
+    Category x period matrix of transaction sums with row and column totals.
+    """
+    def __init__(self, periods: list, granularity: str, values: dict):
+        self.periods = periods
+        self.granularity = granularity
+        self.values = values
+
+        self.row_totals = {}
+        self.column_totals = {period: Decimal(0) for period in periods}
+        for (category_id, period), total in values.items():
+            self.row_totals[category_id] = self.row_totals.get(category_id, Decimal(0)) + total
+            self.column_totals[period] += total
+        self.grand_total = sum(self.column_totals.values(), Decimal(0))
+
+    def value(self, category_id: int, period: date) -> Decimal:
+        return self.values.get((category_id, period), Decimal(0))
+
+    def row(self, category_id: int) -> list:
+        return [self.value(category_id, period) for period in self.periods]
+
+    def row_total(self, category_id: int) -> Decimal:
+        return self.row_totals.get(category_id, Decimal(0))
+
+    def column_total(self, period: date) -> Decimal:
+        return self.column_totals.get(period, Decimal(0))
+
+    def subtotal(self, category_ids) -> tuple:
+        """
+        Get per-period sums and the total over a subset of categories.
+        """
+        values = [
+            sum((self.value(category_id, period) for category_id in category_ids), Decimal(0))
+            for period in self.periods
+        ]
+        return values, sum(values, Decimal(0))
+
+    def labels(self) -> list:
+        with_year = len({period.year for period in self.periods}) > 1
+        return [period_label(period, self.granularity, with_year) for period in self.periods]
+
+
+def build_category_pivot(start: date, end: date, granularity: str = "month", categories=None, queryset=None) -> CategoryPivot:
+    """
+    Aggregate completed transactions by category and report period in one query.
+    """
+    if granularity not in GRANULARITY_TRUNC:
+        raise ValueError(f"Неизвестная детализация: {granularity}")
+
+    periods = iter_periods(start, end, granularity)
+    if queryset is None and granularity != "week" and is_month_aligned(start, end):
+        return CategoryPivot(
+            periods, granularity, get_rollup_values(start, end, granularity, categories)
+        )
+
+    if queryset is None:
+        queryset = Transaction.objects.all()
+
+    queryset = queryset.filter(
+        completed_date__isnull=False,
+        category__isnull=False,
+        report_date__range=(start, end),
+    )
+    if categories is not None:
+        queryset = queryset.filter(category__in=categories)
+
+    rows = (
+        queryset
+        .annotate(period=GRANULARITY_TRUNC[granularity]("report_date"))
+        .values("category_id", "period")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+
+    values = {}
+    for row in rows:
+        period = row["period"]
+        if hasattr(period, "date"):
+            period = period.date()
+        values[(row["category_id"], period)] = row["total"] or Decimal(0)
+
+    return CategoryPivot(periods, granularity, values)
+
+
+def get_rollup_values(start: date, end: date, granularity: str = "month", categories=None) -> dict:
+    """
+    Read category x period sums from monthly rollups instead of the ledger.
+    """
+    rollups = (
+        CategoryMonthTotal.objects
+        .filter(category__isnull=False)
+        .annotate(month_key=F("year") * 100 + F("month"))
+        .filter(month_key__range=(start.year * 100 + start.month, end.year * 100 + end.month))
+    )
+    if categories is not None:
+        rollups = rollups.filter(category__in=categories)
+
+    values = {}
+    rows = rollups.values("category_id", "year", "month").annotate(month_total=Sum("total")).order_by()
+    for row in rows:
+        period = period_start(date(row["year"], row["month"], 1), granularity)
+        key = (row["category_id"], period)
+        values[key] = values.get(key, Decimal(0)) + (row["month_total"] or Decimal(0))
+    return values
@@ -0,0 +1,145 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils.dateparse import parse_date
+
+from .models import CategoryMonthTotal, Transaction
+
+ROLLUP_KEY_FIELDS = ("category_id", "bank_account_id", "type", "year", "month")
+UNCATEGORISED_KEY = 0
+
+
+def rollup_key(tr: Transaction):
+    """
+    Get rollup key of a transaction, None if it has no report month.
+    """
+    report_date = tr.report_date
+    if isinstance(report_date, str):
+        report_date = parse_date(report_date)
+    if not report_date:
+        return None
+    return (tr.category_id, tr.bank_account_id, tr.type, report_date.year, report_date.month)
+
+
+def rollup_entries(transactions) -> list:
+    """
+    Snapshot rollup keys and amounts of transactions before they change.
+    """
+    entries = []
+    for tr in transactions:
+        if tr is None:
+            continue
+        key = rollup_key(tr)
+        if key is not None:
+            entries.append((key, Decimal(str(tr.amount))))
+    return entries
+
+
+def rollup_lookup(key) -> dict:
+    """
+    Get the unique lookup of a rollup row from a rollup key.
+    """
+    lookup = dict(zip(ROLLUP_KEY_FIELDS, key))
+    category_id = lookup.pop("category_id")
+    lookup["category_key"] = category_id or UNCATEGORISED_KEY
+    return lookup
+
+
+def apply_rollup_deltas(deltas: dict):
+    """
+    Add amount and count deltas to rollup rows, creating missing rows.
+    """
+    for key, (amount, count) in deltas.items():
+        if not amount and not count:
+            continue
+        lookup = rollup_lookup(key)
+        updated = CategoryMonthTotal.objects.filter(**lookup).update(
+            total=F("total") + amount, count=F("count") + count
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                CategoryMonthTotal.objects.create(
+                    category_id=key[0], total=amount, count=count, **lookup
+                )
+        except IntegrityError:
+            CategoryMonthTotal.objects.filter(**lookup).update(
+                total=F("total") + amount, count=F("count") + count
+            )
+
+
+def apply_rollup_entries(entries: list, sign: int = 1):
+    """
+    Add (sign=1) or remove (sign=-1) transaction snapshots from rollups.
+    """
+    deltas = {}
+    for key, amount in entries:
+        total, count = deltas.get(key, (Decimal(0), 0))
+        deltas[key] = (total + sign * amount, count + sign)
+    apply_rollup_deltas(deltas)
+
+
+def merge_category_rollups(category_id):
+    """
+    Move the rollups of a category into the uncategorised rows, as its transactions lose it.
+    """
+    rows = CategoryMonthTotal.objects.select_for_update().filter(category_key=category_id)
+    deltas = {}
+    for row in rows:
+        key = (None, row.bank_account_id, row.type, row.year, row.month)
+        total, count = deltas.get(key, (Decimal(0), 0))
+        deltas[key] = (total + row.total, count + row.count)
+    rows.delete()
+    apply_rollup_deltas(deltas)
+
+
+def add_queryset_to_rollups(queryset):
+    """
+    Add transactions to rollups with one grouped aggregate.
+    """
+    rows = (
+        queryset
+        .filter(report_date__isnull=False)
+        .annotate(year=ExtractYear("report_date"), month=ExtractMonth("report_date"))
+        .values(*ROLLUP_KEY_FIELDS)
+        .annotate(row_total=Sum("amount"), row_count=Count("id"))
+        .order_by()
+    )
+    apply_rollup_deltas(
+        {
+            tuple(row[field] for field in ROLLUP_KEY_FIELDS): (row["row_total"] or Decimal(0), row["row_count"])
+            for row in rows
+        }
+    )
+
+
+def rebuild_rollups() -> int:
+    """
+    Recompute all rollup rows from completed transactions.
+    """
+    rows = (
+        Transaction.objects
+        .filter(completed_date__isnull=False, report_date__isnull=False)
+        .annotate(year=ExtractYear("report_date"), month=ExtractMonth("report_date"))
+        .values(*ROLLUP_KEY_FIELDS)
+        .annotate(row_total=Sum("amount"), row_count=Count("id"))
+        .order_by()
+    )
+    with transaction.atomic():
+        CategoryMonthTotal.objects.all().delete()
+        created = CategoryMonthTotal.objects.bulk_create(
+            [
+                CategoryMonthTotal(
+                    category_id=row["category_id"],
+                    total=row["row_total"] or Decimal(0),
+                    count=row["row_count"],
+                    **rollup_lookup(tuple(row[field] for field in ROLLUP_KEY_FIELDS)),
+                )
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+    return len(created)
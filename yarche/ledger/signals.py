@@ -0,0 +1,11 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from .models import TransactionCategory
+from .rollups import merge_category_rollups
+
+
+@receiver(pre_delete, sender=TransactionCategory)
+def category_deleting(sender, instance, **kwargs):
+    # Транзакции категории остаются с category=NULL, итоги переходят туда же
+    merge_category_rollups(instance.pk)
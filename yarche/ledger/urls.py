@@ -83,6 +83,7 @@ urlpatterns = [
     # Transactions
     path("transaction-types/", views.transaction_types, name="transaction_types"),
     path("transactions/list/", views.transaction_list, name="transaction_list"),
+    path("transactions/export/", views.transactions_export, name="transactions_export"),
     path("transactions/add/", views.transaction_create, name="transaction_create"),
     path("transactions/<int:pk>/", views.transaction_detail, name="transaction_detail"),
     path(
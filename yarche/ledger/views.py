@@ -1,3 +1,4 @@
+from datetime import date
 from decimal import Decimal
 from types import SimpleNamespace
 from typing import List, Optional
@@ -8,7 +9,8 @@ from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import F, Sum
+from django.db.models.functions import Abs
 from django.forms.models import model_to_dict
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, render
@@ -20,9 +22,18 @@ from django.views.decorators.http import require_http_methods
 
 from commerce.models import Client, Order
 from users.models import Notification, User
+from users.permissions import has_perm
+from yarche.exports import export_response, get_export_format, iter_keyset_rows
+from yarche.pagination import KeysetPaginator
+from yarche.tables import render_table_rows, rows_response, wants_rows
 from yarche.utils import get_model_fields
 
 from .models import BankAccount, BankAccountType, Transaction, TransactionCategory
+from .balances import get_balances_at, record_daily_balances
+from .capital import get_year_capital_percents
+from .order_payments import apply_payment_entries, payment_entries, settle_order_payments
+from .reports import GRANULARITY_TRUNC, build_category_pivot
+from .rollups import add_queryset_to_rollups, apply_rollup_entries, rollup_entries
 
 locale.setlocale(locale.LC_ALL, "ru_RU.UTF-8")
 CURRENCY_SUFFIX = " р."
@@ -52,13 +63,65 @@ def format_currency(amount: float) -> str:
     return sum_str.replace('\xa0', ' ') + CURRENCY_SUFFIX
 
 
-def check_permission(user, codename: str) -> bool:
+def get_report_period(request):
+    """
+    Get report year, date range and granularity from request params.
+    """
+    try:
+        year = int(request.GET.get("year", timezone.now().year))
+    except (TypeError, ValueError):
+        year = timezone.now().year
+
+    start = parse_date(request.GET.get("start_date", "")) or date(year, 1, 1)
+    end = parse_date(request.GET.get("end_date", "")) or date(year, 12, 31)
+    if start > end:
+        start, end = end, start
+
+    granularity = request.GET.get("granularity", "month")
+    if granularity not in GRANULARITY_TRUNC:
+        granularity = "month"
+
+    return year, start, end, granularity
+
+
+def get_pivot_fields(pivot):
+    """
+    Get table fields for category pivot report.
+    """
+    fields = [{"name": "category", "verbose_name": "Категория"}]
+    for i, label in enumerate(pivot.labels(), start=1):
+        fields.append({"name": f"m{i}", "verbose_name": label, "is_number": True, "is_currency": True})
+    fields.append({"name": "total", "verbose_name": "Итого", "is_number": True, "is_currency": True})
+    return fields
+
+
+def get_pivot_row(name: str, values: list, total) -> SimpleNamespace:
+    """
+    Build formatted table row for category pivot report.
+    """
+    row = {"category": name}
+    for idx, value in enumerate(values, start=1):
+        row[f"m{idx}"] = format_currency(value)
+    row["total"] = format_currency(total)
+    return SimpleNamespace(**row)
+
+
+def is_cursor_pagination(request) -> bool:
     """
-    Check if user has the specified permission.
+    Check if the client asked for cursor (keyset) pagination.
     """
-    if hasattr(user, "user_type") and user.user_type:
-        return user.user_type.permissions.filter(codename=codename).exists()
-    return False
+    return "cursor" in request.GET or request.GET.get("pagination") == "cursor"
+
+
+def get_cursor_page(request, queryset, key_field: str, per_page: int, descending: bool = True):
+    """
+    Get keyset page for the cursor from request params.
+    """
+    paginator = KeysetPaginator(queryset, key_field, per_page, descending=descending)
+    return paginator.get_page(
+        request.GET.get("cursor") or None,
+        with_total=request.GET.get("with_total") in ["1", "true"],
+    )
 
 
 class BankAccountData:
@@ -369,15 +432,8 @@ def refresh_bank_accounts(request):
     Refresh bank accounts table.
     """
     accounts = BankAccount.objects.all()
-    html = "".join(
-        render_to_string(
-            "components/table_row.html",
-            {
-                "item": acc,
-                "fields": get_model_fields(BankAccount, excluded_fields=["balance"]),
-            },
-        )
-        for acc in accounts
+    html = render_table_rows(
+        accounts, get_model_fields(BankAccount, excluded_fields=["balance"])
     )
     return HttpResponse(html)
 
@@ -536,13 +592,7 @@ def refresh_transaction_categories(request):
     Refresh transaction categories table.
     """
     categories = TransactionCategory.objects.all()
-    html = "".join(
-        render_to_string(
-            "components/table_row.html",
-            {"item": cat, "fields": get_model_fields(TransactionCategory)},
-        )
-        for cat in categories
-    )
+    html = render_table_rows(categories, get_model_fields(TransactionCategory))
     return HttpResponse(html)
 
 
@@ -583,32 +633,28 @@ def transaction_list(request):
 
     transactions = Transaction.objects.filter(
         completed_date__range=(start_date, end_date), completed_date__isnull=False
-    )
-
-    page_number = request.GET.get("page", 1)
-    paginator = Paginator(list(transactions), 25)
-    page_obj = paginator.get_page(page_number)
+    ).select_related("category", "bank_account", "client")
 
-    transaction_ids = [tr.id for tr in page_obj.object_list]
+    if is_cursor_pagination(request):
+        page = get_cursor_page(request, transactions, "completed_date", 25, descending=False)
+        object_list = page.object_list
+        context = page.context()
+    else:
+        paginator = Paginator(transactions.order_by("completed_date", "id"), 25)
+        page_obj = paginator.get_page(request.GET.get("page", 1))
+        object_list = page_obj.object_list
+        context = {
+            "total_pages": paginator.num_pages,
+            "current_page": page_obj.number,
+        }
 
-    html = "".join(
-        render_to_string(
-            "components/table_row.html",
-            {"item": tr, "fields": get_transaction_fields()},
-        )
-        for tr in page_obj.object_list
-    )
+    fields = get_transaction_fields()
+    context["transaction_ids"] = [tr.id for tr in object_list]
+    if wants_rows(request):
+        return rows_response(request, object_list, fields, context)
 
-    return JsonResponse(
-        {
-            "html": html,
-            "context": {
-                "total_pages": paginator.num_pages,
-                "current_page": page_obj.number,
-                "transaction_ids": transaction_ids,
-            },
-        }
-    )
+    html = render_table_rows(object_list, fields)
+    return JsonResponse({"html": html, "context": context})
 
 
 @login_required
@@ -824,11 +870,14 @@ def transaction_update(request, pk: int):
                             status=400,
                         )
 
+            old_payment_entries = payment_entries([tr])
             result = handle_transaction_update(tr, data)
             if isinstance(result, JsonResponse):
                 return result
 
             updated_tr, related_tr = result
+            apply_payment_entries(old_payment_entries, sign=-1)
+            apply_payment_entries(payment_entries([updated_tr]))
             fields = get_transaction_fields()
 
             if tr.type == "transfer":
@@ -885,7 +934,8 @@ def closed_transaction_update(request, pk: int):
             old_related_amount = related_tr.amount if related_tr else None
             old_related_bank_account = related_tr.bank_account if related_tr else None
 
-            old_order = tr.order if hasattr(tr, "order") else None
+            old_rollup_entries = rollup_entries([tr, related_tr])
+            old_payment_entries = payment_entries([tr])
 
             data = (
                 json.loads(request.body)
@@ -899,6 +949,10 @@ def closed_transaction_update(request, pk: int):
 
             updated_tr, related_tr = result
 
+            if tr.completed_date:
+                apply_rollup_entries(old_rollup_entries, sign=-1)
+                apply_rollup_entries(rollup_entries([updated_tr, related_tr]))
+
             table = request.GET.get('table', 'transactions')
             if table == 'all':
                 if updated_tr:
@@ -932,19 +986,9 @@ def closed_transaction_update(request, pk: int):
                     related_tr.bank_account.balance += Decimal(str(related_tr.amount))
                     related_tr.bank_account.save()
 
-            if old_order and tr.type == "order_payment":
-                old_order.paid_amount -= abs(Decimal(str(old_amount)))
-                old_order.save()
-            if updated_tr and updated_tr.type == "order_payment" and updated_tr.order:
-                updated_tr.order.paid_amount += abs(Decimal(str(updated_tr.amount)))
-                updated_tr.order.save()
-
-            if old_order and tr.type == "client_account_payment":
-                old_order.paid_amount -= abs(Decimal(str(old_amount)))
-                old_order.save()
-            if updated_tr and updated_tr.type == "client_account_payment" and updated_tr.order:
-                updated_tr.order.paid_amount += abs(Decimal(str(updated_tr.amount)))
-                updated_tr.order.save()
+            # Оплаченная сумма заказа меняется вместе со счетчиками проведенных платежей
+            apply_payment_entries(old_payment_entries, sign=-1)
+            apply_payment_entries(payment_entries([updated_tr]))
 
             if tr.type == "client_account_payment" and tr.client:
                 tr.client.balance += abs(Decimal(str(old_amount)))
@@ -974,6 +1018,15 @@ def closed_transaction_update(request, pk: int):
                     related_tr.bank_account.balance += Decimal(str(related_tr.amount))
                     related_tr.bank_account.save()
 
+            record_daily_balances(
+                [
+                    old_bank_account.id if old_bank_account else None,
+                    old_related_bank_account.id if old_related_bank_account else None,
+                    updated_tr.bank_account_id if updated_tr else None,
+                    related_tr.bank_account_id if related_tr else None,
+                ]
+            )
+
             if tr.type == "transfer":
                 return JsonResponse(
                     {
@@ -1034,7 +1087,9 @@ def transaction_delete(request, pk: int):
                 related_id = tr.related_transaction.id
                 tr.related_transaction.delete()
 
+            deleted_payment_entries = payment_entries([tr])
             tr.delete()
+            apply_payment_entries(deleted_payment_entries, sign=-1)
             return JsonResponse(
                 {"status": "success", "related_transaction_id": related_id}
             )
@@ -1060,32 +1115,40 @@ def closed_transaction_delete(request, pk: int):
                     status=400,
                 )
 
+            apply_rollup_entries(
+                rollup_entries(
+                    [tr, tr.related_transaction if tr.type == "transfer" else None]
+                ),
+                sign=-1,
+            )
+
             if tr.bank_account:
                 tr.bank_account.balance -= Decimal(str(tr.amount))
                 tr.bank_account.save()
 
-            if tr.type == "order_payment" and tr.order:
-                tr.order.paid_amount -= abs(Decimal(str(tr.amount)))
-                tr.order.save()
-            elif tr.type == "client_account_deposit" and tr.client:
+            if tr.type == "client_account_deposit" and tr.client:
                 tr.client.balance -= abs(Decimal(str(tr.amount)))
                 tr.client.save()
             elif tr.type == "client_account_payment" and tr.client and tr.order:
                 tr.client.balance += abs(Decimal(str(tr.amount)))
                 tr.client.save()
-                tr.order.paid_amount -= abs(Decimal(str(tr.amount)))
-                tr.order.save()
 
             related_id = None
+            account_ids = [tr.bank_account_id]
             if tr.type == "transfer" and tr.related_transaction:
                 related_tr = tr.related_transaction
                 related_id = related_tr.id
+                account_ids.append(related_tr.bank_account_id)
                 if related_tr.bank_account:
                     related_tr.bank_account.balance -= Decimal(str(related_tr.amount))
                     related_tr.bank_account.save()
                 related_tr.delete()
 
+            record_daily_balances(account_ids)
+
+            deleted_payment_entries = payment_entries([tr])
             tr.delete()
+            apply_payment_entries(deleted_payment_entries, sign=-1)
             return JsonResponse(
                 {"status": "success", "related_transaction_id": related_id}
             )
@@ -1103,13 +1166,13 @@ def payments(request):
     View for payments list.
     """
     user = request.user
-    has_perm = check_permission(user, "view_all_payments")
+    can_view_all = has_perm(user, "view_all_payments")
 
     transactions = Transaction.objects.filter(
         completed_date__isnull=False, type="order_payment"
     ).select_related("order__client", "order__manager")
 
-    if not has_perm:
+    if not can_view_all:
         transactions = transactions.filter(order__manager=user)
 
     fields = get_payment_fields()
@@ -1118,7 +1181,7 @@ def payments(request):
     context = {
         "fields": fields,
         "data": data,
-        "restricted_user": user.last_name if not has_perm else None,
+        "restricted_user": user.last_name if not can_view_all else None,
     }
     return render(request, "ledger/payments.html", context)
 
@@ -1197,7 +1260,7 @@ def prepare_payment_data(transactions):
             tr.order.client.legal_name if tr.order and tr.order.client else None
         )
         tr.manager = tr.order.manager.last_name or tr.order.manager.username if tr.order and tr.order.manager else None
-        tr.remaining_debt = tr.order.amount - tr.order.paid_amount if tr.order else 0
+        tr.remaining_debt = tr.order.remaining_amount if tr.order else 0
         data.append(tr)
     return data
 
@@ -1274,26 +1337,90 @@ def prepare_shift_transactions(transactions):
     return data
 
 
-def update_balances(transactions):
+def get_shift_deltas(transactions):
     """
-    Update balances based on transactions.
+    Get balance deltas per bank account, order and client from one grouped aggregate.
     """
-    for tr in transactions:
-        if tr.bank_account:
-            tr.bank_account.balance += tr.amount
-            tr.bank_account.save()
-
-        if tr.type == "order_payment" and tr.order:
-            tr.order.paid_amount += abs(tr.amount)
-            tr.order.save()
-        elif tr.type == "client_account_deposit" and tr.client:
-            tr.client.balance += abs(tr.amount)
-            tr.client.save()
-        elif tr.type == "client_account_payment" and tr.client and tr.order:
-            tr.client.balance -= abs(tr.amount)
-            tr.client.save()
-            tr.order.paid_amount += abs(tr.amount)
-            tr.order.save()
+    account_deltas = {}
+    order_deltas = {}
+    client_deltas = {}
+
+    rows = (
+        transactions
+        .values("type", "bank_account_id", "order_id", "client_id")
+        .annotate(total=Sum("amount"), abs_total=Sum(Abs("amount")))
+        .order_by()
+    )
+    for row in rows:
+        total = row["total"] or Decimal(0)
+        abs_total = row["abs_total"] or Decimal(0)
+        order_id = row["order_id"]
+        client_id = row["client_id"]
+
+        if row["bank_account_id"]:
+            account_deltas[row["bank_account_id"]] = account_deltas.get(row["bank_account_id"], Decimal(0)) + total
+
+        if row["type"] == "order_payment" and order_id:
+            order_deltas[order_id] = order_deltas.get(order_id, Decimal(0)) + abs_total
+        elif row["type"] == "client_account_deposit" and client_id:
+            client_deltas[client_id] = client_deltas.get(client_id, Decimal(0)) + abs_total
+        elif row["type"] == "client_account_payment" and client_id and order_id:
+            client_deltas[client_id] = client_deltas.get(client_id, Decimal(0)) - abs_total
+            order_deltas[order_id] = order_deltas.get(order_id, Decimal(0)) + abs_total
+
+    return account_deltas, order_deltas, client_deltas
+
+
+def get_shift_order_payments(transactions) -> dict:
+    """
+    Get total payment per order in the shift, used for the debt check.
+    """
+    rows = (
+        transactions
+        .filter(type__in=["order_payment", "client_account_payment"], order__isnull=False)
+        .values("order_id")
+        .annotate(total=Sum(Abs("amount")))
+        .order_by()
+    )
+    return {row["order_id"]: row["total"] or Decimal(0) for row in rows}
+
+
+def apply_deltas(model, objects: dict, deltas: dict, field: str):
+    """
+    Apply deltas to locked objects with F() expressions in one bulk update.
+    """
+    changed = []
+    for obj_id, delta in deltas.items():
+        obj = objects.get(obj_id)
+        if obj is None or not delta:
+            continue
+        setattr(obj, field, F(field) + delta)
+        changed.append(obj)
+    if changed:
+        model.objects.bulk_update(changed, [field])
+
+
+def build_payment_notifications(orders: dict, order_deltas: dict) -> list:
+    """
+    Build payment notifications for managers of the paid orders.
+    """
+    notifications = []
+    for order_id, delta in order_deltas.items():
+        order = orders.get(order_id)
+        if order is None or delta <= 0 or not order.manager_id:
+            continue
+        new_paid = order.paid_amount + delta
+        percentage = (new_paid / order.amount) * 100 if order.amount else 0
+        notifications.append(
+            Notification(
+                user_id=order.manager_id,
+                message=f"По заказу №{order.id} поступил платеж в размере {format_currency(delta)}. Оплачено {percentage:.2f}%.",
+                url=f"/commerce/works/?order_id={order.id}&client_id={order.client_id or ''}&product_id={order.product_id or ''}&client_object_id={order.client_object_id or ''}",
+                type="Оплата по заказу",
+                order_id=order.id,
+            )
+        )
+    return notifications
 
 
 def render_updated_accounts_table():
@@ -1349,14 +1476,15 @@ def order_payment_create(request):
                 "report_date": report_date_value,
             }
 
-            validate_payment_data(data, request.user)
+            validate_payment_data(data)
             tr = Transaction.objects.create(**data)
+            apply_payment_entries(payment_entries([tr]))
             return render_transaction_response(tr)
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
 
 
-def validate_payment_data(data, user):
+def validate_payment_data(data):
     """
     Validate payment data.
     """
@@ -1367,32 +1495,10 @@ def validate_payment_data(data, user):
     if not data["order_id"]:
         raise ValidationError("Не указан заказ")
 
-    order = Order.objects.get(id=data["order_id"])
-    debt = calculate_remaining_debt(order, user)
-
-    if data["amount"] > debt:
-        raise ValidationError(f"Сумма превышает долг ({format_currency(debt)})")
-
-
-def calculate_remaining_debt(order, user):
-    """
-    Calculate remaining debt for an order.
-    """
-    payments = (
-        Transaction.objects.filter(
-            order=order, type="order_payment", completed_date__isnull=True, created_by=user
-        ).aggregate(total=Sum("amount"))["total"]
-        or 0
-    )
-
-    client_payments = (
-        Transaction.objects.filter(
-            order=order, type="client_account_payment", completed_date__isnull=True, created_by=user
-        ).aggregate(total=Sum("amount"))["total"]
-        or 0
-    )
-
-    return order.amount - (payments - client_payments + order.paid_amount)
+    # Блокировка заказа не дает двум кассирам одновременно превысить долг
+    order = Order.objects.select_for_update().get(id=data["order_id"])
+    if data["amount"] > order.remaining_debt:
+        raise ValidationError(f"Сумма превышает долг ({format_currency(order.remaining_debt)})")
 
 
 @login_required
@@ -1436,6 +1542,7 @@ def client_balance_payment(request):
             data["amount"] = -abs(data["amount"])
 
             tr = Transaction.objects.create(**data)
+            apply_payment_entries(payment_entries([tr]))
             return render_transaction_response(tr)
     except Exception as e:
         return JsonResponse({"status": "error", "message": str(e)}, status=400)
@@ -1453,16 +1560,15 @@ def validate_client_payment(data, user):
         raise ValidationError("Не указан заказ")
 
     client = Client.objects.get(id=data["client_id"])
-    order = Order.objects.get(id=data["order_id"])
+    order = Order.objects.select_for_update().get(id=data["order_id"])
 
     balance = calculate_client_balance(client, user)
 
     if data["amount"] > balance:
         raise ValidationError(f"Недостаточно средств: {format_currency(balance)}")
 
-    debt = calculate_order_debt(order, user)
-    if data["amount"] > debt:
-        raise ValidationError(f"Сумма превышает долг ({format_currency(debt)})")
+    if data["amount"] > order.remaining_debt:
+        raise ValidationError(f"Сумма превышает долг ({format_currency(order.remaining_debt)})")
 
 
 def calculate_client_balance(client, user):
@@ -1485,27 +1591,6 @@ def calculate_client_balance(client, user):
     return client.balance + deposits + payments
 
 
-def calculate_order_debt(order, user):
-    """
-    Calculate order debt.
-    """
-    order_payments = (
-        Transaction.objects.filter(order=order, type="order_payment", created_by=user).aggregate(
-            total=Sum("amount")
-        )["total"]
-        or 0
-    )
-
-    client_payments = (
-        Transaction.objects.filter(
-            order=order, type="client_account_payment", created_by=user
-        ).aggregate(total=Sum("amount"))["total"]
-        or 0
-    )
-
-    return order.amount - (order_payments - client_payments)
-
-
 @login_required
 @require_http_methods(["POST"])
 def client_balance_deposit(request):
@@ -1570,13 +1655,15 @@ class BankAccountDataBalance:
 @login_required
 def bank_accounts_balances(request):
     """
-    View for bank accounts balances.
+    View for bank accounts balances, optionally at the end of a past date.
     """
     accounts = BankAccount.objects.select_related('type').order_by('type__name', 'name')
+    balance_date = parse_date(request.GET.get("date", ""))
+    balances = get_balances_at(balance_date) if balance_date else None
     grouped = {}
     for acc in accounts:
         acc_type = acc.type.name if acc.type else "Без типа"
-        acc.balance = format_currency(acc.balance)
+        acc.balance = format_currency(balances.get(acc.id, 0) if balances is not None else acc.balance)
         grouped.setdefault(acc_type, []).append(acc)
     fields = [
         {"name": "name", "verbose_name": "Название счета"},
@@ -1587,45 +1674,59 @@ def bank_accounts_balances(request):
         "data": grouped,
         "is_grouped": {"bank_accounts_balances-table": True},
         "id": "bank_accounts_balances-table",
+        "balance_date": balance_date,
     }
     return render(request, "ledger/bank_accounts_balances.html", context)
 
 
-@login_required
-def all_transactions(request):
+ALL_TRANSACTIONS_FIELDS = [
+    {"name": "created", "verbose_name": "Дата"},
+    {"name": "type", "verbose_name": "Тип"},
+    {"name": "category", "verbose_name": "Категория"},
+    {"name": "bank_account", "verbose_name": "Счет"},
+    {"name": "amount", "verbose_name": "Сумма", "is_number": True, "is_currency": True},
+    {"name": "comment", "verbose_name": "Комментарий"},
+    {"name": "created_by", "verbose_name": "Пользователь"},
+]
+
+
+def get_all_transactions_page(request):
     """
-    View for all transactions.
+    Get one page of all transactions, by page number or by cursor.
     """
-    page_number = request.GET.get("page", 1)
-    transactions = (
-        Transaction.objects
-        .select_related("bank_account", "created_by", "category")
-        .order_by("-created")
-    )
-    paginator = Paginator(transactions, 200)
-    page_obj = paginator.get_page(page_number)
+    transactions = Transaction.objects.select_related("bank_account", "created_by", "category")
 
-    for tr in page_obj.object_list:
+    if is_cursor_pagination(request):
+        page = get_cursor_page(request, transactions, "created", 200)
+        object_list = page.object_list
+        context = page.context()
+    else:
+        paginator = Paginator(transactions.order_by("-created", "-id"), 200)
+        page_obj = paginator.get_page(request.GET.get("page", 1))
+        object_list = page_obj.object_list
+        context = {
+            "total_pages": paginator.num_pages,
+            "current_page": page_obj.number,
+        }
+
+    for tr in object_list:
         tr.type = tr.get_type_display()
+    context["transaction_ids"] = [tr.id for tr in object_list]
 
-    fields = [
-        {"name": "created", "verbose_name": "Дата"},
-        {"name": "type", "verbose_name": "Тип"},
-        {"name": "category", "verbose_name": "Категория"},
-        {"name": "bank_account", "verbose_name": "Счет"},
-        {"name": "amount", "verbose_name": "Сумма", "is_number": True, "is_currency": True},
-        {"name": "comment", "verbose_name": "Комментарий"},
-        {"name": "created_by", "verbose_name": "Пользователь"},
-    ]
+    return object_list, context
+
+
+@login_required
+def all_transactions(request):
+    """
+    View for all transactions.
+    """
+    object_list, page_context = get_all_transactions_page(request)
 
     context = {
-        "fields": fields,
-        "data": page_obj,
-        "context": {
-            "total_pages": paginator.num_pages,
-            "current_page": page_obj.number,
-            "transaction_ids": [tr.id for tr in page_obj.object_list],
-        },
+        "fields": ALL_TRANSACTIONS_FIELDS,
+        "data": object_list,
+        "context": page_context,
     }
     return render(request, "ledger/all_transactions.html", context)
 
@@ -1635,46 +1736,78 @@ def all_transactions_table(request):
     """
     Get paginated table for all transactions.
     """
-    page_number = request.GET.get("page", 1)
-    transactions = (
-        Transaction.objects
-        .select_related("bank_account", "created_by", "category")
-        .order_by("-created")
-    )
-    paginator = Paginator(transactions, 200)
-    page_obj = paginator.get_page(page_number)
+    object_list, context = get_all_transactions_page(request)
+    if wants_rows(request):
+        return rows_response(request, object_list, ALL_TRANSACTIONS_FIELDS, context)
 
-    for tr in page_obj.object_list:
-        tr.type = tr.get_type_display()
-
-    fields = [
-        {"name": "created", "verbose_name": "Дата"},
-        {"name": "type", "verbose_name": "Тип"},
-        {"name": "category", "verbose_name": "Категория"},
-        {"name": "bank_account", "verbose_name": "Счет"},
-        {"name": "amount", "verbose_name": "Сумма", "is_number": True, "is_currency": True},
-        {"name": "comment", "verbose_name": "Комментарий"},
-        {"name": "created_by", "verbose_name": "Пользователь"},
-    ]
-
-    html = "".join(
-        render_to_string(
-            "components/table_row.html",
-            {"item": tr, "fields": fields},
-        )
-        for tr in page_obj.object_list
-    )
+    html = render_table_rows(object_list, ALL_TRANSACTIONS_FIELDS)
 
     return JsonResponse({
         "html": html,
-        "context": {
-            "total_pages": paginator.num_pages,
-            "current_page": page_obj.number,
-            "transaction_ids": [tr.id for tr in page_obj.object_list],
-        }
+        "context": context,
     })
 
 
+TRANSACTIONS_EXPORT_COLUMNS = [
+    ("id", "ID"),
+    ("created", "Создана"),
+    ("completed_date", "Проведена"),
+    ("report_date", "Отчетный месяц"),
+    ("type", "Тип"),
+    ("category__name", "Категория"),
+    ("bank_account__name", "Счет"),
+    ("amount", "Сумма"),
+    ("client__name", "Клиент"),
+    ("order_id", "Заказ №"),
+    ("comment", "Комментарий"),
+    ("created_by__username", "Пользователь"),
+]
+
+
+def iter_transactions_export_rows(transactions, key_field: str, descending: bool):
+    """
+    Yield export rows of transactions reading the queryset in keyset batches.
+    """
+    type_names = dict(Transaction.TransactionType.choices)
+    columns = [name for name, _ in TRANSACTIONS_EXPORT_COLUMNS]
+    type_index = columns.index("type")
+    for row in iter_keyset_rows(transactions, columns, key_field, descending=descending):
+        row = list(row)
+        row[type_index] = type_names.get(row[type_index], row[type_index])
+        yield row
+
+
+@login_required
+@require_http_methods(["GET"])
+def transactions_export(request):
+    """
+    Stream all transactions of the date range as CSV or XLSX.
+    """
+    export_format = get_export_format(request)
+    if not export_format:
+        return JsonResponse(
+            {"status": "error", "message": "Неизвестный формат выгрузки"}, status=400
+        )
+
+    start_date = parse_date(request.GET.get("start_date", ""))
+    end_date = parse_date(request.GET.get("end_date", ""))
+
+    transactions = Transaction.objects.all()
+    if start_date and end_date:
+        transactions = transactions.filter(completed_date__range=(start_date, end_date))
+        key_field, descending = "completed_date", False
+    else:
+        key_field, descending = "created", True
+
+    return export_response(
+        export_format,
+        "transactions",
+        [verbose_name for _, verbose_name in TRANSACTIONS_EXPORT_COLUMNS],
+        iter_transactions_export_rows(transactions, key_field, descending),
+        sheet_name="Операции",
+    )
+
+
 @login_required
 @require_http_methods(["POST"])
 def close_shift(request):
@@ -1684,32 +1817,36 @@ def close_shift(request):
     try:
         with transaction.atomic():
             user = request.user
-            if not check_permission(user, "close_current_shift"):
+            if not has_perm(user, "close_current_shift"):
                 return JsonResponse(
                     {"status": "error", "message": "Нет прав на закрытие смены"},
                     status=403,
                 )
 
-            transactions = Transaction.objects.filter(completed_date__isnull=True, created_by=user)
+            transaction_ids = list(
+                Transaction.objects.select_for_update()
+                .filter(completed_date__isnull=True, created_by=user)
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
 
-            if not transactions.exists():
+            if not transaction_ids:
                 return JsonResponse(
                     {"status": "error", "message": "Нет открытых транзакций"},
                     status=400,
                 )
 
-            orders_to_check = transactions.filter(
-                type__in=["order_payment", "client_account_payment"]
-            ).values_list("order", flat=True).distinct()
+            transactions = Transaction.objects.filter(id__in=transaction_ids)
+            account_deltas, order_deltas, client_deltas = get_shift_deltas(transactions)
+            order_payments = get_shift_order_payments(transactions)
 
-            for order_id in orders_to_check:
-                order = Order.objects.get(id=order_id)
-                involved_transactions = transactions.filter(
-                    order=order, type__in=["order_payment", "client_account_payment"]
-                )
-                total_payment = sum(
-                    abs(tr.amount) for tr in involved_transactions
-                )
+            # Блокируем строки всегда в одном порядке: счета, заказы, клиенты
+            accounts = BankAccount.objects.select_for_update().filter(id__in=account_deltas).order_by("id").in_bulk()
+            orders = Order.objects.select_for_update().filter(id__in=set(order_deltas) | set(order_payments)).order_by("id").in_bulk()
+            clients = Client.objects.select_for_update().filter(id__in=client_deltas).order_by("id").in_bulk()
+
+            for order_id, total_payment in order_payments.items():
+                order = orders[order_id]
                 current_debt = order.amount - order.paid_amount
                 if total_payment > current_debt:
                     return JsonResponse(
@@ -1720,33 +1857,16 @@ def close_shift(request):
                         status=400,
                     )
 
-            orders_affected = set()
-            for tr in transactions:
-                if tr.type in ["order_payment", "client_account_payment"] and tr.order:
-                    orders_affected.add(tr.order)
-            old_paid = {order: order.paid_amount for order in orders_affected}
-
-            current_date = timezone.now().date()
-            update_balances(transactions)
-            transactions.update(completed_date=current_date)
-
-            for order in orders_affected:
-                new_paid = order.paid_amount
-                old = old_paid[order]
-                if new_paid > old:
-                    payment_amount = new_paid - old
-                    percentage = (new_paid / order.amount) * 100 if order.amount else 0
-                    message = f"По заказу №{order.id} поступил платеж в размере {format_currency(payment_amount)}. Оплачено {percentage:.2f}%."
-                    client_id = order.client.id if order.client else ""
-                    product_id = order.product.id if order.product else ""
-                    client_object_id = order.client_object.id if order.client_object else ""
-                    Notification.objects.create(
-                        user=order.manager,
-                        message=message,
-                        url=f"/commerce/works/?order_id={order.id}&client_id={client_id}&product_id={product_id}&client_object_id={client_object_id}",
-                        type="Оплата по заказу",
-                        order=order
-                    )
+            notifications = build_payment_notifications(orders, order_deltas)
+
+            apply_deltas(BankAccount, accounts, account_deltas, "balance")
+            settle_order_payments(orders, order_payments)
+            apply_deltas(Client, clients, client_deltas, "balance")
+
+            record_daily_balances(account_deltas)
+            add_queryset_to_rollups(transactions)
+            transactions.update(completed_date=timezone.now().date())
+            Notification.objects.bulk_create(notifications)
 
             return JsonResponse({"html": render_updated_accounts_table()})
     except Exception as e:
@@ -1758,79 +1878,30 @@ def enterprise_economy_report(request):
     """
     Render enterprise economy report.
     """
-    year = int(request.GET.get("year", timezone.now().year))
-    months = [
-        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-    ]
-
-    fields = [{"name": "category", "verbose_name": "Категория"}]
-    for i, mname in enumerate(months, start=1):
-        fields.append({"name": f"m{i}", "verbose_name": mname, "is_number": True, "is_currency": True})
-    fields.append({"name": "total", "verbose_name": "Итого", "is_number": True, "is_currency": True})
+    year, start, end, granularity = get_report_period(request)
 
     incomes = list(TransactionCategory.objects.filter(type="income").exclude(name="Возврат от поставщиков").order_by("name"))
     refund_category = TransactionCategory.objects.filter(type="income", name="Возврат от поставщиков").first()
 
-    rows = []
-    monthly_totals = [0] * 12
-    grand_total = 0
+    report_categories = incomes + ([refund_category] if refund_category else [])
+    pivot = build_category_pivot(start, end, granularity, categories=report_categories)
+    fields = get_pivot_fields(pivot)
 
-    for cat in incomes:
-        month_values = []
-        row_total = 0
-        for m in range(1, 13):
-            s = (
-                Transaction.objects.filter(
-                    category=cat,
-                    report_date__year=year,
-                    report_date__month=m,
-                    completed_date__isnull=False
-                )
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-            val = float(s)
-            month_values.append(val)
-            row_total += val
-            monthly_totals[m - 1] += val
-        grand_total += row_total
-
-        row = {"category": cat.name}
-        for idx, v in enumerate(month_values, start=1):
-            row[f"m{idx}"] = format_currency(v)
-        row["total"] = format_currency(row_total)
-        rows.append(SimpleNamespace(**row))
-
-    total_row = {"category": "Итого"}
-    for idx, v in enumerate(monthly_totals, start=1):
-        total_row[f"m{idx}"] = format_currency(v)
-    total_row["total"] = format_currency(grand_total)
-    rows.append(SimpleNamespace(**total_row))
+    rows = [
+        get_pivot_row(cat.name, pivot.row(cat.id), pivot.row_total(cat.id))
+        for cat in incomes
+    ]
+    income_values, income_total = pivot.subtotal([cat.id for cat in incomes])
+    rows.append(get_pivot_row("Итого", income_values, income_total))
 
     if refund_category:
-        month_values = []
-        row_total = 0
-        for m in range(1, 13):
-            s = (
-                Transaction.objects.filter(
-                    refund_category,
-                    report_date__year=year,
-                    report_date__month=m,
-                    completed_date__isnull=False
-                )
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
+        rows.append(
+            get_pivot_row(
+                refund_category.name,
+                pivot.row(refund_category.id),
+                pivot.row_total(refund_category.id),
             )
-            val = float(s)
-            month_values.append(val)
-            row_total += val
-
-        row = {"category": refund_category.name}
-        for idx, v in enumerate(month_values, start=1):
-            row[f"m{idx}"] = format_currency(v)
-        row["total"] = format_currency(row_total)
-        rows.append(SimpleNamespace(**row))
+        )
 
     table_html = render_to_string(
         "components/table.html",
@@ -1859,58 +1930,29 @@ def cash_report_table(request):
     """
     Страница: суммы по категориям сделок по месяцам за год.
     """
-    year = int(request.GET.get("year", timezone.now().year))
-    months = [
-        "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
-        "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь"
-    ]
-
-    # Формируем поля таблицы
-    fields = [{"name": "category", "verbose_name": "Категория"}]
-    for i, mname in enumerate(months, start=1):
-        fields.append({"name": f"m{i}", "verbose_name": mname, "is_number": True, "is_currency": True})
-    fields.append({"name": "total", "verbose_name": "Итого", "is_number": True, "is_currency": True})
-
-    categories = TransactionCategory.objects.order_by("name")
-    rows = []
+    year, start, end, granularity = get_report_period(request)
 
-    # Словари для накопления сырых чисел (без форматирования)
-    monthly_totals = {m: 0 for m in range(1, 13)}
-    grand_total = 0
+    categories = list(TransactionCategory.objects.order_by("name"))
+    pivot = build_category_pivot(start, end, granularity, categories=categories)
+    fields = get_pivot_fields(pivot)
 
-    for cat in categories:
-        row = {"category": cat.name}
-        total = 0
-        for m in range(1, 13):
-            s = (
-                Transaction.objects.filter(
-                    category=cat,
-                    report_date__year=year,
-                    report_date__month=m,
-                    completed_date__isnull=False
-                )
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-            row[f"m{m}"] = format_currency(s)
-            total += s
-            monthly_totals[m] += s  # Накапливаем итог по колонке месяца
-        row["total"] = format_currency(total)
-        grand_total += total  # Накапливаем общий итог
-        rows.append(SimpleNamespace(**row))
-
-    # Формируем строку "Итого" из уже посчитанных чисел (никакого парсинга строк!)
-    total_row = {"category": "Итого"}
-    for m in range(1, 13):
-        total_row[f"m{m}"] = format_currency(monthly_totals[m])
-    total_row["total"] = format_currency(grand_total)
-    rows.append(SimpleNamespace(**total_row))
+    rows = [
+        get_pivot_row(cat.name, pivot.row(cat.id), pivot.row_total(cat.id))
+        for cat in categories
+    ]
+    rows.append(
+        get_pivot_row(
+            "Итого",
+            [pivot.column_total(period) for period in pivot.periods],
+            pivot.grand_total,
+        )
+    )
 
     context = {
         "fields": fields,
         "data": rows,
         "year": year,
-        "months": months,
+        "months": pivot.labels(),
         "id": "cash-report-table",
         "is_grouped": {"cash-report-table": False},
     }
@@ -2171,11 +2213,6 @@ def enterprise_balance_expand(request):
 
     return JsonResponse({'html': html})
 
-from datetime import datetime
-from django.db.models import Sum, F
-from calendar import monthrange
-from .models import MonthlyCapital
-
 @login_required
 def capital_by_month(request):
     year = int(request.GET.get("year", timezone.now().year))
@@ -2187,87 +2224,7 @@ def capital_by_month(request):
         "сентябрь", "октябрь", "ноябрь", "декабрь"
     ]
 
-    capitals = []
-    months = []
-
-    for month in range(1, 13):
-        percent = get_monthly_capital_percent(year, month)
-        capitals.append(percent)
-
-        # Берём месяц из списка вместо strftime
-        months.append(MONTHS_RU[month - 1])
-
     return JsonResponse({
-        "months": months,
-        "capitals": capitals
+        "months": MONTHS_RU,
+        "capitals": get_year_capital_percents(year)
     })
-
-def get_monthly_capital_percent(year, month):
-    # Даты начала и конца месяца
-    last_day = monthrange(year, month)[1]
-    dt_start = timezone.make_aware(datetime(year, month, 1, 0, 0, 0))
-    dt_end = timezone.make_aware(datetime(year, month, last_day, 23, 59, 59))
-
-    # Предыдущий месяц
-    if month == 1:
-        prev_year = year - 1
-        prev_month = 12
-    else:
-        prev_year = year
-        prev_month = month - 1
-
-    # Получаем капитал на конец предыдущего месяца
-    prev_last_day = monthrange(prev_year, prev_month)[1]
-    prev_dt_end = timezone.make_aware(datetime(prev_year, prev_month, prev_last_day, 23, 59, 59))
-    prev_cap = get_total_capital_at(prev_dt_end)
-
-    # Капитал на конец текущего месяца
-    curr_cap = get_total_capital_at(dt_end)
-
-    # Средний капитал
-    avg_cap = (Decimal(prev_cap) + Decimal(curr_cap)) / Decimal(2) if (prev_cap or curr_cap) else Decimal(0)
-
-    # Прибыль за месяц (например, поле profit в Transaction)
-    incomes = (
-        Transaction.objects.filter(
-            created__range=(dt_start, dt_end),
-            type="income"
-        ).aggregate(total=Sum("amount"))["total"] or Decimal(0)
-    )
-    expenses = (
-        Transaction.objects.filter(
-            created__range=(dt_start, dt_end),
-            type="expense"
-        ).aggregate(total=Sum("amount"))["total"] or Decimal(0)
-    )
-    profit_total = Decimal(incomes) + Decimal(expenses)  # expenses обычно отрицательные
-
-    # Процент
-    if avg_cap > 0 and profit_total != 0:
-        capital_percent = float(profit_total) / float(avg_cap) * 100.0
-    else:
-        capital_percent = 0.0
-
-    return round(capital_percent, 1)
-
-def get_total_capital_at(dt):
-    now = timezone.now()
-    # Если dt в прошлом месяце — используем MonthlyCapital
-    if (dt.year < now.year) or (dt.year == now.year and dt.month < now.month):
-        mc = MonthlyCapital.objects.filter(year=dt.year, month=dt.month).first()
-        if mc:
-            return Decimal(mc.capital)
-    # Для текущего или будущего месяца — считаем по активам/пассивам
-    assets = (
-        (FixedAsset.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-        + (InventoryItem.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-        + (Order.objects.filter(created__lte=dt).aggregate(total=Sum(F("amount") - F("paid_amount")))["total"] or 0)
-        + (BankAccount.objects.aggregate(total=Sum("balance"))["total"] or 0)
-    )
-    liabilities = (
-        (Credit.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-        + (AccountsPayable.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-        + (ShortTermLiability.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-        + (Bonus.objects.filter(created_at__lte=dt).aggregate(total=Sum("amount"))["total"] or 0)
-    )
-    return Decimal(assets) - Decimal(liabilities)
@@ -116,6 +116,7 @@ export class DynamicFormHandler {
 								await SelectHandler.fetchSelectOptions(initialUrl)
 							await SelectHandler.setupSelects({
 								data: initialData,
+								url: initialUrl,
 								select: selectParent,
 								includeValuesInSearch,
 							})
@@ -316,6 +317,9 @@ export class DynamicFormHandler {
 				) {
 					selectInput.setAttribute('value', value)
 				}
+				if (selectContainer?.dataset.searchUrl && value) {
+					SelectHandler.restoreRemoteValue(selectContainer, value)
+				}
 			}
 		}
 	}
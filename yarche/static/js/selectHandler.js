@@ -1,6 +1,39 @@
 import { createLoader } from '/static/js/ui-utils.js'
 
 export default class SelectHandler {
+	// Справочники с серверным поиском: ?q=, ?id= и ?limit=
+	static SEARCH_URLS = ['/commerce/clients/list/']
+	static SEARCH_LIMIT = 20
+	static SEARCH_DELAY = 250
+
+	static searchUrlFor(url) {
+		if (typeof url !== 'string') return null
+		const { pathname } = new URL(url, window.location.origin)
+		return this.SEARCH_URLS.includes(pathname) ? pathname : null
+	}
+
+	static buildSearchUrl(url, params) {
+		const target = new URL(url, window.location.origin)
+		Object.entries(params).forEach(([key, value]) =>
+			target.searchParams.set(key, value),
+		)
+		return `${target.pathname}${target.search}`
+	}
+
+	static renderOptions(select, data) {
+		const dropdown = select.querySelector('.select__dropdown')
+		if (!dropdown) return null
+
+		const multiple = select.dataset.multiple === 'true'
+		const searchInput = dropdown.querySelector('.select__search-input')
+		dropdown.replaceChildren(
+			...(searchInput ? [searchInput] : []),
+			...this.createSelectOptions(data, multiple),
+		)
+		this.attachOptionHandlers(select, multiple)
+		return dropdown
+	}
+
 	static setupSelects({
 		data = null,
 		url = null,
@@ -8,15 +41,7 @@ export default class SelectHandler {
 		includeValuesInSearch = false,
 	}) {
 		if (select) {
-			if (data) {
-				const multiple = select.dataset.multiple === 'true'
-				const dropdown = select.querySelector('.select__dropdown')
-
-				if (dropdown) {
-					dropdown.replaceChildren(...this.createSelectOptions(data, multiple))
-					this.attachOptionHandlers(select, multiple)
-				}
-			}
+			if (data) this.renderOptions(select, data)
 			this.setupSelectBehavior(select, url, includeValuesInSearch)
 		} else {
 			const selects = document.querySelectorAll('.select')
@@ -24,17 +49,7 @@ export default class SelectHandler {
 			if (!selects.length) return
 
 			selects.forEach(select => {
-				if (data) {
-					const multiple = select.dataset.multiple === 'true'
-
-					const dropdown = select.querySelector('.select__dropdown')
-					if (dropdown) {
-						dropdown.replaceChildren(
-							...this.createSelectOptions(data, multiple),
-						)
-						this.attachOptionHandlers(select, multiple)
-					}
-				}
+				if (data) this.renderOptions(select, data)
 				this.setupSelectBehavior(select, url, includeValuesInSearch)
 			})
 		}
@@ -42,15 +57,9 @@ export default class SelectHandler {
 
 	static updateSelectOptions(select, data) {
 		if (!select || !data) return
-		const dropdown = select.querySelector('.select__dropdown')
+		const dropdown = this.renderOptions(select, data)
 		if (!dropdown) return
 
-		const multiple = select.dataset.multiple === 'true'
-		const options = this.createSelectOptions(data, multiple)
-
-		dropdown.replaceChildren(...options)
-		this.attachOptionHandlers(select, multiple)
-
 		const input = select.querySelector('.select__input')
 		const text = select.querySelector('.select__text')
 		if (input) input.value = ''
@@ -82,9 +91,15 @@ export default class SelectHandler {
 		})
 	}
 
-	static async fetchSelectOptions(url) {
-		const loader = createLoader()
-		document.body.appendChild(loader)
+	static async fetchSelectOptions(url, showLoader = true) {
+		// Поисковые справочники отдают только первые записи, остальные находятся поиском
+		const searchUrl = this.searchUrlFor(url)
+		if (searchUrl && !/[?&](q|id|limit)=/.test(url)) {
+			url = this.buildSearchUrl(url, { limit: this.SEARCH_LIMIT })
+		}
+
+		const loader = showLoader ? createLoader() : null
+		if (loader) document.body.appendChild(loader)
 		try {
 			const response = await fetch(url, {
 				headers: { 'X-Requested-With': 'XMLHttpRequest' },
@@ -97,7 +112,7 @@ export default class SelectHandler {
 			console.error('Ошибка получения данных для select:', error)
 			return []
 		} finally {
-			loader.remove()
+			loader?.remove()
 		}
 	}
 
@@ -106,13 +121,46 @@ export default class SelectHandler {
 		if (!dropdown) return
 
 		const data = await this.fetchSelectOptions(url)
-		const multiple = select.dataset.multiple === 'true'
+		this.renderOptions(select, data)
+	}
 
-		dropdown.replaceChildren(...this.createSelectOptions(data, multiple))
-		this.attachOptionHandlers(select, multiple)
+	static setupRemoteSearch(select, searchUrl) {
+		const dropdown = select.querySelector('.select__dropdown')
+		if (!dropdown || select.dataset.searchUrl) return
+		select.dataset.searchUrl = searchUrl
+
+		let searchInput = dropdown.querySelector('.select__search-input')
+		if (!searchInput) {
+			searchInput = document.createElement('input')
+			searchInput.type = 'text'
+			searchInput.className = 'select__search-input'
+			searchInput.placeholder = 'Поиск'
+			dropdown.prepend(searchInput)
+		}
+
+		let timer = null
+		let requestId = 0
+		searchInput.addEventListener('input', () => {
+			clearTimeout(timer)
+			timer = setTimeout(async () => {
+				const current = ++requestId
+				const data = await this.fetchSelectOptions(
+					this.buildSearchUrl(searchUrl, {
+						q: searchInput.value.trim(),
+						limit: this.SEARCH_LIMIT,
+					}),
+					false,
+				)
+				// Ответ на устаревший запрос не должен затирать свежие результаты
+				if (current === requestId) this.renderOptions(select, data)
+			}, this.SEARCH_DELAY)
+		})
 	}
 
 	static setupSelectBehavior(select, url, includeValuesInSearch = false) {
+		const searchUrl = select.dataset.searchUrl || this.searchUrlFor(url)
+		if (searchUrl) this.setupRemoteSearch(select, searchUrl)
+
 		const control = select.querySelector('.select__control')
 		const dropdown = select.querySelector('.select__dropdown')
 		const clearButton = select.querySelector('.select__clear')
@@ -135,7 +183,7 @@ export default class SelectHandler {
 				text.textContent = placeholder
 				text.classList.add('select__placeholder')
 				select.classList.remove('has-value')
-				if (includeValuesInSearch) {
+				if (includeValuesInSearch && !searchUrl) {
 					dropdown.querySelectorAll('.select__option').forEach(opt => {
 						opt.style.display = ''
 					})
@@ -144,10 +192,10 @@ export default class SelectHandler {
 		}
 
 		const toggleSelect = async () => {
-			if (!dropdown.hasChildNodes() && url) {
+			if (!dropdown.querySelector('.select__option') && url) {
 				await this.populateSelectOptions(select, url)
 
-				if (includeValuesInSearch && dropdown) {
+				if (includeValuesInSearch && !searchUrl && dropdown) {
 					let searchInput = dropdown.querySelector('.select__search-input')
 					if (!searchInput) {
 						searchInput = document.createElement('input')
@@ -183,12 +231,16 @@ export default class SelectHandler {
 		updateClearButton()
 	}
 
-	static attachOptionHandlers(select, multiple = false) {
+	static attachOptionHandlers(
+		select,
+		multiple = false,
+		options = select.querySelectorAll('.select__option'),
+	) {
 		const input = select.querySelector('.select__input')
 		const text = select.querySelector('.select__text')
 
 		if (multiple) {
-			select.querySelectorAll('.select__option').forEach(option => {
+			options.forEach(option => {
 				option.addEventListener('click', () => {
 					let selectedValues = input.value
 						? input.value
@@ -224,7 +276,7 @@ export default class SelectHandler {
 				})
 			})
 		} else {
-			select.querySelectorAll('.select__option').forEach(option => {
+			options.forEach(option => {
 				const handleSelect = () => {
 					text.textContent = option.textContent
 					input.value = option.dataset.value
@@ -255,11 +307,30 @@ export default class SelectHandler {
 		const option = select.querySelector(
 			`.select__option[data-value="${CSS.escape(val)}"]`,
 		)
-		if (!option) return
+		if (!option) {
+			if (select.dataset.searchUrl) this.restoreRemoteValue(select, val)
+			return
+		}
 
 		input.value = val
 		text.textContent = option.textContent
 		text.classList.remove('select__placeholder')
 		select.classList.add('has-value')
 	}
+
+	static async restoreRemoteValue(select, value) {
+		// Выбранной записи может не быть среди первых результатов поиска
+		const data = await this.fetchSelectOptions(
+			this.buildSearchUrl(select.dataset.searchUrl, { id: value }),
+			false,
+		)
+		const dropdown = select.querySelector('.select__dropdown')
+		if (!data.length || !dropdown) return
+
+		const multiple = select.dataset.multiple === 'true'
+		const options = this.createSelectOptions(data, multiple)
+		dropdown.append(...options)
+		this.attachOptionHandlers(select, multiple, options)
+		this.restoreSelectValue(select, String(value))
+	}
 }
@@ -1024,12 +1024,361 @@ class ResizableTable {
 	}
 }
 
+const ROW_CELL_HELPER = {
+	escape(value) {
+		return String(value)
+			.replace(/&/g, '&amp;')
+			.replace(/</g, '&lt;')
+			.replace(/>/g, '&gt;')
+			.replace(/"/g, '&quot;')
+			.replace(/'/g, '&#x27;')
+	},
+
+	// Повторяет локализацию Django для ru: десятичная запятая, True/False для булевых
+	text(value) {
+		if (value === null || value === undefined) return ''
+		if (typeof value === 'number') return String(value).replace('.', ',')
+		if (typeof value === 'boolean') return value ? 'True' : 'False'
+		return this.escape(value)
+	},
+
+	date(value) {
+		if (!value) return ''
+		const match = /^(\d{4})-(\d{2})-(\d{2})$/.exec(value)
+		return match ? `${match[3]}.${match[2]}.${match[1]}` : this.escape(value)
+	},
+
+	checkbox(value, rowNumber) {
+		const id = rowNumber ?? ''
+		return `<div class="checkbox"><input type="checkbox" id="${id}" class="checkbox__input" name="${id}" ${
+			value ? 'checked' : ''
+		} disabled><label for="${id}" class="checkbox__label"><span class="checkbox__box" ></span><span class="checkbox__text">${
+			value ? 'Да' : 'Нет'
+		}</span></label></div>`
+	},
+
+	cell(column, value, rowNumber) {
+		const numberClass = column.number ? ' table__cell-number' : ''
+		switch (column.type) {
+			case 'date':
+				return `<td class="table__cell">${this.date(value)}</td>`
+			case 'boolean':
+				return `<td class="table__cell">${this.checkbox(value, rowNumber)}</td>`
+			case 'sign':
+				return `<td class="table__cell table__cell-sign">${this.text(value)}</td>`
+			case 'enum':
+				return `<td class="table__cell">${this.text(value)}</td>`
+			case 'currency': {
+				let colorClass = ''
+				if (typeof value === 'number' && value > 0) colorClass = ' text-green'
+				else if (typeof value === 'number' && value < 0) colorClass = ' text-red'
+				return `<td class="table__cell${numberClass}${colorClass}">${
+					value ? this.text(value) : '0 р.'
+				}</td>`
+			}
+			case 'percent':
+				return `<td class="table__cell${numberClass}">${
+					value ? this.text(value) : '0'
+				}</td>`
+			case 'float': {
+				let text = ''
+				if (value !== null && value !== undefined) {
+					const number = Number(value)
+					text = isNaN(number) ? '0,00' : number.toFixed(2).replace('.', ',')
+				}
+				return `<td class="table__cell${numberClass}">${text}</td>`
+			}
+			case 'integer':
+				return `<td class="table__cell${numberClass}">${
+					value ? this.text(value) : ''
+				}</td>`
+			case 'number':
+				return `<td class="table__cell${numberClass}">${this.text(value)}</td>`
+			default:
+				return `<td class="table__cell${numberClass}">${
+					value || value === 0 ? this.text(value) : ''
+				}</td>`
+		}
+	},
+
+	row(schema, values, id = null, rowNumber = null) {
+		let rowClass = ''
+		schema.forEach((column, index) => {
+			if (column.type !== 'sign') return
+			if (values[index] === '-') rowClass += 'text-red'
+			else if (values[index] === '+') rowClass += 'text-green'
+		})
+		const idAttr =
+			id !== null && id !== undefined ? ` data-id="${this.escape(id)}"` : ''
+		const cells = schema
+			.map((column, index) => this.cell(column, values[index], rowNumber))
+			.join('')
+		return `<tr class="table__row ${rowClass}"${idAttr}>${cells}</tr>`
+	},
+
+	rows(payload) {
+		return payload.rows
+			.map((values, index) =>
+				this.row(payload.schema, values, payload.ids?.[index] ?? null),
+			)
+			.join('')
+	},
+}
+
+class VirtualTableBody {
+	static OVERSCAN = 15
+	static DEFAULT_ROW_HEIGHT = 33
+
+	constructor(tableElement, payload) {
+		this.table = tableElement
+		this.tbody = tableElement.querySelector('tbody')
+		this.container =
+			tableElement.closest('.table-container') || tableElement.parentElement
+		this.schema = payload.schema
+		this.records = payload.rows.map((values, index) => ({
+			values,
+			id: payload.ids?.[index] ?? null,
+			html: null,
+		}))
+		this.visible = this.records
+		this.rowHeight = VirtualTableBody.DEFAULT_ROW_HEIGHT
+		this.rendered = []
+		this.range = null
+		this.frame = null
+
+		this.onScroll = () => this.scheduleRender()
+		this.container.addEventListener('scroll', this.onScroll, { passive: true })
+		window.addEventListener('resize', this.onScroll)
+		this.render()
+	}
+
+	destroy() {
+		this.releaseRows()
+		this.container.removeEventListener('scroll', this.onScroll)
+		window.removeEventListener('resize', this.onScroll)
+		if (this.frame) cancelAnimationFrame(this.frame)
+	}
+
+	scheduleRender() {
+		if (this.frame) return
+		this.frame = requestAnimationFrame(() => {
+			this.frame = null
+			this.render(false)
+		})
+	}
+
+	// Текст ячеек после тех же преобразований, что и у строки в DOM
+	recordTexts(record) {
+		if (!record.texts) {
+			const template = document.createElement('template')
+			template.innerHTML = `<table><tbody>${
+				record.html || ROW_CELL_HELPER.row(this.schema, record.values)
+			}</tbody></table>`
+			const row = template.content.querySelector('tr')
+			TableManager.formatCurrencyValuesForRow(this.table.id, row)
+			record.texts = Array.from(row.cells).map(cell => cell.textContent.trim())
+		}
+		return record.texts
+	}
+
+	// Подхватывает строки, которые код страницы заменил или удалил прямо в DOM
+	adoptDomChanges() {
+		if (this.rendered.length === 0) return false
+		const domRows = Array.from(this.tbody.children).filter(
+			row => !row.classList.contains('table__spacer'),
+		)
+		const ownRows = new Map(this.rendered.map(item => [item.element, item]))
+		const pending = this.rendered.filter(item => !item.element.isConnected)
+		const inserted = []
+
+		domRows.forEach(row => {
+			if (ownRows.has(row)) return
+			const replaced = pending.shift()
+			if (replaced) {
+				if (replaced.record.id !== null && !row.hasAttribute('data-id')) {
+					row.setAttribute('data-id', replaced.record.id)
+				}
+				replaced.record.html = this.rowHTML(row)
+				replaced.record.texts = null
+				replaced.element = row
+				replaced.adopted = true
+			} else {
+				inserted.push({
+					values: [],
+					id: row.getAttribute('data-id'),
+					html: this.rowHTML(row),
+				})
+			}
+		})
+
+		const removed = new Set(
+			pending.filter(item => !item.adopted).map(item => item.record),
+		)
+		if (removed.size > 0) {
+			this.records = this.records.filter(record => !removed.has(record))
+			this.visible = this.visible.filter(record => !removed.has(record))
+		}
+		if (inserted.length > 0) {
+			this.records = inserted.concat(this.records)
+			this.visible = inserted.concat(this.visible)
+		}
+		return removed.size > 0 || inserted.length > 0 || pending.length > 0
+	}
+
+	// Разметка строки без выделения, его восстанавливает render
+	rowHTML(row) {
+		const copy = row.cloneNode(true)
+		copy.classList.remove('table__row--selected')
+		copy
+			.querySelectorAll('.table__cell--selected')
+			.forEach(cell => cell.classList.remove('table__cell--selected'))
+		return copy.outerHTML
+	}
+
+	releaseRows() {
+		this.rendered.forEach(({ element }) => {
+			element.querySelectorAll('.table__cell').forEach(cell => {
+				cell._table_mutation_observer?.disconnect()
+				cell._table_resize_observer?.disconnect()
+			})
+		})
+	}
+
+	hiddenColumns() {
+		return Array.from(this.table.querySelectorAll('col')).reduce(
+			(acc, col, index) => {
+				if (col.classList.contains('hidden')) acc.push(index)
+				return acc
+			},
+			[],
+		)
+	}
+
+	render(force = true) {
+		const changed = this.adoptDomChanges()
+
+		const selectedRow = this.tbody.querySelector('.table__row--selected')
+		const selectedRecord = this.rendered.find(
+			item => item.element === selectedRow,
+		)?.record
+		const selectedCellIndex = selectedRow
+			? Array.from(selectedRow.children).findIndex(cell =>
+					cell.classList.contains('table__cell--selected'),
+			  )
+			: -1
+
+		const headerHeight = this.table.querySelector('thead')?.offsetHeight || 0
+		const scrollTop = Math.max(0, this.container.scrollTop - headerHeight)
+		const viewportRows = Math.ceil(
+			(this.container.clientHeight || window.innerHeight) / this.rowHeight,
+		)
+		const start = Math.max(
+			0,
+			Math.floor(scrollTop / this.rowHeight) - VirtualTableBody.OVERSCAN,
+		)
+		const end = Math.min(
+			this.visible.length,
+			start + viewportRows + VirtualTableBody.OVERSCAN * 2,
+		)
+
+		const range = `${start}:${end}`
+		if (!force && !changed && range === this.range) return
+		this.range = range
+
+		const colspan = this.schema.length
+		const spacer = height =>
+			`<tr class="table__spacer"><td colspan="${colspan}" style="height: ${height}px; padding: 0; border: 0;"></td></tr>`
+
+		const slice = this.visible.slice(start, end)
+		this.releaseRows()
+		this.tbody.innerHTML =
+			spacer(start * this.rowHeight) +
+			slice
+				.map(
+					(record, offset) =>
+						record.html ||
+						ROW_CELL_HELPER.row(
+							this.schema,
+							record.values,
+							record.id,
+							start + offset + 1,
+						),
+				)
+				.join('') +
+			spacer((this.visible.length - end) * this.rowHeight)
+
+		const rowElements = Array.from(this.tbody.children).slice(1, -1)
+		this.rendered = rowElements.map((element, offset) => ({
+			element,
+			record: slice[offset],
+		}))
+
+		const hidden = this.hiddenColumns()
+		const columnGroup = this.table.querySelector('colgroup')
+		const widths = columnGroup
+			? Array.from(columnGroup.children).map(col => col.style.width)
+			: []
+		rowElements.forEach(row => {
+			hidden.forEach(index => row.children[index]?.classList.add('hidden'))
+			widths.forEach((width, index) => {
+				if (width && row.children[index]) row.children[index].style.maxWidth = width
+			})
+			TableManager.formatCurrencyValuesForRow(this.table.id, row)
+			TableManager.attachRowCellHandlers(row)
+		})
+
+		const selected = this.rendered.find(item => item.record === selectedRecord)
+		if (selected) {
+			selected.element.classList.add('table__row--selected')
+			selected.element.children[selectedCellIndex]?.classList.add(
+				'table__cell--selected',
+			)
+		}
+
+		const measured = rowElements[0]?.offsetHeight
+		if (measured && Math.abs(measured - this.rowHeight) > 1) {
+			this.rowHeight = measured
+			this.range = null
+			this.scheduleRender()
+		}
+	}
+
+	applyFilters(filters) {
+		this.adoptDomChanges()
+		this.visible = this.records.filter(record => {
+			let shouldShow = true
+			filters.forEach((filterValue, colIndex) => {
+				if (!shouldShow || colIndex >= this.schema.length) return
+				const cellText = (this.recordTexts(record)[colIndex] || '').toLowerCase()
+				if (filterValue.type === 'select') {
+					shouldShow = cellText === filterValue.value
+				} else {
+					shouldShow = cellText.includes(filterValue.value)
+				}
+			})
+			return shouldShow
+		})
+		this.container.scrollTop = 0
+		this.render()
+	}
+
+	sort(columnIndex, compareText) {
+		this.adoptDomChanges()
+		const text = record => this.recordTexts(record)[columnIndex] ?? ''
+		this.records.sort((a, b) => compareText(text(a), text(b)))
+		const visible = new Set(this.visible)
+		this.visible = this.records.filter(record => visible.has(record))
+		this.render()
+	}
+}
+
 export const TableManager = {
 	tables: new Map(),
 	tableFilters: new Map(),
 	serverFilterConfigs: new Map(),
 	serverFilterDebounceTimers: new Map(),
 	serverFilterLastPayloads: new Map(),
+	virtualBodies: new Map(),
 
 	init() {
 		this.destroyTables()
@@ -1066,45 +1415,31 @@ export const TableManager = {
 		const tbody = table.querySelector('tbody')
 		if (!tbody) return
 
-		const rows = Array.from(
-			tbody.querySelectorAll('tr:not(.table__row--summary)'),
-		)
-		const summaryRow = tbody.querySelector('.table__row--summary')
-
-		const compareFunction = (a, b) => {
-			const cellA = a.cells[columnIndex]
-			const cellB = b.cells[columnIndex]
-
-			if (!cellA || !cellB) return 0
-
+		const compareText = (textA, textB) => {
 			let valueA, valueB
 
 			switch (columnType) {
 				case 'amount':
-					valueA = this.extractNumericValue(cellA.textContent)
-					valueB = this.extractNumericValue(cellB.textContent)
+					valueA = this.extractNumericValue(textA)
+					valueB = this.extractNumericValue(textB)
 					break
 				case 'percent':
-					valueA = parseFloat(cellA.textContent.replace('%', ''))
-					valueB = parseFloat(cellB.textContent.replace('%', ''))
+					valueA = parseFloat(textA.replace('%', ''))
+					valueB = parseFloat(textB.replace('%', ''))
 					break
 				case 'date':
-					valueA = new Date(cellA.textContent)
-					valueB = new Date(cellB.textContent)
+					valueA = new Date(textA)
+					valueB = new Date(textB)
 					break
 				default:
-					const numA = parseFloat(
-						cellA.textContent.replace(/\s/g, '').replace(',', '.'),
-					)
-					const numB = parseFloat(
-						cellB.textContent.replace(/\s/g, '').replace(',', '.'),
-					)
+					const numA = parseFloat(textA.replace(/\s/g, '').replace(',', '.'))
+					const numB = parseFloat(textB.replace(/\s/g, '').replace(',', '.'))
 					if (!isNaN(numA) && !isNaN(numB)) {
 						valueA = numA
 						valueB = numB
 					} else {
-						valueA = cellA.textContent.toLowerCase()
-						valueB = cellB.textContent.toLowerCase()
+						valueA = textA.toLowerCase()
+						valueB = textB.toLowerCase()
 					}
 			}
 
@@ -1113,6 +1448,26 @@ export const TableManager = {
 			return 0
 		}
 
+		const virtualBody = this.virtualBodies.get(tableId)
+		if (virtualBody) {
+			virtualBody.sort(columnIndex, compareText)
+			return
+		}
+
+		const rows = Array.from(
+			tbody.querySelectorAll('tr:not(.table__row--summary)'),
+		)
+		const summaryRow = tbody.querySelector('.table__row--summary')
+
+		const compareFunction = (a, b) => {
+			const cellA = a.cells[columnIndex]
+			const cellB = b.cells[columnIndex]
+
+			if (!cellA || !cellB) return 0
+
+			return compareText(cellA.textContent, cellB.textContent)
+		}
+
 		rows.sort(compareFunction)
 
 		rows.forEach(row => tbody.appendChild(row))
@@ -1676,6 +2031,7 @@ export const TableManager = {
 	},
 
 	replaceTableContent(htmlContent, tableId) {
+		this.unmountVirtualRows(tableId)
 		const table = document.getElementById(tableId)
 		const hiddenColumns = Array.from(table.querySelectorAll('col')).reduce(
 			(acc, col, index) => {
@@ -1709,6 +2065,34 @@ export const TableManager = {
 		}
 	},
 
+	// Ответ с format=rows: схема и строки значениями вместо готового HTML
+	rowsToHTML(payload) {
+		return ROW_CELL_HELPER.rows(payload)
+	},
+
+	renderRows(payload, tableId) {
+		this.updateTable(this.rowsToHTML(payload), tableId)
+	},
+
+	mountVirtualRows(payload, tableId) {
+		const table = document.getElementById(tableId)
+		if (!table) return null
+
+		this.unmountVirtualRows(tableId)
+		const virtualBody = new VirtualTableBody(table, payload)
+		this.virtualBodies.set(tableId, virtualBody)
+		this.setInitialSelectionForTable(tableId)
+		return virtualBody
+	},
+
+	unmountVirtualRows(tableId) {
+		const virtualBody = this.virtualBodies.get(tableId)
+		if (virtualBody) {
+			virtualBody.destroy()
+			this.virtualBodies.delete(tableId)
+		}
+	},
+
 	replaceEntireTable(htmlContent, containerId, tableId) {
 		const container = document.getElementById(containerId)
 
@@ -1912,28 +2296,20 @@ export const TableManager = {
 
 			if (!selectControl || !dropdown || !clearButton) return
 
-			selectControl.addEventListener('click', () => {
-				const observer = new MutationObserver(() => {
-					const dropdownOptions = dropdown.querySelectorAll('.select__option')
-
-					dropdownOptions.forEach(option => {
-						option.addEventListener('click', () => {
-							const filterText = option.textContent.toLowerCase()
-							filters.set(columnIndex, {
-								type: 'select',
-								value: filterText,
-							})
-							if (!this.requestServerFilter(table, filters)) {
-								this.applyFilters(table, filters)
-								updateSummary()
-							}
-						})
-					})
+			// Опции перерисовываются при серверном поиске, поэтому клик ловим на списке
+			dropdown.addEventListener('click', e => {
+				const option = e.target.closest('.select__option')
+				if (!option) return
 
-					observer.disconnect()
+				const filterText = option.textContent.toLowerCase()
+				filters.set(columnIndex, {
+					type: 'select',
+					value: filterText,
 				})
-
-				observer.observe(dropdown, { childList: true })
+				if (!this.requestServerFilter(table, filters)) {
+					this.applyFilters(table, filters)
+					updateSummary()
+				}
 			})
 
 			clearButton.addEventListener('click', () => {
@@ -2061,6 +2437,12 @@ export const TableManager = {
 	},
 
 	applyFilters(table, filters) {
+		const virtualBody = this.virtualBodies.get(table.id)
+		if (virtualBody) {
+			virtualBody.applyFilters(filters)
+			return
+		}
+
 		const tbody = table.querySelector('tbody')
 
 		Array.from(tbody.querySelectorAll('tr')).forEach(row => {
@@ -2088,6 +2470,8 @@ export const TableManager = {
 	destroyTables() {
 		this.tables.forEach(table => table.destroy())
 		this.tables.clear()
+		this.virtualBodies.forEach(body => body.destroy())
+		this.virtualBodies.clear()
 		this.tableFilters.clear()
 		this.serverFilterConfigs.clear()
 		this.serverFilterDebounceTimers.forEach(timerId => clearTimeout(timerId))
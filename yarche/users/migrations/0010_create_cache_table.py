@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    """
+    Create the table of the database cache backend, shared by all workers.
+    """
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_usertypemenuitem_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
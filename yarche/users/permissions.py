@@ -0,0 +1,109 @@
+from django.core.cache import cache
+
+from .models import Permission, UserType
+
+ADMIN_USER_TYPE_NAME = "Администратор"
+MANAGER_USER_TYPE_NAME = "Менеджер по работе с клиентами"
+
+ACCESS_VERSION_KEY = "users:access:version"
+ACCESS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Процессный кэш: user_type_id -> (версия, UserTypeAccess).
+# Версия читается из общего кэша (CACHES в settings), иначе воркеры не увидят invalidate_access
+_local_access = {}
+
+
+class UserTypeAccess:
+    """
+    Permission codenames and role flags of one user type.
+    """
+    def __init__(self, user_type_id, name: str, codenames):
+        self.user_type_id = user_type_id
+        self.name = name or ""
+        self.codenames = frozenset(codenames)
+
+        role = self.name.strip().lower()
+        self.is_admin = role == ADMIN_USER_TYPE_NAME.lower()
+        self.is_manager = role == MANAGER_USER_TYPE_NAME.lower()
+
+    def has_perm(self, codename: str) -> bool:
+        return codename in self.codenames
+
+
+NO_ACCESS = UserTypeAccess(None, "", ())
+
+
+def get_access_version() -> int:
+    version = cache.get(ACCESS_VERSION_KEY)
+    if version is None:
+        cache.add(ACCESS_VERSION_KEY, 1, None)
+        version = cache.get(ACCESS_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_access():
+    """
+    Bump the access version so every process reloads user type permissions.
+    """
+    try:
+        cache.incr(ACCESS_VERSION_KEY)
+    except ValueError:
+        cache.set(ACCESS_VERSION_KEY, 2, None)
+    _local_access.clear()
+
+
+def load_user_type_access(user_type_id) -> UserTypeAccess:
+    user_type = UserType.objects.filter(id=user_type_id).values("id", "name").first()
+    if not user_type:
+        return NO_ACCESS
+    codenames = Permission.objects.filter(user_types__id=user_type_id).values_list(
+        "codename", flat=True
+    )
+    return UserTypeAccess(user_type["id"], user_type["name"], codenames)
+
+
+def get_user_type_access(user_type_id) -> UserTypeAccess:
+    """
+    Get access of a user type from the process store, the cache or the database.
+    """
+    if not user_type_id:
+        return NO_ACCESS
+
+    version = get_access_version()
+    local = _local_access.get(user_type_id)
+    if local and local[0] == version:
+        return local[1]
+
+    key = f"users:access:{version}:{user_type_id}"
+    access = cache.get(key)
+    if access is None:
+        access = load_user_type_access(user_type_id)
+        cache.set(key, access, ACCESS_CACHE_TIMEOUT)
+
+    _local_access[user_type_id] = (version, access)
+    return access
+
+
+def get_user_access(user) -> UserTypeAccess:
+    """
+    Get access of the user, memoized on the user object for the request.
+    """
+    if user is None or not getattr(user, "is_authenticated", False):
+        return NO_ACCESS
+    access = getattr(user, "_user_type_access", None)
+    if access is None:
+        access = get_user_type_access(getattr(user, "user_type_id", None))
+        user._user_type_access = access
+    return access
+
+
+def has_perm(user, codename: str) -> bool:
+    return get_user_access(user).has_perm(codename)
+
+
+def is_admin(user) -> bool:
+    return get_user_access(user).is_admin
+
+
+def is_manager(user) -> bool:
+    return get_user_access(user).is_manager
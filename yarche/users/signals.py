@@ -0,0 +1,19 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Permission, UserType
+from .permissions import invalidate_access
+
+
+@receiver(m2m_changed, sender=UserType.permissions.through)
+def user_type_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_access()
+
+
+@receiver(post_save, sender=UserType)
+@receiver(post_delete, sender=UserType)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def access_source_changed(sender, **kwargs):
+    invalidate_access()
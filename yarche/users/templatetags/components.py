@@ -57,3 +57,10 @@ def render_scripts():
         for src, is_module in ScriptManager.get_scripts()
     )
     return mark_safe(scripts)
+
+
+@register.simple_tag
+def table_row(item, fields, row_number=None):
+    from yarche.tables import render_table_row
+
+    return mark_safe(render_table_row(item, fields, row_number))
@@ -1,6 +1,7 @@
 from users.models import Permission, UserType
 from django.contrib.auth.decorators import login_required
 from .models import User, Notification
+from .permissions import MANAGER_USER_TYPE_NAME, has_perm
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from commerce.models import Order, OrderDepartmentWork
@@ -13,18 +14,9 @@ from django.template.loader import render_to_string
 
 def manager_list(request):
     current_user = request.user
-    has_view_all_payments_perm = False
+    has_view_all_payments_perm = has_perm(current_user, "view_all_payments")
 
-    if hasattr(current_user, "user_type") and current_user.user_type is not None:
-        view_all_payments_permission = Permission.objects.filter(
-            codename="view_all_payments"
-        ).first()
-
-        if view_all_payments_permission:
-            if view_all_payments_permission in current_user.user_type.permissions.all():
-                has_view_all_payments_perm = True
-
-    managers_qs = User.objects.filter(user_type__name="Менеджер по работе с клиентами")
+    managers_qs = User.objects.filter(user_type__name=MANAGER_USER_TYPE_NAME)
 
     role = request.GET.get("role")
     if role == "viewer":
@@ -54,15 +46,7 @@ def check_permission(request):
             status=400,
         )
 
-    current_user = request.user
-    has_permission = False
-
-    if hasattr(current_user, "user_type") and current_user.user_type is not None:
-        permission = Permission.objects.filter(codename=permission_codename).first()
-        if permission and permission in current_user.user_type.permissions.all():
-            has_permission = True
-
-    if has_permission:
+    if has_perm(request.user, permission_codename):
         return JsonResponse({"has_permission": True})
 
     return JsonResponse(
@@ -0,0 +1,193 @@
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from yarche.pagination import KeysetPaginator
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+XLSX_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+XLSX_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+XLSX_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+XLSX_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+XLSX_SHEET_HEAD = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>"""
+
+XLSX_SHEET_TAIL = "</sheetData></worksheet>"
+XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class Echo:
+    """
+    File-like object that returns written data instead of storing it.
+    """
+    def write(self, value):
+        return value
+
+
+class StreamBuffer:
+    """
+    Write-only, non-seekable buffer drained by the response generator.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_value(value):
+    """
+    Convert a database value to a plain value for an export cell.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "Да" if value else "Нет"
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime("%d.%m.%Y %H:%M")
+    if isinstance(value, datetime.date):
+        return value.strftime("%d.%m.%Y")
+    if isinstance(value, (int, float, Decimal)):
+        return value
+    return str(value)
+
+
+def xlsx_col_name(index: int) -> str:
+    letters = ""
+    while index > 0:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def xlsx_row(r_idx: int, row) -> str:
+    cells = []
+    for c_idx, value in enumerate(row, start=1):
+        ref = f"{xlsx_col_name(c_idx)}{r_idx}"
+        value = export_value(value)
+        if isinstance(value, (int, float, Decimal)):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{escape(XML_INVALID_CHARS.sub("", value))}</t></is></c>')
+    return f'<row r="{r_idx}">{"".join(cells)}</row>'
+
+
+def stream_csv(header, rows):
+    """
+    Yield CSV lines one by one, starting with a BOM so Excel detects UTF-8.
+    """
+    writer = csv.writer(Echo(), delimiter=";")
+    yield "\ufeff" + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([export_value(value) for value in row])
+
+
+def stream_xlsx(header, rows, sheet_name: str = "Лист1", batch_rows: int = 500):
+    """
+    Yield a single-sheet XLSX as zip chunks without holding the sheet in memory.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", XLSX_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", XLSX_ROOT_RELS)
+        zf.writestr("xl/workbook.xml", XLSX_WORKBOOK.format(name=escape(sheet_name[:31])))
+        zf.writestr("xl/_rels/workbook.xml.rels", XLSX_WORKBOOK_RELS)
+        yield buffer.drain()
+
+        # Строки без sharedStrings, чтобы память не росла с числом уникальных значений
+        with zf.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((XLSX_SHEET_HEAD + xlsx_row(1, header)).encode("utf-8"))
+            batch = []
+            for r_idx, row in enumerate(rows, start=2):
+                batch.append(xlsx_row(r_idx, row))
+                if len(batch) >= batch_rows:
+                    sheet.write("".join(batch).encode("utf-8"))
+                    batch = []
+                    yield buffer.drain()
+            sheet.write(("".join(batch) + XLSX_SHEET_TAIL).encode("utf-8"))
+        yield buffer.drain()
+    yield buffer.drain()
+
+
+def iter_keyset_rows(queryset, columns, key_field: str, descending: bool = True, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield values_list rows of a queryset ordered by (key_field, id), one keyset batch per query.
+    """
+    # mysqlclient буферизует весь результат даже с .iterator(), поэтому читаем пачками по ключу
+    paginator = KeysetPaginator(queryset, key_field, chunk_size, descending=descending)
+    queryset = queryset.order_by(*paginator.ordering()).values_list(*columns, key_field, "pk")
+    position = None
+    while True:
+        batch = queryset.filter(paginator.after(*position)) if position else queryset
+        rows = list(batch[:chunk_size])
+        for row in rows:
+            yield row[:-2]
+        if len(rows) < chunk_size:
+            return
+        position = rows[-1][-2:]
+
+
+def get_export_format(request) -> str:
+    export_format = (request.GET.get("format") or "csv").lower()
+    return export_format if export_format in EXPORT_FORMATS else None
+
+
+def export_response(export_format: str, filename: str, header, rows, sheet_name: str = "Лист1"):
+    """
+    Stream rows as a CSV or XLSX attachment.
+    """
+    if export_format == "xlsx":
+        content = stream_xlsx(header, rows, sheet_name)
+    else:
+        content = stream_csv(header, rows)
+
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    response["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,165 @@
+import mimetypes
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+BLOCK_SIZE = 64 * 1024
+
+FILE_TOKEN_SALT = "yarche.file-access"
+FILE_TOKEN_MAX_AGE = 5 * 60
+
+
+class FileRange:
+    """
+    File-like view of a byte range, read by FileResponse block by block.
+    """
+
+    def __init__(self, file, start: int, length: int):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def make_file_token(document_id: int, user_id=None, max_age: int = FILE_TOKEN_MAX_AGE) -> str:
+    """
+    Sign a file access token with the document id, expiry time and optional user.
+    """
+    payload = {"d": document_id, "e": int(time.time()) + max_age}
+    if user_id:
+        payload["u"] = user_id
+    return signing.dumps(payload, salt=FILE_TOKEN_SALT)
+
+
+def read_file_token(token: str):
+    """
+    Check a signed file token without touching the database, returning its payload or None.
+    """
+    try:
+        payload = signing.loads(token, salt=FILE_TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or payload.get("e", 0) < time.time():
+        return None
+    return payload
+
+
+def document_etag(document) -> str:
+    """
+    Get the ETag of a document file, keyed on its size and upload time.
+    """
+    uploaded = int(document.uploaded_at.timestamp()) if document.uploaded_at else 0
+    return f'"{document.id:x}-{document.size or 0:x}-{uploaded:x}"'
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single-range Range header into (start, end), None to send the whole file,
+    or False when the range cannot be satisfied.
+    """
+    match = RANGE_RE.match((header or "").strip())
+    if not match or size <= 0:
+        # Несколько диапазонов сразу не поддерживаем, отдаем файл целиком
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        suffix = int(end)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _range_allowed(request, etag: str, last_modified: int) -> bool:
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _accel_response(field_file, mode: str) -> HttpResponse:
+    response = HttpResponse()
+    if mode == "x-accel":
+        # nginx отдает файл из internal-локации сам, включая Range
+        prefix = settings.DOCUMENT_ACCEL_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(field_file.name)}"
+    else:
+        response["X-Sendfile"] = field_file.path
+    return response
+
+
+def serve_document(request, document, as_attachment: bool = False):
+    """
+    Send a document file with conditional GET and byte range support, or hand it to the web server.
+    """
+    field_file = document.file
+    filename = document.name or field_file.name.rsplit("/", 1)[-1]
+    content_type = mimetypes.guess_type(filename)[0] or mimetypes.guess_type(field_file.name)[0]
+    etag = document_etag(document)
+    last_modified = int(document.uploaded_at.timestamp()) if document.uploaded_at else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response["ETag"] = etag
+        return response
+
+    mode = settings.DOCUMENT_SERVE_MODE
+    if mode != "django":
+        response = _accel_response(field_file, mode)
+    else:
+        size = document.size if document.size is not None else field_file.size
+        byte_range = None
+        if request.method == "GET" and _range_allowed(request, etag, last_modified):
+            byte_range = parse_range(request.headers.get("Range"), size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            response["Accept-Ranges"] = "bytes"
+            return response
+
+        source = field_file.storage.open(field_file.name, "rb")
+        if byte_range is None:
+            response = FileResponse(source)
+            response["Content-Length"] = size
+        else:
+            start, end = byte_range
+            response = FileResponse(FileRange(source, start, end - start + 1), status=206)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = end - start + 1
+        response.block_size = BLOCK_SIZE
+        response["Accept-Ranges"] = "bytes"
+
+    response["Content-Type"] = content_type or "application/octet-stream"
+    response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,98 @@
+from django.core import signing
+from django.db.models import Q
+
+CURSOR_SALT = "yarche.pagination.cursor"
+
+
+class KeysetPage:
+    """
+    One page of keyset pagination with opaque cursors to its neighbours.
+    """
+    def __init__(self, object_list, next_cursor=None, prev_cursor=None, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def context(self):
+        data = {
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+            "has_next": self.has_next,
+            "has_previous": self.has_previous,
+        }
+        if self.total is not None:
+            data["total"] = self.total
+        return data
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by (key_field, id) without OFFSET and without COUNT(*).
+    """
+    def __init__(self, queryset, key_field: str, per_page: int, descending: bool = True):
+        self.queryset = queryset
+        self.key_field = key_field
+        self.per_page = per_page
+        self.descending = descending
+        self.field = queryset.model._meta.get_field(key_field)
+
+    def encode_cursor(self, obj, direction: str) -> str:
+        key = getattr(obj, self.key_field)
+        if hasattr(key, "isoformat"):
+            key = key.isoformat()
+        return signing.dumps(
+            {"k": key, "i": obj.pk, "d": direction},
+            salt=CURSOR_SALT,
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor: str):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            return self.field.to_python(data["k"]), int(data["i"]), data["d"]
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+
+    def ordering(self, reverse: bool = False) -> list:
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        return [f"{prefix}{self.key_field}", f"{prefix}pk"]
+
+    def after(self, key, pk, reverse: bool = False) -> Q:
+        lookup = "lt" if self.descending != reverse else "gt"
+        return Q(**{f"{self.key_field}__{lookup}": key}) | Q(
+            **{self.key_field: key, f"pk__{lookup}": pk}
+        )
+
+    def get_page(self, cursor: str = None, with_total: bool = False) -> KeysetPage:
+        position = self.decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position[2] == "prev"
+
+        queryset = self.queryset.order_by(*self.ordering(reverse=backwards))
+        if position is not None:
+            queryset = queryset.filter(self.after(position[0], position[1], reverse=backwards))
+
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = has_more if not backwards else True
+        has_prev = (position is not None) if not backwards else has_more
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], "next") if rows and has_next else None,
+            prev_cursor=self.encode_cursor(rows[0], "prev") if rows and has_prev else None,
+            total=self.queryset.count() if with_total else None,
+        )
@@ -138,6 +138,14 @@ DATABASES = {
     }
 }
 
+# Общий для всех процессов кэш: версия прав пользователей должна меняться сразу во всех воркерах
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "yarche_cache",
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -198,6 +206,14 @@ LOGOUT_REDIRECT_URL = "login"
 MEDIA_URL = "/uploads/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "uploads")
 
+# Незавершенные загрузки по частям, на том же диске, что и MEDIA_ROOT
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, "uploads_chunked")
+
+# Отдача файлов документов: "django" (потоком из Django), "x-accel" (nginx) или "x-sendfile" (apache).
+# Для x-accel в nginx нужна internal-локация DOCUMENT_ACCEL_PREFIX с alias на MEDIA_ROOT.
+DOCUMENT_SERVE_MODE = os.environ.get("DOCUMENT_SERVE_MODE", "django")
+DOCUMENT_ACCEL_PREFIX = "/protected-uploads/"
+
 CSRF_TRUSTED_ORIGINS = [
     "https://157-22-188-188.nip.io",
 ]
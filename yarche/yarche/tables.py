@@ -0,0 +1,338 @@
+import datetime
+import inspect
+from decimal import Decimal
+
+from django.http import JsonResponse
+from django.template import Context
+from django.template.base import render_value_in_context
+from django.template.defaultfilters import floatformat, yesno
+from django.utils import timezone
+from django.utils.formats import localize
+from django.utils.timezone import template_localtime
+from django.utils.html import escape
+
+from users.templatetags.components import StyleManager
+from users.templatetags.custom_filters import format_date
+
+# Флаги полей, от которых зависит разметка components/table_row.html
+FIELD_FLAGS = (
+    "is_date",
+    "is_boolean",
+    "is_type_sign",
+    "is_enum_field",
+    "is_number",
+    "is_currency",
+    "is_percent",
+    "is_float",
+    "is_integer",
+)
+
+# Отступы и переводы строк повторяют вывод шаблона байт в байт
+ROW_START = '\n<tr class="table__row {}">\n    '
+ROW_END = "\n</tr>\n"
+CELL_START = "\n        \n            "
+CELL_END = "\n        \n    "
+SHORT_CELL = '\n                <td class="{}">{}</td>\n            '
+BLOCK_CELL = '\n                <td class="{}">\n                    {}\n                </td>\n            '
+BLOCK_VALUE = "\n                        {}\n                    "
+NUMBER_VALUE = "\n                        \n                            {}\n                        \n                    "
+NUMBER_FORMATTED = "\n                                {}\n                            "
+BOOLEAN_CELL = (
+    '\n                \n                    <td class="table__cell">\n                        '
+    "{}\n                    </td>\n                \n            "
+)
+CHECKBOX = (
+    '\n\n<div class="checkbox">\n    <input type="checkbox"\n           id="{id}"\n'
+    '           class="checkbox__input"\n           name="{id}"\n           {checked}\n'
+    '           disabled>\n    <label for="{id}" class="checkbox__label">\n'
+    '        <span class="checkbox__box" ></span>\n'
+    '        <span class="checkbox__text">{label}</span>\n    </label>\n</div>\n'
+)
+
+_context = Context()
+_renderers = {}
+
+
+def resolve_value(value):
+    """
+    Call a callable value the way template variable resolution does.
+    """
+    if not callable(value) or getattr(value, "do_not_call_in_templates", False):
+        return value
+    if getattr(value, "alters_data", False):
+        return ""
+    try:
+        return value()
+    except TypeError:
+        try:
+            inspect.signature(value).bind()
+        except TypeError:
+            return ""
+        raise
+
+
+def lookup(item, name: str):
+    """
+    Resolve item.name like a template variable, empty string if missing.
+    """
+    try:
+        return resolve_value(item[name])
+    except (TypeError, AttributeError, KeyError, ValueError, IndexError):
+        pass
+    try:
+        return resolve_value(getattr(item, name))
+    except AttributeError:
+        return ""
+
+
+def render_value(value) -> str:
+    return render_value_in_context(value, _context)
+
+
+def greater_than_zero(value) -> bool:
+    try:
+        return value > 0
+    except TypeError:
+        return False
+
+
+def less_than_zero(value) -> bool:
+    try:
+        return value < 0
+    except TypeError:
+        return False
+
+
+class RowRenderer:
+    """
+    Field schema of components/table_row.html compiled into Python cell renderers.
+    """
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self.sign_fields = sum(1 for field in self.fields if field.get("is_type_sign"))
+        self.cells = [self.compile_cell(field) for field in self.fields]
+        self.kinds = [column_type(field) for field in self.fields]
+        if "boolean" in self.kinds:
+            StyleManager.add_style("css/checkbox.css")
+
+    def compile_cell(self, field):
+        if field.get("is_date"):
+            def cell(item, value, row_number):
+                return SHORT_CELL.format("table__cell", render_value(format_date(value) or ""))
+            return cell
+
+        if field.get("is_boolean"):
+            def cell(item, value, row_number):
+                row_id = escape(row_number) if row_number is not None else ""
+                checked = value and value != "false" and value != "False"
+                checkbox = CHECKBOX.format(
+                    id=row_id,
+                    checked="checked" if checked else "",
+                    label=render_value(yesno(value, "Да,Нет")),
+                )
+                return BOOLEAN_CELL.format(checkbox)
+            return cell
+
+        if field.get("is_type_sign") or field.get("is_enum_field"):
+            css = "table__cell table__cell-sign" if field.get("is_type_sign") else "table__cell"
+
+            def cell(item, value, row_number):
+                return SHORT_CELL.format(css, render_value(lookup(item, "get_type_display")))
+            return cell
+
+        number_css = " table__cell-number" if field.get("is_number") else ""
+
+        if field.get("is_currency"):
+            def cell(item, value, row_number):
+                css = "table__cell" + number_css
+                if greater_than_zero(value):
+                    css += " text-green"
+                elif less_than_zero(value):
+                    css += " text-red"
+                return BLOCK_CELL.format(css, BLOCK_VALUE.format(render_value(value or "0 р.")))
+            return cell
+
+        css = "table__cell" + number_css
+
+        if field.get("is_percent"):
+            def cell(item, value, row_number):
+                return BLOCK_CELL.format(css, BLOCK_VALUE.format(render_value(value or "0")))
+            return cell
+
+        if field.get("is_number"):
+            if field.get("is_float"):
+                def format_number(value):
+                    return render_value(floatformat(value, 2) or "0,00")
+            elif field.get("is_integer"):
+                def format_number(value):
+                    return render_value(value or "")
+            else:
+                format_number = render_value
+
+            def cell(item, value, row_number):
+                if value is None:
+                    return BLOCK_CELL.format(css, NUMBER_VALUE.format(""))
+                return BLOCK_CELL.format(
+                    css, NUMBER_VALUE.format(NUMBER_FORMATTED.format(format_number(value)))
+                )
+            return cell
+
+        def cell(item, value, row_number):
+            return BLOCK_CELL.format(css, BLOCK_VALUE.format(render_value(value or "")))
+        return cell
+
+    def values(self, item) -> list:
+        """
+        Get raw typed cell values of the item for client-side rendering.
+        """
+        row = []
+        for field, kind in zip(self.fields, self.kinds):
+            if kind in ("sign", "enum"):
+                row.append(raw_value(lookup(item, "get_type_display")))
+                continue
+            try:
+                value = resolve_value(getattr(item, field.get("name", ""), None))
+            except AttributeError:
+                value = None
+            if kind == "boolean":
+                value = bool(value and value != "false" and value != "False")
+            elif kind != "date" and isinstance(value, datetime.date):
+                # Даты вне is_date-колонок выводятся так же, как их локализует шаблон
+                value = localize(template_localtime(value))
+            row.append(raw_value(value))
+        return row
+
+    def row_class(self, item) -> str:
+        if not self.sign_fields:
+            return ""
+        sign = lookup(item, "get_type_display")
+        if sign == "-":
+            return "text-red" * self.sign_fields
+        if sign == "+":
+            return "text-green" * self.sign_fields
+        return ""
+
+    def render(self, item, row_number=None) -> str:
+        """
+        Render one table row, row_number fills checkbox ids like forloop.counter.
+        """
+        parts = [ROW_START.format(self.row_class(item))]
+        for field, cell in zip(self.fields, self.cells):
+            try:
+                value = resolve_value(getattr(item, field.get("name", ""), None))
+            except AttributeError:
+                value = None
+            parts.append(CELL_START + cell(item, value, row_number) + CELL_END)
+        parts.append(ROW_END)
+        return "".join(parts)
+
+    def render_rows(self, items) -> str:
+        return "".join(self.render(item) for item in items)
+
+
+def raw_value(value):
+    """
+    Convert a cell value to a JSON-friendly value keeping numbers and booleans typed.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+def column_type(field) -> str:
+    """
+    Get the client-side cell kind of a field, in the branch order of table_row.html.
+    """
+    if field.get("is_date"):
+        return "date"
+    if field.get("is_boolean"):
+        return "boolean"
+    if field.get("is_type_sign"):
+        return "sign"
+    if field.get("is_enum_field"):
+        return "enum"
+    if field.get("is_currency"):
+        return "currency"
+    if field.get("is_percent"):
+        return "percent"
+    if field.get("is_number"):
+        if field.get("is_float"):
+            return "float"
+        if field.get("is_integer"):
+            return "integer"
+        return "number"
+    return "text"
+
+
+def table_schema(fields) -> list:
+    return [
+        {
+            "name": field.get("name", ""),
+            "type": column_type(field),
+            "number": bool(field.get("is_number")),
+        }
+        for field in fields
+    ]
+
+
+def wants_rows(request) -> bool:
+    return request.GET.get("format") == "rows"
+
+
+def rows_payload(items, fields, ids=None, with_schema: bool = True) -> dict:
+    """
+    Get schema and raw row values of the items for client-side rendering.
+    """
+    renderer = get_row_renderer(fields)
+    items = list(items)
+    payload = {
+        "rows": [renderer.values(item) for item in items],
+        "ids": list(ids) if ids is not None else [getattr(item, "pk", None) for item in items],
+    }
+    if with_schema:
+        payload["schema"] = table_schema(fields)
+    return payload
+
+
+def rows_response(request, items, fields, context=None, ids=None) -> JsonResponse:
+    """
+    Respond with rows as arrays of raw values, the schema is skipped with schema=0.
+    """
+    payload = rows_payload(items, fields, ids, with_schema=request.GET.get("schema") != "0")
+    if context is not None:
+        payload["context"] = context
+    return JsonResponse(payload)
+
+
+def schema_key(fields) -> tuple:
+    return tuple(
+        (field.get("name", ""),) + tuple(bool(field.get(flag)) for flag in FIELD_FLAGS)
+        for field in fields
+    )
+
+
+def get_row_renderer(fields) -> RowRenderer:
+    """
+    Get a compiled renderer for the field schema, compiling it once per process.
+    """
+    key = schema_key(fields)
+    renderer = _renderers.get(key)
+    if renderer is None:
+        renderer = _renderers[key] = RowRenderer(fields)
+    return renderer
+
+
+def render_table_row(item, fields, row_number=None) -> str:
+    return get_row_renderer(fields).render(item, row_number)
+
+
+def render_table_rows(items, fields) -> str:
+    return get_row_renderer(fields).render_rows(items)
@@ -0,0 +1,170 @@
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from yarche.tables import RowRenderer, render_table_row, render_table_rows
+
+ROWS_TEMPLATE = Template(
+    '{% for item in items %}{% include "components/table_row.html" %}{% endfor %}'
+)
+
+
+class Relation:
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+def make_item(**values):
+    item = SimpleNamespace(**values)
+    sign = values.get("sign")
+    item.get_type_display = lambda: sign
+    return item
+
+
+ALL_FIELDS = [
+    {"name": "id", "verbose_name": "ID"},
+    {"name": "created", "verbose_name": "Создан", "is_date": True},
+    {"name": "day", "verbose_name": "День", "is_date": True},
+    {"name": "done", "verbose_name": "Готово", "is_boolean": True},
+    {"name": "sign", "verbose_name": "+/-", "is_type_sign": True},
+    {"name": "type", "verbose_name": "Тип", "is_enum_field": True},
+    {"name": "amount", "verbose_name": "Сумма", "is_amount": True},
+    {"name": "balance", "verbose_name": "Баланс", "is_currency": True, "is_number": True},
+    {"name": "percent", "verbose_name": "%", "is_percent": True},
+    {"name": "rate", "verbose_name": "Курс", "is_number": True, "is_float": True},
+    {"name": "count", "verbose_name": "Кол-во", "is_number": True, "is_integer": True},
+    {"name": "total", "verbose_name": "Итого", "is_number": True},
+    {"name": "client", "verbose_name": "Клиент", "is_relation": True},
+    {"name": "comment", "verbose_name": "Комментарий"},
+    {"name": "missing", "verbose_name": "Нет поля"},
+]
+
+ITEMS = [
+    make_item(
+        id=1,
+        created=timezone.make_aware(datetime.datetime(2024, 12, 31, 22, 30), datetime.timezone.utc),
+        day=datetime.date(2024, 1, 5),
+        done=True,
+        sign="+",
+        amount=Decimal("1500"),
+        balance=Decimal("2500.50"),
+        percent=42,
+        rate=Decimal("3.14159"),
+        count=7,
+        total=Decimal("10"),
+        client=Relation("ООО <Ромашка> & Ко"),
+        comment='Текст с "кавычками"',
+    ),
+    make_item(
+        id=2,
+        created=None,
+        day=None,
+        done=False,
+        sign="-",
+        amount=None,
+        balance=Decimal("-300"),
+        percent=0,
+        rate=None,
+        count=0,
+        total=None,
+        client=None,
+        comment="",
+    ),
+    make_item(
+        id=3,
+        created=timezone.make_aware(datetime.datetime(2024, 6, 1, 0, 30)),
+        day="не дата",
+        done="False",
+        sign=None,
+        amount=0,
+        balance=None,
+        percent=None,
+        rate=0,
+        count=None,
+        total=0,
+        client=Relation(""),
+        comment=None,
+    ),
+    make_item(
+        id=4,
+        created=timezone.now,
+        day=datetime.date(2030, 12, 1),
+        done=None,
+        sign="",
+        amount=-1,
+        balance=0,
+        percent="12,5",
+        rate="2.5",
+        count=1000000,
+        total=-0.5,
+        client="строка",
+        comment=lambda: "из вызова",
+    ),
+]
+
+
+class RowRendererParityTests(SimpleTestCase):
+    """
+    RowRenderer must produce components/table_row.html output byte for byte.
+    """
+
+    def assert_parity(self, fields, items=ITEMS):
+        for item in items:
+            with self.subTest(id=item.id):
+                expected = render_to_string(
+                    "components/table_row.html", {"item": item, "fields": fields}
+                )
+                self.assertEqual(render_table_row(item, fields), expected)
+
+    def test_every_field_flag(self):
+        self.assert_parity(ALL_FIELDS)
+
+    def test_each_flag_alone(self):
+        for field in ALL_FIELDS:
+            with self.subTest(field=field["name"]):
+                self.assert_parity([field])
+
+    def test_row_class_with_several_sign_fields(self):
+        fields = [
+            {"name": "sign", "is_type_sign": True},
+            {"name": "comment"},
+            {"name": "sign", "is_type_sign": True},
+        ]
+        self.assert_parity(fields)
+
+    def test_rows_numbered_like_forloop(self):
+        expected = ROWS_TEMPLATE.render(Context({"items": ITEMS, "fields": ALL_FIELDS}))
+        renderer = RowRenderer(ALL_FIELDS)
+        rendered = "".join(
+            renderer.render(item, row_number) for row_number, item in enumerate(ITEMS, start=1)
+        )
+        self.assertEqual(rendered, expected)
+
+    def test_render_rows_without_numbers(self):
+        expected = "".join(
+            render_to_string("components/table_row.html", {"item": item, "fields": ALL_FIELDS})
+            for item in ITEMS
+        )
+        self.assertEqual(render_table_rows(ITEMS, ALL_FIELDS), expected)
+
+    def test_dict_items(self):
+        items = [{"id": 5, "comment": "<b>", "amount": Decimal("7"), "done": True}]
+        fields = [
+            {"name": "id"},
+            {"name": "comment"},
+            {"name": "amount", "is_currency": True},
+            {"name": "done", "is_boolean": True},
+        ]
+        for item in items:
+            expected = render_to_string(
+                "components/table_row.html", {"item": item, "fields": fields}
+            )
+            self.assertEqual(render_table_row(item, fields), expected)
@@ -77,22 +77,20 @@ class ComponentView(TemplateView):
         return super().render_to_response(context=context)
 
 from django.shortcuts import get_object_or_404, redirect
-from django.utils import timezone
 from commerce.models import Document
-from django.http import HttpResponse, Http404
-import mimetypes
+from django.http import Http404
 from users.models import FileAccessToken
+from yarche.files import make_file_token, read_file_token, serve_document
+import uuid
 from django.contrib.auth.decorators import login_required
 
+def _file_access_url(request, doc):
+    user_id = request.user.id if request.user.is_authenticated else None
+    return request.build_absolute_uri(f"/file-access/{make_file_token(doc.id, user_id)}/")
+
 def generate_file_token(request, file_id):
     doc = get_object_or_404(Document, id=file_id)
-    user = request.user if request.user.is_authenticated else None
-    token = FileAccessToken.objects.create(
-        file=doc,
-        expires_at=timezone.now() + timezone.timedelta(minutes=5),
-        created_by=user
-    )
-    file_url = request.build_absolute_uri(f"/file-access/{token.token}/")
+    file_url = _file_access_url(request, doc)
     ext = doc.file.name.split('.')[-1].lower()
     if ext in ['doc', 'docx', 'xls', 'xlsx']:
         viewer_url = f"https://view.officeapps.live.com/op/view.aspx?src={file_url}"
@@ -100,17 +98,21 @@ def generate_file_token(request, file_id):
     return redirect(file_url)
 
 def file_access(request, token):
-    try:
-        access = FileAccessToken.objects.select_related('file').get(token=token)
-    except FileAccessToken.DoesNotExist:
-        raise Http404()
-    if not access.is_valid():
+    if isinstance(token, uuid.UUID):
+        # Токены-строки из FileAccessToken, выданные до перехода на подпись, действуют до истечения
+        try:
+            access = FileAccessToken.objects.select_related('file').get(token=token)
+        except FileAccessToken.DoesNotExist:
+            raise Http404()
+        if not access.is_valid():
+            raise Http404()
+        return serve_document(request, access.file)
+
+    payload = read_file_token(token)
+    if payload is None:
         raise Http404()
-    file_field = access.file.file
-    mime, _ = mimetypes.guess_type(file_field.name)
-    response = HttpResponse(file_field, content_type=mime or 'application/octet-stream')
-    response['Content-Disposition'] = f'inline; filename="{file_field.name}"'
-    return response
+    doc = get_object_or_404(Document, id=payload["d"])
+    return serve_document(request, doc)
 
 def file_online_view(request, file_id):
     doc = get_object_or_404(Document, id=file_id)
@@ -118,11 +120,6 @@ def file_online_view(request, file_id):
     office_exts = ['doc', 'docx', 'xls', 'xlsx']
     if ext not in office_exts:
         return redirect(doc.file.url)
-    token = FileAccessToken.objects.create(
-        file=doc,
-        expires_at=timezone.now() + timezone.timedelta(minutes=5),
-        created_by=request.user if request.user.is_authenticated else None
-    )
-    file_url = request.build_absolute_uri(f"/file-access/{token.token}/")
+    file_url = _file_access_url(request, doc)
     viewer_url = f"https://view.officeapps.live.com/op/view.aspx?src={file_url}"
-    return redirect(viewer_url)
\ No newline at end of file
+    return redirect(viewer_url)